@@ -0,0 +1,19 @@
+"""
+add_theater_layout_version
+"""
+from yoyo import step
+
+__depends__ = {'20251214_04_add_unique_constraints_to_inventory'}
+
+steps = [
+    step(
+        """
+        ALTER TABLE theaters
+        ADD COLUMN layout_version INT NOT NULL DEFAULT 0;
+        """,
+        """
+        ALTER TABLE theaters
+        DROP COLUMN layout_version;
+        """
+    )
+]
@@ -0,0 +1,21 @@
+"""
+create_theater_layouts
+"""
+from yoyo import step
+
+__depends__ = {'20251215_05_add_theater_layout_version'}
+
+steps = [
+    step(
+        """
+        CREATE TABLE theater_layouts (
+            theater_id INT PRIMARY KEY,
+            version INT NOT NULL, -- Igual a theaters.layout_version al generarse
+            layout_blob MEDIUMBLOB NOT NULL, -- SeatLayout serializado (src/models/seat_layout.py)
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (theater_id) REFERENCES theaters(id) ON DELETE CASCADE
+        )
+        """,
+        "DROP TABLE IF EXISTS theater_layouts"
+    )
+]
@@ -0,0 +1,31 @@
+"""
+create_showtime_templates
+"""
+from yoyo import step
+
+__depends__ = {'20251215_06_create_theater_layouts'}
+
+steps = [
+    step(
+        """
+        CREATE TABLE showtime_templates (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            movie_id INT NOT NULL,
+            theater_id INT NOT NULL,
+            price_profile_id INT NOT NULL,
+            start_times VARCHAR(255) NOT NULL, -- 'HH:MM' separados por coma: 14:00,17:00,20:00
+            weekdays VARCHAR(20) NOT NULL DEFAULT '0,1,2,3,4,5,6', -- 0 = Lunes ... 6 = Domingo
+            valid_from DATE NOT NULL,
+            valid_until DATE, -- NULL = sin fecha de fin
+            projection_type VARCHAR(20) DEFAULT '2D',
+            audio_type VARCHAR(20) DEFAULT 'DUB',
+            is_active BOOLEAN DEFAULT TRUE,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (movie_id) REFERENCES movies(id) ON DELETE CASCADE,
+            FOREIGN KEY (theater_id) REFERENCES theaters(id),
+            FOREIGN KEY (price_profile_id) REFERENCES price_profiles(id)
+        )
+        """,
+        "DROP TABLE IF EXISTS showtime_templates"
+    )
+]
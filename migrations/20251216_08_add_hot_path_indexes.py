@@ -0,0 +1,34 @@
+"""
+add_hot_path_indexes
+"""
+from yoyo import step
+
+__depends__ = {'20251216_07_create_showtime_templates'}
+
+steps = [
+    # Listado de funciones por día (get_showtimes, ventas del día).
+    step(
+        "CREATE INDEX idx_showtimes_start_time ON showtimes (start_time)",
+        "DROP INDEX idx_showtimes_start_time ON showtimes"
+    ),
+    # Detección de conflictos por sala y rango horario (check_conflict, árboles de intervalos).
+    step(
+        "CREATE INDEX idx_showtimes_theater_time ON showtimes (theater_id, start_time, end_time)",
+        "DROP INDEX idx_showtimes_theater_time ON showtimes"
+    ),
+    # Ocupación de una función (get_seat_map / get_occupied_seat_ids).
+    step(
+        "CREATE INDEX idx_tickets_showtime_seat ON tickets (showtime_id, seat_id)",
+        "DROP INDEX idx_tickets_showtime_seat ON tickets"
+    ),
+    # Log de movimientos ordenado por fecha (get_stock_movements).
+    step(
+        "CREATE INDEX idx_stock_movements_created ON stock_movements (created_at, id)",
+        "DROP INDEX idx_stock_movements_created ON stock_movements"
+    ),
+    # Movimientos de un insumo por fecha (filtro por insumo).
+    step(
+        "CREATE INDEX idx_stock_movements_item_created ON stock_movements (inventory_item_id, created_at)",
+        "DROP INDEX idx_stock_movements_item_created ON stock_movements"
+    )
+]
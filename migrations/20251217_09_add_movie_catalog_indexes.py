@@ -0,0 +1,18 @@
+"""
+add_movie_catalog_indexes
+"""
+from yoyo import step
+
+__depends__ = {'20251216_08_add_hot_path_indexes'}
+
+steps = [
+    # Paginación keyset del catálogo: ORDER BY title, id con y sin filtro de estado.
+    step(
+        "CREATE INDEX idx_movies_title_id ON movies (title, id)",
+        "DROP INDEX idx_movies_title_id ON movies"
+    ),
+    step(
+        "CREATE INDEX idx_movies_status_title ON movies (status, title, id)",
+        "DROP INDEX idx_movies_status_title ON movies"
+    )
+]
@@ -0,0 +1,14 @@
+"""
+add_sales_date_index
+"""
+from yoyo import step
+
+__depends__ = {'20251217_09_add_movie_catalog_indexes'}
+
+steps = [
+    # Lectura de ventas por rango de fechas (ReportService).
+    step(
+        "CREATE INDEX idx_sales_date_status ON sales (sale_date, status)",
+        "DROP INDEX idx_sales_date_status ON sales"
+    )
+]
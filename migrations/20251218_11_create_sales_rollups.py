@@ -0,0 +1,54 @@
+"""
+create_sales_rollups
+"""
+from yoyo import step
+
+__depends__ = {'20251217_10_add_sales_date_index'}
+
+steps = [
+    # Grano horario; los totales diarios se obtienen sumando por el prefijo (day) de la PK.
+    step(
+        """
+        CREATE TABLE sales_hourly_rollup (
+            day DATE NOT NULL,
+            hour TINYINT NOT NULL,
+            user_id INT NOT NULL, -- Cajero
+            payment_method VARCHAR(50) NOT NULL,
+            sales_count INT NOT NULL DEFAULT 0,
+            revenue_cents BIGINT NOT NULL DEFAULT 0,
+            ticket_sales INT NOT NULL DEFAULT 0, -- Ventas que incluyen entradas
+            attached_sales INT NOT NULL DEFAULT 0, -- Ventas con entradas y confitería
+            PRIMARY KEY (day, hour, user_id, payment_method)
+        )
+        """,
+        "DROP TABLE IF EXISTS sales_hourly_rollup"
+    ),
+    step(
+        """
+        CREATE TABLE ticket_hourly_rollup (
+            day DATE NOT NULL,
+            hour TINYINT NOT NULL,
+            movie_id INT NOT NULL,
+            theater_id INT NOT NULL,
+            ticket_type VARCHAR(50) NOT NULL,
+            tickets INT NOT NULL DEFAULT 0,
+            revenue_cents BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, hour, movie_id, theater_id, ticket_type)
+        )
+        """,
+        "DROP TABLE IF EXISTS ticket_hourly_rollup"
+    ),
+    step(
+        """
+        CREATE TABLE product_hourly_rollup (
+            day DATE NOT NULL,
+            hour TINYINT NOT NULL,
+            product_id INT NOT NULL,
+            quantity INT NOT NULL DEFAULT 0,
+            revenue_cents BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, hour, product_id)
+        )
+        """,
+        "DROP TABLE IF EXISTS product_hourly_rollup"
+    )
+]
@@ -0,0 +1,19 @@
+"""
+add_stock_movement_filter_indexes
+"""
+from yoyo import step
+
+__depends__ = {'20251218_11_create_sales_rollups'}
+
+steps = [
+    # Páginas keyset del libro de movimientos filtradas por tipo (get_stock_movements).
+    step(
+        "CREATE INDEX idx_stock_movements_type_created ON stock_movements (movement_type, created_at, id)",
+        "DROP INDEX idx_stock_movements_type_created ON stock_movements"
+    ),
+    # Páginas keyset filtradas por usuario.
+    step(
+        "CREATE INDEX idx_stock_movements_user_created ON stock_movements (user_id, created_at, id)",
+        "DROP INDEX idx_stock_movements_user_created ON stock_movements"
+    )
+]
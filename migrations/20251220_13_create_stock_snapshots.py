@@ -0,0 +1,33 @@
+"""
+create_stock_snapshots
+"""
+from yoyo import step
+
+__depends__ = {'20251219_12_add_stock_movement_filter_indexes'}
+
+steps = [
+    # Cierre diario de stock por insumo: stock al final de snapshot_date (movimientos con created_at < día siguiente).
+    step(
+        """
+        CREATE TABLE stock_snapshots (
+            snapshot_date DATE NOT NULL,
+            inventory_item_id INT NOT NULL,
+            quantity DECIMAL(14, 3) NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (inventory_item_id, snapshot_date),
+            INDEX idx_stock_snapshots_date (snapshot_date),
+            FOREIGN KEY (inventory_item_id) REFERENCES inventory_items(id) ON DELETE CASCADE
+        )
+        """,
+        "DROP TABLE IF EXISTS stock_snapshots"
+    ),
+    # Movimientos antiguos compactados fuera del libro activo (misma estructura e índices).
+    step(
+        "CREATE TABLE stock_movements_archive LIKE stock_movements",
+        "DROP TABLE IF EXISTS stock_movements_archive"
+    ),
+    step(
+        "ALTER TABLE stock_movements_archive ADD COLUMN archived_at DATETIME DEFAULT CURRENT_TIMESTAMP",
+        "ALTER TABLE stock_movements_archive DROP COLUMN archived_at"
+    )
+]
@@ -0,0 +1,22 @@
+"""
+create_product_costs
+"""
+from yoyo import step
+
+__depends__ = {'20251220_13_create_stock_snapshots'}
+
+steps = [
+    # Costo de receta materializado por producto (insumos y sub-productos explotados a costo actual).
+    # Se mantiene de forma incremental desde RecipeCostService; `rebuild` lo recalcula completo.
+    step(
+        """
+        CREATE TABLE product_costs (
+            product_id INT PRIMARY KEY,
+            recipe_cost DECIMAL(12, 4) NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+        )
+        """,
+        "DROP TABLE IF EXISTS product_costs"
+    )
+]
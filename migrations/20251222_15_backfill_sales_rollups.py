@@ -0,0 +1,63 @@
+"""
+backfill_sales_rollups
+"""
+from yoyo import step
+
+__depends__ = {'20251221_14_create_product_costs'}
+
+# Las instalaciones que ya tenían ventas al crear los rollups los tienen vacíos y los reportes
+# (que leen de los rollups) saldrían en cero. Se recalculan una vez desde las tablas crudas,
+# con las mismas agregaciones que RollupService; los DELETE previos hacen el paso repetible.
+steps = [
+    step(
+        """
+        DELETE FROM sales_hourly_rollup
+        """
+    ),
+    step(
+        """
+        INSERT INTO sales_hourly_rollup
+            (day, hour, user_id, payment_method, sales_count, revenue_cents, ticket_sales, attached_sales)
+        SELECT DATE(s.sale_date), HOUR(s.sale_date), s.user_id, COALESCE(s.payment_method, ''),
+               COUNT(*), SUM(ROUND(s.total_amount * 100)),
+               SUM(EXISTS (SELECT 1 FROM tickets t WHERE t.sale_id = s.id)),
+               SUM(EXISTS (SELECT 1 FROM tickets t WHERE t.sale_id = s.id)
+                   AND EXISTS (SELECT 1 FROM sale_items si WHERE si.sale_id = s.id))
+        FROM sales s
+        WHERE s.status = 'COMPLETED'
+        GROUP BY DATE(s.sale_date), HOUR(s.sale_date), s.user_id, COALESCE(s.payment_method, '')
+        """
+    ),
+    step(
+        """
+        DELETE FROM ticket_hourly_rollup
+        """
+    ),
+    step(
+        """
+        INSERT INTO ticket_hourly_rollup (day, hour, movie_id, theater_id, ticket_type, tickets, revenue_cents)
+        SELECT DATE(s.sale_date), HOUR(s.sale_date), sh.movie_id, sh.theater_id, COALESCE(t.ticket_type, ''),
+               COUNT(*), SUM(ROUND(t.price_sold * 100))
+        FROM tickets t
+        JOIN sales s ON s.id = t.sale_id
+        JOIN showtimes sh ON sh.id = t.showtime_id
+        WHERE s.status = 'COMPLETED' AND t.status <> 'REFUNDED'
+        GROUP BY DATE(s.sale_date), HOUR(s.sale_date), sh.movie_id, sh.theater_id, COALESCE(t.ticket_type, '')
+        """
+    ),
+    step(
+        """
+        DELETE FROM product_hourly_rollup
+        """
+    ),
+    step(
+        """
+        INSERT INTO product_hourly_rollup (day, hour, product_id, quantity, revenue_cents)
+        SELECT DATE(s.sale_date), HOUR(s.sale_date), si.product_id, SUM(si.quantity), SUM(ROUND(si.subtotal * 100))
+        FROM sale_items si
+        JOIN sales s ON s.id = si.sale_id
+        WHERE s.status = 'COMPLETED'
+        GROUP BY DATE(s.sale_date), HOUR(s.sale_date), si.product_id
+        """
+    )
+]
@@ -19,6 +19,18 @@ class Config:
     APP_VERSION = "1.0.0"
     WINDOW_WIDTH = 1200
     WINDOW_HEIGHT = 800
+
+    # Configuración de Programación
+    # Minutos de limpieza de sala que se suman a la duración de la película al calcular end_time.
+    CLEANING_BUFFER_MINUTES = int(os.getenv("CLEANING_BUFFER_MINUTES", 15))
+    # Horario por defecto del planificador automático (HH:MM). Un cierre igual o anterior a la
+    # apertura es del día siguiente (p. ej. "01:30" para funciones de trasnoche).
+    SCHEDULE_OPENING = os.getenv("SCHEDULE_OPENING", "10:00")
+    SCHEDULE_CLOSING = os.getenv("SCHEDULE_CLOSING", "23:59")
+
+    # Caché local de imágenes (pósters y productos)
+    IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cineman", "image_cache"))
+    IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", 200))
     
     # Configuración de Roles
     ROLES = {
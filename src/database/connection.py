@@ -12,6 +12,24 @@ class DatabaseError(Exception):
     """Excepción personalizada para errores de base de datos, encapsulando detalles."""
     pass
 
+def execute_multirow(cursor, head: str, rows: List[tuple], tail: str = "", chunk_size: int = 500) -> int:
+    """
+    Ejecuta `head VALUES (...), (...), ... tail` en bloques de `chunk_size` filas
+    sobre un cursor ya abierto (normalmente el de `transaction()`).
+    Retorna el total de filas afectadas reportado por MySQL.
+    """
+    if not rows:
+        return 0
+    row_placeholder = "(" + ", ".join(["%s"] * len(rows[0])) + ")"
+    affected = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        values_sql = ", ".join([row_placeholder] * len(chunk))
+        params = [value for row in chunk for value in row]
+        cursor.execute(f"{head} VALUES {values_sql} {tail}".strip(), params)
+        affected += cursor.rowcount
+    return affected
+
 class DatabaseConnection:
     """
     Clase Singleton para gestionar la conexión a la base de datos mediante un pool.
@@ -134,6 +152,43 @@ class DatabaseConnection:
                 conn.close()
                 logger.debug("Conexión de transacción devuelta al pool.")
     
+    @contextmanager
+    def stream_query(self, query: str, params: Optional[tuple] = None):
+        """
+        Ejecuta un SELECT con un cursor no bufferizado: las filas se leen del
+        servidor a medida que se piden con fetchmany, en memoria constante.
+        Si el consumidor sale antes de leerlo todo (ej. exportación cancelada),
+        se corta la conexión en lugar de recibir y descartar el resto de filas;
+        el servidor aborta la consulta y el pool la reconecta al reutilizarla.
+        """
+        conn = None
+        cursor = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor(buffered=False)
+            cursor.execute(self._prepare_query(query), params or ())
+            yield cursor
+        except (DBError, InterfaceError) as e:
+            logger.error(f"Error de BD durante lectura en streaming. Query: {query[:100]}...")
+            raise DatabaseError(f"Lectura en streaming falló: {e}") from e
+        finally:
+            if conn and conn.unread_result:
+                logger.debug("Lectura en streaming interrumpida; se cierra la conexión sin vaciar el cursor.")
+                conn.disconnect()
+                cursor = None
+            if cursor:
+                try:
+                    cursor.close()
+                except (DBError, InterfaceError):
+                    logger.warning("No se pudo cerrar el cursor en streaming.")
+            if conn:
+                try:
+                    # Devuelve la conexión al pool; si se desconectó, falla el reseteo de sesión
+                    # pero igual queda en el pool y se reconecta en el próximo get_connection.
+                    conn.close()
+                except (DBError, InterfaceError):
+                    logger.debug("Conexión de streaming devuelta al pool desconectada.")
+
     def execute_insert(self, command: str, params: Optional[tuple] = None) -> int:
         """Ejecuta un INSERT y retorna el ID de la nueva fila."""
         return self._execute(command, params, commit=True)
@@ -72,6 +72,7 @@ class Theater:
     total_capacity: int = 0
     is_active: bool = True
     created_at: Optional[datetime] = None
+    layout_version: int = 0
 
 @dataclass
 class SeatType:
@@ -121,6 +122,22 @@ class Showtime:
     movie_title: str = ""
     theater_name: str = ""
 
+@dataclass
+class ShowtimeTemplate:
+    """Plantilla semanal de funciones (ej: película X, sala 3, 14:00/17:00/20:00, Lun-Dom)"""
+    id: Optional[int] = None
+    movie_id: int = 0
+    theater_id: int = 0
+    price_profile_id: int = 0
+    start_times: List[time] = field(default_factory=list)
+    weekdays: List[int] = field(default_factory=lambda: list(range(7))) # 0 = Lunes ... 6 = Domingo
+    valid_from: Optional[date] = None
+    valid_until: Optional[date] = None
+    projection_type: str = ProjectionType.D2.value
+    audio_type: str = AudioType.DUB.value
+    is_active: bool = True
+    created_at: Optional[datetime] = None
+
 @dataclass
 class InventoryItem:
     """Insumo de inventario (Stock físico)"""
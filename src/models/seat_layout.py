@@ -0,0 +1,171 @@
+import logging
+import struct
+import sys
+import zlib
+from array import array
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.models.models import Seat, SeatType
+
+logger = logging.getLogger(__name__)
+
+# Cabecera del blob: magic, versión del layout, ancho, alto, tamaños de las tablas de texto.
+_MAGIC = b"SL1"
+_HEADER = struct.Struct("<3sIHHHH")
+_TABLE_SEPARATOR = "\x1f"
+EMPTY_CELL = 0 # seat_id 0 = pasillo / celda sin asiento.
+
+def _to_little_endian(arr: array) -> array:
+    if sys.byteorder == "big":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr
+
+@dataclass
+class SeatLayout:
+    """
+    Representación compacta del layout de una sala: una parrilla `width x height`
+    respaldada por arrays planos (índice = y * width + x) más tablas de etiquetas
+    de fila y de estados. Se serializa como un único blob versionado.
+    """
+    theater_id: int
+    version: int
+    width: int
+    height: int
+    seat_ids: array = field(default_factory=lambda: array("I"))
+    seat_type_ids: array = field(default_factory=lambda: array("H"))
+    numbers: array = field(default_factory=lambda: array("H"))
+    label_codes: array = field(default_factory=lambda: array("H"))
+    status_codes: array = field(default_factory=lambda: array("B"))
+    row_labels: List[str] = field(default_factory=list)
+    statuses: List[str] = field(default_factory=list)
+    # Asientos de `seats` que no entran en la parrilla (sin posición o en una celda ya ocupada).
+    # No se serializa: solo se guardan en blob los layouts completos.
+    unplaced: List[int] = field(default_factory=list)
+
+    @classmethod
+    def from_rows(cls, theater_id: int, version: int, rows: Iterable[Dict[str, Any]]) -> "SeatLayout":
+        """
+        Construye el layout desde filas de `seats` (id, row_label, number, seat_type_id, status, x/y_position).
+        Los asientos sin posición o que repiten una celda ya ocupada quedan en `unplaced`.
+        """
+        rows = list(rows)
+        unplaced = [r["id"] for r in rows if r["x_position"] is None or r["y_position"] is None]
+        rows = [r for r in rows if r["x_position"] is not None and r["y_position"] is not None]
+        width = max((r["x_position"] for r in rows), default=-1) + 1
+        height = max((r["y_position"] for r in rows), default=-1) + 1
+        size = width * height
+
+        layout = cls(
+            theater_id=theater_id, version=version, width=width, height=height,
+            seat_ids=array("I", bytes(4 * size)), seat_type_ids=array("H", bytes(2 * size)),
+            numbers=array("H", bytes(2 * size)), label_codes=array("H", bytes(2 * size)),
+            status_codes=array("B", bytes(size)),
+        )
+        label_index: Dict[str, int] = {}
+        status_index: Dict[str, int] = {}
+        for r in rows:
+            i = r["y_position"] * width + r["x_position"]
+            if layout.seat_ids[i] != EMPTY_CELL:
+                unplaced.append(r["id"])
+                continue
+            layout.seat_ids[i] = r["id"]
+            layout.seat_type_ids[i] = r["seat_type_id"]
+            layout.numbers[i] = r["number"]
+            layout.label_codes[i] = label_index.setdefault(r["row_label"], len(label_index))
+            layout.status_codes[i] = status_index.setdefault(r["status"] or "", len(status_index))
+        layout.row_labels = list(label_index)
+        layout.statuses = list(status_index)
+        layout.unplaced = sorted(unplaced)
+        if unplaced:
+            logger.warning(
+                f"Sala {theater_id}: {len(unplaced)} asiento(s) sin posición válida o con posición repetida "
+                f"no entran en el layout (IDs {', '.join(map(str, layout.unplaced))})."
+            )
+        return layout
+
+    @classmethod
+    def from_blob(cls, theater_id: int, blob: bytes) -> "SeatLayout":
+        """Reconstruye un layout desde el blob comprimido generado por `to_blob`."""
+        data = zlib.decompress(blob)
+        magic, version, width, height, labels_len, statuses_len = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError("Formato de layout de asientos desconocido.")
+        offset = _HEADER.size
+        labels_raw = data[offset:offset + labels_len].decode("utf-8")
+        offset += labels_len
+        statuses_raw = data[offset:offset + statuses_len].decode("utf-8")
+        offset += statuses_len
+
+        layout = cls(theater_id=theater_id, version=version, width=width, height=height)
+        layout.row_labels = labels_raw.split(_TABLE_SEPARATOR) if labels_raw else []
+        layout.statuses = statuses_raw.split(_TABLE_SEPARATOR) if statuses_raw else []
+        size = width * height
+        for name in ("seat_ids", "seat_type_ids", "numbers", "label_codes", "status_codes"):
+            arr = getattr(layout, name)
+            nbytes = size * arr.itemsize
+            arr.frombytes(data[offset:offset + nbytes])
+            if sys.byteorder == "big":
+                arr.byteswap()
+            offset += nbytes
+        return layout
+
+    def to_blob(self) -> bytes:
+        """Serializa el layout en un blob binario comprimido."""
+        labels = _TABLE_SEPARATOR.join(self.row_labels).encode("utf-8")
+        statuses = _TABLE_SEPARATOR.join(self.statuses).encode("utf-8")
+        parts = [
+            _HEADER.pack(_MAGIC, self.version, self.width, self.height, len(labels), len(statuses)),
+            labels,
+            statuses,
+        ]
+        for arr in (self.seat_ids, self.seat_type_ids, self.numbers, self.label_codes, self.status_codes):
+            parts.append(_to_little_endian(arr).tobytes())
+        return zlib.compress(b"".join(parts))
+
+    @property
+    def complete(self) -> bool:
+        return not self.unplaced
+
+    @property
+    def seat_count(self) -> int:
+        return sum(1 for sid in self.seat_ids if sid != EMPTY_CELL)
+
+    def index_of(self, x: int, y: int) -> int:
+        return y * self.width + x
+
+    def cell(self, x: int, y: int) -> Optional[Tuple[int, str, int, int, str]]:
+        """Retorna (seat_id, row_label, number, seat_type_id, status) o None si es pasillo."""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        i = self.index_of(x, y)
+        seat_id = self.seat_ids[i]
+        if seat_id == EMPTY_CELL:
+            return None
+        return (seat_id, self.row_labels[self.label_codes[i]], self.numbers[i],
+                self.seat_type_ids[i], self.statuses[self.status_codes[i]])
+
+    def iter_seats(self) -> Iterator[Tuple[int, int, int, str, int, int, str]]:
+        """Itera (x, y, seat_id, row_label, number, seat_type_id, status) en orden de fila y columna."""
+        width = self.width
+        for i, seat_id in enumerate(self.seat_ids):
+            if seat_id == EMPTY_CELL:
+                continue
+            y, x = divmod(i, width)
+            yield (x, y, seat_id, self.row_labels[self.label_codes[i]], self.numbers[i],
+                   self.seat_type_ids[i], self.statuses[self.status_codes[i]])
+
+    def to_seats(self, seat_types: Dict[int, SeatType]) -> List[Seat]:
+        """Expande el layout a objetos Seat (para el editor visual)."""
+        seats = []
+        for x, y, seat_id, row_label, number, type_id, status in self.iter_seats():
+            seat_type = seat_types.get(type_id)
+            seats.append(Seat(
+                id=seat_id, theater_id=self.theater_id, row_label=row_label, number=number,
+                seat_type_id=type_id, status=status, x_position=x, y_position=y,
+                seat_type_name=seat_type.name if seat_type else "",
+                price_modifier=seat_type.price_modifier if seat_type else Decimal('1.00'),
+            ))
+        return seats
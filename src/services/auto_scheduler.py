@@ -0,0 +1,203 @@
+import heapq
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+
+from src.config.settings import Config
+from src.models.models import Showtime, AudioType, ProjectionType
+from src.services.schedule_service import ScheduleService
+from src.services.theater_service import TheaterService
+from src.utils.interval_tree import IntervalTree
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class MovieDemand:
+    """Película a programar con su meta de funciones y demanda esperada por función."""
+    movie_id: int
+    duration_minutes: int
+    target_shows: int
+    expected_attendance: int = 0 # Espectadores esperados por función (0 = sin estimación)
+    projection_type: str = ProjectionType.D2.value
+    audio_type: str = AudioType.DUB.value
+
+@dataclass
+class ScreenSpec:
+    """Sala disponible para el día: capacidad, horario y funciones ya programadas."""
+    theater_id: int
+    capacity: int
+    open_at: datetime
+    close_at: datetime
+    busy: IntervalTree = field(default_factory=IntervalTree)
+
+@dataclass
+class DayPlan:
+    """Resultado del planificador, listo para `ScheduleService.create_showtimes_bulk`."""
+    showtimes: List[Showtime] = field(default_factory=list)
+    expected_seats: int = 0
+    unmet_targets: Dict[int, int] = field(default_factory=dict) # movie_id -> funciones faltantes
+
+    @property
+    def screenings(self) -> int:
+        return len(self.showtimes)
+
+class AutoScheduler:
+    """
+    Planificador automático de salas para un día.
+
+    Usa programación de listas dirigida por eventos: siempre se atiende la sala
+    que queda libre más temprano y se le asigna la película con mejor valor por
+    minuto ocupado (funciones, o asientos esperados = min(capacidad, demanda)),
+    priorizando las que aún no cumplen su meta. Respeta la apertura/cierre, la
+    limpieza entre funciones, las funciones ya existentes y un desfase mínimo
+    entre inicios de la misma película en salas distintas.
+    """
+    def __init__(self, schedule_service: ScheduleService, theater_service: TheaterService):
+        self.schedule_service = schedule_service
+        self.theater_service = theater_service
+
+    def plan_day(
+        self,
+        day: date,
+        demands: List[MovieDemand],
+        opening: Optional[time] = None,
+        closing: Optional[time] = None,
+        theater_ids: Optional[List[int]] = None,
+        price_profile_id: int = 1,
+        objective: str = "seats",
+        cleaning_buffer_minutes: Optional[int] = None,
+        fill_idle: bool = False,
+    ) -> DayPlan:
+        """
+        Arma las salas activas (o las indicadas) con sus funciones existentes y planifica el día.
+        `opening`/`closing` toman por defecto Config.SCHEDULE_OPENING/SCHEDULE_CLOSING; un cierre
+        igual o anterior a la apertura se toma como del día siguiente, para permitir funciones
+        que terminan después de medianoche.
+        """
+        opening = opening or time.fromisoformat(Config.SCHEDULE_OPENING)
+        closing = closing or time.fromisoformat(Config.SCHEDULE_CLOSING)
+        open_at = datetime.combine(day, opening)
+        close_at = datetime.combine(day, closing)
+        if close_at <= open_at:
+            close_at += timedelta(days=1)
+        theaters = [t for t in self.theater_service.get_all_theaters()
+                    if theater_ids is None or t.id in theater_ids]
+        trees = self.schedule_service.load_interval_trees([t.id for t in theaters], open_at, close_at)
+        screens = [
+            ScreenSpec(theater_id=t.id, capacity=t.total_capacity, open_at=open_at, close_at=close_at, busy=trees[t.id])
+            for t in theaters
+        ]
+        return plan_screens(screens, demands, price_profile_id=price_profile_id, objective=objective,
+                            cleaning_buffer_minutes=cleaning_buffer_minutes, fill_idle=fill_idle)
+
+def _round_up(moment: datetime, granularity_minutes: int) -> datetime:
+    remainder = (moment.minute % granularity_minutes) * 60 + moment.second
+    if remainder == 0 and moment.microsecond == 0:
+        return moment
+    return moment.replace(second=0, microsecond=0) + timedelta(minutes=granularity_minutes - moment.minute % granularity_minutes)
+
+def plan_screens(
+    screens: List[ScreenSpec],
+    demands: List[MovieDemand],
+    price_profile_id: int = 1,
+    objective: str = "seats",
+    cleaning_buffer_minutes: Optional[int] = None,
+    fill_idle: bool = False,
+    granularity_minutes: int = 5,
+    stagger_minutes: int = 15,
+) -> DayPlan:
+    """
+    Núcleo del planificador (sin acceso a BD).
+
+    - `objective`: "seats" maximiza asientos esperados vendidos, "screenings" el número de funciones.
+    - `fill_idle`: una vez cumplidas las metas, sigue llenando huecos con funciones extra.
+    - `stagger_minutes`: separación mínima entre inicios de la misma película en salas distintas.
+    """
+    if objective not in ("seats", "screenings"):
+        raise ValueError(f"Objetivo de planificación desconocido: {objective}")
+    buffer = timedelta(minutes=Config.CLEANING_BUFFER_MINUTES if cleaning_buffer_minutes is None else cleaning_buffer_minutes)
+    stagger = timedelta(minutes=stagger_minutes)
+    remaining = {d.movie_id: d.target_shows for d in demands}
+    starts_by_movie: Dict[int, List[datetime]] = {d.movie_id: [] for d in demands}
+    plan = DayPlan()
+
+    def value(demand: MovieDemand, screen: ScreenSpec) -> float:
+        minutes = demand.duration_minutes + buffer.total_seconds() / 60
+        if objective == "screenings":
+            return 1.0 / minutes
+        seats = min(screen.capacity, demand.expected_attendance) if demand.expected_attendance else screen.capacity
+        return seats / minutes
+
+    def staggered_start(demand: MovieDemand, start: datetime) -> datetime:
+        # Retrasa el inicio hasta separarlo `stagger` de los demás inicios de la película.
+        moved = True
+        while moved:
+            moved = False
+            for other in starts_by_movie[demand.movie_id]:
+                if abs(other - start) < stagger:
+                    start = _round_up(other + stagger, granularity_minutes)
+                    moved = True
+        return start
+
+    def pick(screen: ScreenSpec, free_at: datetime, candidates: List[MovieDemand]):
+        """Elige la mejor película para la sala; retorna (mejor, hora de reintento)."""
+        best = None
+        retry_at: Optional[datetime] = None
+        for demand in candidates:
+            start = staggered_start(demand, free_at)
+            end = start + timedelta(minutes=demand.duration_minutes)
+            if end > screen.close_at:
+                continue # Más tarde tampoco cabría.
+            overlap = screen.busy.find_overlap(start, end + buffer)
+            if overlap:
+                # Choca con una función existente: se podrá reintentar cuando termine.
+                retry_at = overlap[1] if retry_at is None else min(retry_at, overlap[1])
+                continue
+            # Penaliza el tiempo muerto que introduce el desfase.
+            idle_minutes = (start - free_at).total_seconds() / 60
+            score = value(demand, screen) / (1 + idle_minutes / 60)
+            if best is None or score > best[0]:
+                best = (score, demand, start, end)
+        return best, retry_at
+
+    # Cola de salas por hora en que quedan libres.
+    heap = [(_round_up(s.open_at, granularity_minutes), i) for i, s in enumerate(screens)]
+    heapq.heapify(heap)
+
+    while heap:
+        free_at, screen_index = heapq.heappop(heap)
+        screen = screens[screen_index]
+
+        pending = [d for d in demands if remaining[d.movie_id] > 0]
+        best, retry_at = pick(screen, free_at, pending)
+        if best is None and fill_idle:
+            # Metas cumplidas (o pendientes que ya no caben): funciones extra con el resto.
+            extra, extra_retry = pick(screen, free_at, [d for d in demands if remaining[d.movie_id] == 0])
+            best = extra
+            if extra_retry is not None:
+                retry_at = extra_retry if retry_at is None else min(retry_at, extra_retry)
+
+        if best is None:
+            if retry_at is not None and retry_at < screen.close_at:
+                heapq.heappush(heap, (_round_up(max(retry_at, free_at + timedelta(minutes=granularity_minutes)), granularity_minutes), screen_index))
+            continue
+
+        _, demand, start, end = best
+        screen.busy.insert(start, end + buffer, f"auto {demand.movie_id}")
+        starts_by_movie[demand.movie_id].append(start)
+        remaining[demand.movie_id] = max(0, remaining[demand.movie_id] - 1)
+        plan.showtimes.append(Showtime(
+            movie_id=demand.movie_id, theater_id=screen.theater_id, price_profile_id=price_profile_id,
+            start_time=start, end_time=end + buffer,
+            projection_type=demand.projection_type, audio_type=demand.audio_type,
+        ))
+        attendance = demand.expected_attendance or screen.capacity
+        plan.expected_seats += min(screen.capacity, attendance)
+        heapq.heappush(heap, (_round_up(end + buffer, granularity_minutes), screen_index))
+
+    plan.unmet_targets = {movie_id: left for movie_id, left in remaining.items() if left > 0}
+    plan.showtimes.sort(key=lambda s: (s.theater_id, s.start_time))
+    if plan.unmet_targets:
+        logger.info(f"Planificación incompleta, funciones sin asignar: {plan.unmet_targets}")
+    return plan
@@ -0,0 +1,236 @@
+import logging
+import time as time_module
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.database.connection import DatabaseConnection, DatabaseError
+from src.services.recipe_graph import RecipeGraph
+
+logger = logging.getLogger(__name__)
+
+def align(ids: np.ndarray, values: np.ndarray, axis_ids: np.ndarray, fill: float = 0.0) -> np.ndarray:
+    """Reordena `values` (indexados por `ids`, sin repetidos) sobre `axis_ids`; los ausentes toman `fill`."""
+    aligned = np.full(len(axis_ids), fill, dtype=np.float64)
+    if len(ids) and len(axis_ids):
+        order = np.argsort(ids)
+        sorted_ids = ids[order]
+        pos = np.clip(np.searchsorted(sorted_ids, axis_ids), 0, len(sorted_ids) - 1)
+        found = sorted_ids[pos] == axis_ids
+        aligned[found] = values[order][pos[found]]
+    return aligned
+
+@dataclass
+class BomMatrix:
+    """
+    Matriz dispersa productos × insumos (formato coordenado) con las recetas ya
+    explotadas: `values[k]` unidades del insumo `item_ids[cols[k]]` por unidad del
+    producto `product_ids[rows[k]]`. Solo guarda las celdas no nulas.
+    """
+    product_ids: np.ndarray # ordenados
+    item_ids: np.ndarray # ordenados
+    rows: np.ndarray
+    cols: np.ndarray
+    values: np.ndarray
+
+    @classmethod
+    def from_graph(cls, graph: RecipeGraph) -> "BomMatrix":
+        flat = graph.flatten_all()
+        entries = [(product_id, item_id, float(quantity))
+                   for product_id, items in flat.items() for item_id, quantity in items.items() if quantity]
+        if not entries:
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(empty, empty, empty, empty, np.zeros(0, dtype=np.float64))
+        products, items, values = (np.array(column) for column in zip(*entries))
+        product_ids, rows = np.unique(products.astype(np.int64), return_inverse=True)
+        item_ids, cols = np.unique(items.astype(np.int64), return_inverse=True)
+        return cls(product_ids, item_ids, rows, cols, values.astype(np.float64))
+
+    @property
+    def shape(self):
+        return len(self.product_ids), len(self.item_ids)
+
+    def requirements(self, forecast: np.ndarray) -> np.ndarray:
+        """Insumos necesarios (alineados a `item_ids`) para el vector de unidades por producto: Bᵀ·f."""
+        return np.bincount(self.cols, weights=self.values * forecast[self.rows], minlength=len(self.item_ids))
+
+@dataclass
+class PlanningInputs:
+    """Datos leídos una sola vez para planificar; los escenarios se calculan sobre ellos sin BD."""
+    date_from: date
+    date_to: date
+    matrix: BomMatrix
+    units_per_admission: np.ndarray # por producto de la matriz: unidades vendidas / entradas históricas
+    historical_load: float # entradas / asientos ofrecidos en el período histórico
+    upcoming_capacity: float # asientos ofrecidos por las funciones del período a planificar
+    item_ids: np.ndarray # insumos del inventario (ordenados por id)
+    item_names: List[str]
+    item_units: List[str]
+    current_stock: np.ndarray
+    reorder_point: np.ndarray
+    cost_per_unit: np.ndarray
+
+@dataclass
+class PurchasePlan:
+    """Sugerencia de compra para un escenario (load_factor y multiplicadores por producto)."""
+    date_from: date
+    date_to: date
+    load_factor: float
+    admissions: float
+    rows: List[Dict[str, Any]] = field(default_factory=list) # insumos con compra sugerida, de mayor a menor costo
+    total_cost: float = 0.0
+    elapsed_ms: float = 0.0
+
+def compute_purchase_plan(inputs: PlanningInputs, load_factor: Optional[float] = None,
+                          product_scale: Optional[Dict[int, float]] = None, include_all: bool = False) -> PurchasePlan:
+    """
+    Escenario de compra (sin acceso a BD):
+      entradas previstas = asientos ofrecidos × load_factor (por defecto, el histórico)
+      pronóstico[p]      = unidades por entrada[p] × entradas previstas × product_scale[p]
+      requerido          = Bᵀ · pronóstico
+      compra sugerida    = max(0, requerido + punto de reorden − stock actual)
+    """
+    started = time_module.perf_counter()
+    matrix = inputs.matrix
+    load_factor = inputs.historical_load if load_factor is None else load_factor
+    admissions = inputs.upcoming_capacity * load_factor
+    forecast = inputs.units_per_admission * admissions
+    if product_scale:
+        scale_ids = np.fromiter(product_scale.keys(), dtype=np.int64, count=len(product_scale))
+        scale = np.fromiter(product_scale.values(), dtype=np.float64, count=len(product_scale))
+        forecast = forecast * align(scale_ids, scale, matrix.product_ids, fill=1.0)
+
+    required = align(matrix.item_ids, matrix.requirements(forecast), inputs.item_ids)
+    projected = inputs.current_stock - required
+    suggested = np.maximum(0.0, inputs.reorder_point - projected)
+    cost = suggested * inputs.cost_per_unit
+
+    plan = PurchasePlan(date_from=inputs.date_from, date_to=inputs.date_to, load_factor=load_factor,
+                        admissions=admissions, total_cost=float(cost.sum()))
+    selected = np.arange(len(inputs.item_ids)) if include_all else np.flatnonzero(suggested > 0)
+    for i in selected[np.argsort(-cost[selected], kind="stable")]:
+        plan.rows.append({
+            "item_id": int(inputs.item_ids[i]), "name": inputs.item_names[i], "unit": inputs.item_units[i],
+            "current_stock": float(inputs.current_stock[i]), "reorder_point": float(inputs.reorder_point[i]),
+            "required": float(required[i]), "projected": float(projected[i]),
+            "suggested": float(suggested[i]), "cost": float(cost[i]),
+        })
+    plan.elapsed_ms = (time_module.perf_counter() - started) * 1000
+    return plan
+
+class DemandPlanningService:
+    """
+    Planificación de compras de insumos a partir del pronóstico de ventas.
+
+    El pronóstico por producto sale del historial: unidades vendidas (sale_items de
+    ventas completadas) por entrada vendida en las últimas `history_days`,
+    multiplicado por las entradas previstas de las funciones programadas en el
+    período (capacidad de sala × factor de carga). La matriz BOM explotada
+    convierte ese vector en insumos requeridos, que se comparan con el stock
+    actual y el punto de reorden. Los escenarios (otro factor de carga, un
+    producto promocionado) se recalculan con `compute_purchase_plan` sobre los
+    mismos `PlanningInputs`, sin volver a la BD.
+    """
+    HISTORY_DAYS = 56
+
+    def __init__(self, db_connection: DatabaseConnection):
+        self.db = db_connection
+
+    def _range(self, date_from: date, date_to: date):
+        start = datetime.combine(date_from, time.min)
+        return start, datetime.combine(date_to + timedelta(days=1), time.min)
+
+    def _offered_seats(self, start: datetime, end: datetime) -> float:
+        seats = self.db.execute_scalar(
+            """
+            SELECT COALESCE(SUM(th.total_capacity), 0)
+            FROM showtimes sh JOIN theaters th ON th.id = sh.theater_id
+            WHERE sh.start_time >= %s AND sh.start_time < %s AND sh.status <> 'CANCELLED'
+            """,
+            (start, end)
+        )
+        return float(seats or 0)
+
+    def load_inputs(self, date_from: date, date_to: date, history_days: Optional[int] = None,
+                    graph: Optional[RecipeGraph] = None) -> Optional[PlanningInputs]:
+        """Lee recetas, historial, funciones programadas e inventario; None ante errores de BD."""
+        history_days = history_days or self.HISTORY_DAYS
+        history_start, history_end = self._range(date_from - timedelta(days=history_days), date_from - timedelta(days=1))
+        start, end = self._range(date_from, date_to)
+        try:
+            if graph is None:
+                graph = RecipeGraph(self.db.execute_query(
+                    "SELECT parent_product_id, inventory_item_id, child_product_id, quantity FROM product_recipes"
+                ))
+            matrix = BomMatrix.from_graph(graph)
+
+            sold = self.db.execute_query(
+                """
+                SELECT si.product_id, SUM(si.quantity) AS units
+                FROM sale_items si JOIN sales s ON s.id = si.sale_id
+                WHERE s.status = 'COMPLETED' AND s.sale_date >= %s AND s.sale_date < %s
+                GROUP BY si.product_id
+                """,
+                (history_start, history_end)
+            )
+            admissions = float(self.db.execute_scalar(
+                """
+                SELECT COUNT(*) FROM tickets t JOIN showtimes sh ON sh.id = t.showtime_id
+                WHERE sh.start_time >= %s AND sh.start_time < %s AND sh.status <> 'CANCELLED' AND t.status <> 'REFUNDED'
+                """,
+                (history_start, history_end)
+            ) or 0)
+            historical_seats = self._offered_seats(history_start, history_end)
+            upcoming_capacity = self._offered_seats(start, end)
+            items = self.db.execute_query(
+                "SELECT id, name, unit, current_stock, reorder_point, cost_per_unit FROM inventory_items ORDER BY id"
+            )
+        except DatabaseError:
+            logger.exception(f"Error de BD al cargar los datos de planificación {date_from} - {date_to}.")
+            return None
+
+        sold_ids = np.array([row['product_id'] for row in sold], dtype=np.int64)
+        sold_units = np.array([float(row['units']) for row in sold], dtype=np.float64)
+        per_admission = sold_units / admissions if admissions else np.zeros_like(sold_units)
+        return PlanningInputs(
+            date_from=date_from, date_to=date_to, matrix=matrix,
+            units_per_admission=align(sold_ids, per_admission, matrix.product_ids),
+            historical_load=admissions / historical_seats if historical_seats else 0.0,
+            upcoming_capacity=upcoming_capacity,
+            item_ids=np.array([row['id'] for row in items], dtype=np.int64),
+            item_names=[row['name'] for row in items],
+            item_units=[row['unit'] for row in items],
+            current_stock=np.array([float(row['current_stock'] or 0) for row in items], dtype=np.float64),
+            reorder_point=np.array([float(row['reorder_point'] or 0) for row in items], dtype=np.float64),
+            cost_per_unit=np.array([float(row['cost_per_unit'] or 0) for row in items], dtype=np.float64),
+        )
+
+    def build_purchase_plan(self, date_from: date, date_to: date, load_factor: Optional[float] = None,
+                            product_scale: Optional[Dict[int, float]] = None) -> Optional[PurchasePlan]:
+        """Plan de compras del período con un escenario; retorna None ante errores de BD."""
+        inputs = self.load_inputs(date_from, date_to)
+        if inputs is None:
+            return None
+        return compute_purchase_plan(inputs, load_factor, product_scale)
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    # Uso: python -m src.services.demand_planning_service YYYY-MM-DD YYYY-MM-DD [FACTOR_DE_CARGA]
+    if len(sys.argv) < 3:
+        print("Uso: python -m src.services.demand_planning_service DESDE HASTA [FACTOR_DE_CARGA]")
+        sys.exit(2)
+    plan = DemandPlanningService(DatabaseConnection()).build_purchase_plan(
+        date.fromisoformat(sys.argv[1]), date.fromisoformat(sys.argv[2]),
+        float(sys.argv[3]) if len(sys.argv) > 3 else None
+    )
+    if plan is None:
+        print("❌ No se pudo calcular el plan; revise el log.")
+        sys.exit(1)
+    print(f"Factor de carga {plan.load_factor:.0%}, {plan.admissions:,.0f} entradas previstas.")
+    for row in plan.rows:
+        print(f"  {row['name']:<30} comprar {row['suggested']:>10,.2f} {row['unit']:<4} "
+              f"(requerido {row['required']:,.2f}, stock {row['current_stock']:,.2f})  S/ {row['cost']:,.2f}")
+    print(f"Total estimado: S/ {plan.total_cost:,.2f}")
@@ -0,0 +1,245 @@
+import csv
+import gzip
+import json
+import logging
+import os
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.database.connection import DatabaseConnection, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "jsonl")
+
+# progress(filas_escritas) -> False para cancelar la exportación.
+ProgressCallback = Callable[[int], Optional[bool]]
+
+def detect_format(path: str) -> Tuple[str, bool]:
+    """Deduce (formato, gzip) de la extensión: .csv, .jsonl/.ndjson, con .gz opcional."""
+    name = path.lower()
+    compress = name.endswith(".gz")
+    if compress:
+        name = name[:-3]
+    if name.endswith(".jsonl") or name.endswith(".ndjson"):
+        return "jsonl", compress
+    return "csv", compress
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value) # Conserva la precisión exacta de los montos.
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+class ExportService:
+    """
+    Exportación en streaming a CSV o JSON Lines (opcionalmente con gzip).
+    Las consultas se leen con `stream_query` (cursor del lado del servidor) y se
+    escriben bloque por bloque, de modo que la memoria no depende del tamaño del
+    resultado. Se escribe a un archivo `.part` que solo reemplaza al destino al
+    terminar sin errores ni cancelación.
+    """
+    CHUNK_SIZE = 5000
+
+    def __init__(self, db_connection: DatabaseConnection):
+        self.db = db_connection
+
+    # --- Exportaciones predefinidas ---
+    def export_stock_movements(self, path: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                               item_id: Optional[int] = None, movement_type: Optional[str] = None,
+                               user_id: Optional[int] = None, **options) -> Optional[Dict[str, Any]]:
+        """Libro de movimientos de stock en orden cronológico, con los mismos filtros que la pestaña."""
+        query = """
+            SELECT sm.id, sm.created_at, sm.inventory_item_id, ii.name AS item_name, ii.unit, sm.quantity,
+                   sm.movement_type, sm.reference_id, u.username AS user_name, sm.notes
+            FROM stock_movements sm
+            JOIN inventory_items ii ON sm.inventory_item_id = ii.id
+            LEFT JOIN users u ON sm.user_id = u.id
+        """
+        filters, params = [], []
+        if start_date:
+            filters.append("sm.created_at >= %s")
+            params.append(start_date)
+        if end_date:
+            filters.append("sm.created_at <= %s")
+            params.append(end_date)
+        if item_id:
+            filters.append("sm.inventory_item_id = %s")
+            params.append(item_id)
+        if movement_type:
+            filters.append("sm.movement_type = %s")
+            params.append(movement_type)
+        if user_id:
+            filters.append("sm.user_id = %s")
+            params.append(user_id)
+        if filters:
+            query += " WHERE " + " AND ".join(filters)
+        query += " ORDER BY sm.created_at, sm.id"
+        return self.export_query(query, params, path, **options)
+
+    def export_sales(self, path: str, date_from: date, date_to: date, **options) -> Optional[Dict[str, Any]]:
+        """Ventas del rango [date_from, date_to] con cajero y montos."""
+        start = datetime.combine(date_from, time.min)
+        return self.export_query(
+            """
+            SELECT s.id, s.sale_date, s.status, u.username AS user_name, s.customer_id, s.payment_method,
+                   s.total_amount, s.tax_amount, s.discount_amount
+            FROM sales s
+            LEFT JOIN users u ON u.id = s.user_id
+            WHERE s.sale_date >= %s AND s.sale_date < %s
+            ORDER BY s.sale_date, s.id
+            """,
+            (start, datetime.combine(date_to + timedelta(days=1), time.min)),
+            path, **options
+        )
+
+    def export_tickets(self, path: str, date_from: date, date_to: date, **options) -> Optional[Dict[str, Any]]:
+        """Entradas vendidas en el rango, con película, sala, función y asiento."""
+        start = datetime.combine(date_from, time.min)
+        return self.export_query(
+            """
+            SELECT t.id, t.sale_id, s.sale_date, sh.start_time, m.title AS movie, th.name AS theater,
+                   CONCAT(se.row_label, se.number) AS seat, t.ticket_type, t.price_sold, t.status
+            FROM tickets t
+            JOIN sales s ON s.id = t.sale_id
+            JOIN showtimes sh ON sh.id = t.showtime_id
+            JOIN movies m ON m.id = sh.movie_id
+            JOIN theaters th ON th.id = sh.theater_id
+            JOIN seats se ON se.id = t.seat_id
+            WHERE s.sale_date >= %s AND s.sale_date < %s
+            ORDER BY s.sale_date, t.id
+            """,
+            (start, datetime.combine(date_to + timedelta(days=1), time.min)),
+            path, **options
+        )
+
+    # --- Motor genérico ---
+    def export_query(self, query: str, params: Sequence[Any], path: str, fmt: Optional[str] = None,
+                     compress: Optional[bool] = None, progress: Optional[ProgressCallback] = None) -> Optional[Dict[str, Any]]:
+        """
+        Exporta el resultado de `query` a `path`. Retorna {'path', 'rows', 'bytes', 'cancelled'}
+        o None ante errores de BD o de escritura.
+        """
+        try:
+            with self.db.stream_query(query, tuple(params)) as cursor:
+                columns = [d[0] for d in cursor.description]
+                return self._write(columns, self._cursor_chunks(cursor), path, fmt, compress, progress)
+        except DatabaseError:
+            logger.exception(f"Error de BD al exportar a '{path}'.")
+            return None
+        except OSError:
+            logger.exception(f"Error de escritura al exportar a '{path}'.")
+            return None
+
+    def export_records(self, records: Iterable[Dict[str, Any]], path: str, columns: Optional[List[str]] = None,
+                       fmt: Optional[str] = None, compress: Optional[bool] = None,
+                       progress: Optional[ProgressCallback] = None) -> Optional[Dict[str, Any]]:
+        """Exporta filas ya calculadas (ej. tablas de un reporte); las columnas salen del primer registro."""
+        iterator = iter(records)
+        first = next(iterator, None)
+        if columns is None:
+            columns = list(first) if first else []
+
+        def chunks() -> Iterator[List[tuple]]:
+            pending = iterator if first is None else _prepend(first, iterator)
+            while True:
+                block = [tuple(r.get(c) for c in columns) for r in islice(pending, self.CHUNK_SIZE)]
+                if not block:
+                    return
+                yield block
+
+        try:
+            return self._write(columns, chunks(), path, fmt, compress, progress)
+        except OSError:
+            logger.exception(f"Error de escritura al exportar a '{path}'.")
+            return None
+
+    def _cursor_chunks(self, cursor) -> Iterator[List[tuple]]:
+        while True:
+            rows = cursor.fetchmany(self.CHUNK_SIZE)
+            if not rows:
+                return
+            yield rows
+
+    def _write(self, columns: List[str], chunks: Iterable[List[tuple]], path: str, fmt: Optional[str],
+               compress: Optional[bool], progress: Optional[ProgressCallback]) -> Dict[str, Any]:
+        detected_fmt, detected_gzip = detect_format(path)
+        fmt = fmt or detected_fmt
+        compress = detected_gzip if compress is None else compress
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportación desconocido: {fmt}")
+
+        partial = path + ".part"
+        rows = 0
+        cancelled = False
+        opener = gzip.open if compress else open
+        try:
+            with opener(partial, "wt", encoding="utf-8", newline="") as out:
+                if fmt == "csv":
+                    writer = csv.writer(out)
+                    writer.writerow(columns)
+                for chunk in chunks:
+                    if fmt == "csv":
+                        writer.writerows(chunk)
+                    else:
+                        out.write("".join(
+                            json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n"
+                            for row in chunk
+                        ))
+                    rows += len(chunk)
+                    if progress and progress(rows) is False:
+                        cancelled = True
+                        break
+            if cancelled:
+                os.remove(partial)
+                return {"path": path, "rows": rows, "bytes": 0, "cancelled": True}
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return {"path": path, "rows": rows, "bytes": os.path.getsize(path), "cancelled": False}
+
+def _prepend(first: Any, rest: Iterator[Any]) -> Iterator[Any]:
+    yield first
+    yield from rest
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    # Uso: python -m src.services.export_service {movements|sales|tickets} ARCHIVO[.csv|.jsonl][.gz] [YYYY-MM-DD YYYY-MM-DD]
+    if len(sys.argv) < 3 or sys.argv[1] not in ("movements", "sales", "tickets"):
+        print("Uso: python -m src.services.export_service {movements|sales|tickets} ARCHIVO [DESDE HASTA]")
+        sys.exit(2)
+    kind, target = sys.argv[1], sys.argv[2]
+    first = date.fromisoformat(sys.argv[3]) if len(sys.argv) >= 5 else None
+    last = date.fromisoformat(sys.argv[4]) if len(sys.argv) >= 5 else None
+    service = ExportService(DatabaseConnection())
+
+    def report_progress(rows: int):
+        print(f"\r{rows:,} filas...", end="", flush=True)
+
+    if kind == "movements":
+        result = service.export_stock_movements(
+            target,
+            start_date=first.isoformat() if first else None,
+            end_date=f"{last.isoformat()} 23:59:59" if last else None,
+            progress=report_progress,
+        )
+    else:
+        first = first or date(2000, 1, 1)
+        last = last or date.today()
+        export = service.export_sales if kind == "sales" else service.export_tickets
+        result = export(target, first, last, progress=report_progress)
+    print()
+    if result is None:
+        print("❌ La exportación falló; revise el log.")
+        sys.exit(1)
+    print(f"✅ {result['rows']:,} filas exportadas a {result['path']} ({result['bytes']:,} bytes).")
@@ -1,10 +1,18 @@
 import logging
 import csv
-from typing import List, Dict, Any, Optional
-from src.database.connection import DatabaseConnection, DatabaseError
+import itertools
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set, Tuple
+from src.database.connection import DatabaseConnection, DatabaseError, execute_multirow
+from src.services.recipe_cost_service import RecipeCostService
+from src.services.recipe_graph import RecipeCycleError, RecipeGraph, RecipeGraphError
 
 logger = logging.getLogger(__name__)
 
+STOCK_MOVEMENTS_QUERY = (
+    "SELECT sm.id, sm.created_at, ii.name AS item_name, sm.quantity, sm.movement_type, u.username AS user_name, sm.notes "
+    "FROM stock_movements sm JOIN inventory_items ii ON sm.inventory_item_id = ii.id LEFT JOIN users u ON sm.user_id = u.id"
+)
+
 class InventoryService:
     """
     Servicio para gestionar toda la lógica de negocio relacionada con el inventario,
@@ -12,6 +20,7 @@ class InventoryService:
     """
     def __init__(self, db_connection: DatabaseConnection):
         self.db = db_connection
+        self.recipe_costs = RecipeCostService(db_connection)
 
     def get_inventory_items(self) -> List[Dict[str, Any]]:
         """
@@ -39,11 +48,15 @@ class InventoryService:
             return None
     
     def update_inventory_item(self, item_id: int, data: Dict[str, Any]) -> bool:
-        """Actualiza un insumo existente."""
+        """Actualiza un insumo existente y propaga su costo a los productos que lo usan."""
         try:
-            query = "UPDATE inventory_items SET name = ?, unit = ?, reorder_point = ?, cost_per_unit = ? WHERE id = ?"
-            params = (data['name'], data['unit'], data['reorder_point'], data['cost_per_unit'], item_id)
-            return self.db.execute_command(query, params) > 0
+            with self.db.transaction() as cursor:
+                query = "UPDATE inventory_items SET name = %s, unit = %s, reorder_point = %s, cost_per_unit = %s WHERE id = %s"
+                cursor.execute(query, (data['name'], data['unit'], data['reorder_point'], data['cost_per_unit'], item_id))
+                if cursor.rowcount == 0:
+                    return False
+                self.recipe_costs.refresh(cursor, item_ids=[item_id])
+            return True
         except DatabaseError as e:
             logger.exception(f"Error de BD al actualizar el insumo ID {item_id}: {e}")
             return False
@@ -157,17 +170,66 @@ class InventoryService:
             logger.exception(f"Error de BD al obtener la receta para el producto ID {product_id}.")
             return []
 
+    def _load_recipe_graph(self) -> RecipeGraph:
+        return RecipeGraph(self.db.execute_query(
+            "SELECT parent_product_id, inventory_item_id, child_product_id, quantity FROM product_recipes"
+        ))
+
+    def get_recipe_graph(self) -> Optional[RecipeGraph]:
+        """Grafo completo de recetas (una sola consulta); None ante errores de BD."""
+        try:
+            return self._load_recipe_graph()
+        except DatabaseError:
+            logger.exception("Error de BD al cargar el grafo de recetas.")
+            return None
+
+    def validate_recipe(self, product_id: int, recipe_items: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Verifica que la receta no cree ciclos ni supere la anidación máxima.
+        Retorna None si es válida o un mensaje para el usuario si no.
+        """
+        graph = self.get_recipe_graph()
+        if graph is None:
+            return "No se pudo cargar la estructura de recetas."
+        try:
+            graph.with_recipe(product_id, recipe_items)
+            return None
+        except RecipeGraphError as e:
+            return self._describe_recipe_error(e)
+
+    def _describe_recipe_error(self, error: RecipeGraphError) -> str:
+        ids = error.path if isinstance(error, RecipeCycleError) else [error.product_id]
+        try:
+            placeholders = ", ".join(["?"] * len(ids))
+            rows = self.db.execute_query(f"SELECT id, name FROM products WHERE id IN ({placeholders})", tuple(ids))
+            names = {row['id']: row['name'] for row in rows}
+        except DatabaseError:
+            names = {}
+        if isinstance(error, RecipeCycleError):
+            chain = " → ".join(f"'{names.get(p, f'#{p}')}'" for p in error.path)
+            return f"La receta crea un ciclo: {chain}."
+        return (f"'{names.get(error.product_id, f'#{error.product_id}')}' quedaría con {error.depth} niveles "
+                f"de anidación (máximo {error.max_depth}).")
+
     def update_recipe_for_product(self, product_id: int, recipe_items: List[Dict[str, Any]]) -> bool:
+        """
+        Reemplaza la receta del producto; se rechaza si crea un ciclo o supera la anidación máxima.
+        En la misma transacción se recalcula el costo del producto y de los que lo contienen.
+        """
         try:
             with self.db.transaction() as cursor:
+                graph = RecipeGraph.from_cursor(cursor).with_recipe(product_id, recipe_items)
                 cursor.execute("DELETE FROM product_recipes WHERE parent_product_id = %s", (product_id,))
-                if not recipe_items: return True
                 insert_query = "INSERT INTO product_recipes (parent_product_id, inventory_item_id, child_product_id, quantity) VALUES (%s, %s, %s, %s)"
-                for item in recipe_items:
+                for item in recipe_items or []:
                     if not item.get('quantity'): continue
                     params = (product_id, item.get('inventory_item_id'), item.get('child_product_id'), item.get('quantity'))
                     cursor.execute(insert_query, params)
+                self.recipe_costs.refresh(cursor, product_ids=[product_id], graph=graph)
             return True
+        except RecipeGraphError as e:
+            logger.warning(f"Receta rechazada para el producto ID {product_id}: {e}")
+            return False
         except DatabaseError: return False
 
     def search_ingredients(self, term: str) -> List[Dict[str, Any]]:
@@ -187,10 +249,10 @@ class InventoryService:
         Retorna un diccionario: {'valid': bool, 'errors': List[str]}
         items_to_sell debe ser una lista de dicts con: {'product_id': int, 'quantity': int}
         """
-        required_inventory = {}
         errors = []
 
         try:
+            demand = {}
             for item in items_to_sell:
                 product_id = item['product_id']
                 qty_sell = item['quantity']
@@ -201,9 +263,10 @@ class InventoryService:
                 name, track = prod_info[0]['name'], prod_info[0]['track_stock']
 
                 if not track: continue
+                demand[product_id] = demand.get(product_id, 0) + qty_sell
 
-                # Obtener receta recursiva
-                self._accumulate_requirements(product_id, qty_sell, required_inventory)
+            # Explosión de recetas en una pasada sobre el orden topológico
+            required_inventory = self._load_recipe_graph().explode(demand)
 
             # Verificar contra stock actual
             for item_id, qty_needed in required_inventory.items():
@@ -217,136 +280,349 @@ class InventoryService:
 
             return {'valid': len(errors) == 0, 'errors': errors}
 
+        except RecipeGraphError as e:
+            logger.error(f"Receta inválida al validar stock: {e}")
+            return {'valid': False, 'errors': [self._describe_recipe_error(e)]}
         except DatabaseError as e:
             logger.exception(f"Error al validar stock: {e}")
             return {'valid': False, 'errors': ["Error interno al verificar inventario."]}
 
-    def _accumulate_requirements(self, product_id: int, quantity: float, requirements: Dict[int, float]):
-        """Auxiliar recursivo para sumarizar necesidades de insumos."""
-        recipe = self.get_recipe_for_product(product_id)
-        
-        # Si no tiene receta pero trackea stock, asumimos que NO consume insumos (quizás un error de config, o es un producto simple sin receta definida aún)
-        if not recipe: return 
-
-        for comp in recipe:
-            needed = comp['quantity'] * quantity
-            if comp['inventory_item_id']:
-                # Es un ingrediente base
-                requirements[comp['inventory_item_id']] = requirements.get(comp['inventory_item_id'], 0) + needed
-            elif comp['child_product_id']:
-                # Es un sub-producto
-                self._accumulate_requirements(comp['child_product_id'], needed, requirements)
-
     def deduct_stock_for_sale(self, sale_id: int, items_sold: List[Dict[str, Any]], user_id: int):
         """
         Deduce el stock para una venta, procesando las recetas de cada producto vendido.
-        Esta es la implementación de la lógica recursiva de inventario.
+        Las recetas se explotan a insumos con el grafo de recetas (sin recursión) y se
+        registra un movimiento por insumo.
         """
         try:
+            graph = self._load_recipe_graph()
+            demand = {}
+            for sale_item in items_sold:
+                product_id = sale_item['product_id']
+                demand[product_id] = demand.get(product_id, 0) + sale_item['quantity']
+                if not graph.components.get(product_id):
+                    self._warn_missing_recipe(product_id)
+            requirements = graph.explode(demand)
             with self.db.transaction():
-                for sale_item in items_sold:
-                    product_id = sale_item['product_id']
-                    quantity_sold = sale_item['quantity']
-                    self._process_product_deduction(product_id, quantity_sold, sale_id, user_id)
+                for item_id, quantity in requirements.items():
+                    self.add_stock_movement(
+                        item_id=item_id,
+                        quantity=-quantity, # Negativo porque es una salida
+                        movement_type='SALE',
+                        user_id=user_id,
+                        reference_id=sale_id,
+                        notes=f"Venta #{sale_id}"
+                    )
             return True
+        except RecipeGraphError as e:
+            logger.error(f"No se descontó stock para la venta ID {sale_id}: {e}")
+            return False
         except DatabaseError as e:
             logger.exception(f"Fallo al deducir el stock para la venta ID {sale_id}.")
             # La transacción hará rollback automáticamente.
             return False
 
-    def _process_product_deduction(self, product_id: int, quantity_sold: float, sale_id: int, user_id: int):
-        """
-        Método recursivo auxiliar para procesar el descuento de stock de un producto.
+    def _warn_missing_recipe(self, product_id: int):
+        product_info = self.db.execute_query("SELECT name, track_stock FROM products WHERE id = ?", (product_id,))
+        if product_info and product_info[0]['track_stock']:
+            logger.warning(f"El producto '{product_info[0]['name']}' (ID: {product_id}) está configurado para rastrear stock, pero no tiene receta. No se descontará nada.")
+
+    def get_stock_movements(self, start_date: Optional[str] = None, end_date: Optional[str] = None, item_id: Optional[int] = None,
+                            movement_type: Optional[str] = None, user_id: Optional[int] = None,
+                            page_size: Optional[int] = None, before: Optional[Tuple[Any, int]] = None) -> List[Dict[str, Any]]:
         """
-        # 1. Obtener la receta del producto
-        recipe = self.get_recipe_for_product(product_id)
-
-        # 2. Si no hay receta, no hay nada que descontar
-        if not recipe:
-            product_info = self.db.execute_query("SELECT name, track_stock FROM products WHERE id = ?", (product_id,))
-            if product_info and product_info[0]['track_stock']:
-                logger.warning(f"El producto '{product_info[0]['name']}' (ID: {product_id}) está configurado para rastrear stock, pero no tiene receta. No se descontará nada.")
-            return
-
-        # 3. Procesar cada item de la receta
-        for component in recipe:
-            quantity_to_deduct = component['quantity'] * quantity_sold
-
-            # Si el componente es un INSUMO (inventory_item)
-            if component['inventory_item_id']:
-                self.add_stock_movement(
-                    item_id=component['inventory_item_id'],
-                    quantity=-quantity_to_deduct, # Negativo porque es una salida
-                    movement_type='SALE',
-                    user_id=user_id,
-                    reference_id=sale_id,
-                    notes=f"Venta #{sale_id}"
-                )
-            
-            # Si el componente es otro PRODUCTO (sub-producto de un combo)
-            elif component['child_product_id']:
-                # Llamada recursiva para procesar el sub-producto
-                self._process_product_deduction(component['child_product_id'], quantity_to_deduct, sale_id, user_id)
+        Obtiene un log de los movimientos de stock, con filtros opcionales, del más
+        reciente al más antiguo por (created_at, id).
 
-    def get_stock_movements(self, start_date: Optional[str] = None, end_date: Optional[str] = None, item_id: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Obtiene un log de los movimientos de stock, con filtros opcionales."""
+        Con `page_size` se pagina por keyset: `before` es el (created_at, id) de la
+        última fila de la página anterior (ver `next_movements_cursor`), así cada
+        página cuesta lo mismo aunque el libro tenga millones de movimientos.
+        """
         try:
-            query = "SELECT sm.id, sm.created_at, ii.name AS item_name, sm.quantity, sm.movement_type, u.username AS user_name, sm.notes FROM stock_movements sm JOIN inventory_items ii ON sm.inventory_item_id = ii.id LEFT JOIN users u ON sm.user_id = u.id"
-            filters = []
-            params = []
-            if start_date:
-                filters.append("sm.created_at >= ?")
-                params.append(start_date)
-            if end_date:
-                filters.append("sm.created_at <= ?")
-                params.append(end_date)
-            if item_id:
-                filters.append("sm.inventory_item_id = ?")
-                params.append(item_id)
-            if filters:
-                query += " WHERE " + " AND ".join(filters)
-            query += " ORDER BY sm.created_at DESC"
-            return self.db.execute_query(query, tuple(params))
+            query, params = self.build_stock_movements_query(start_date, end_date, item_id, movement_type,
+                                                             user_id, page_size, before)
+            return self.db.execute_query(query, params)
         except DatabaseError as e:
             logger.exception("Error de BD al obtener los movimientos de stock.")
             return []
 
+    @staticmethod
+    def build_stock_movements_query(start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                    item_id: Optional[int] = None, movement_type: Optional[str] = None,
+                                    user_id: Optional[int] = None, page_size: Optional[int] = None,
+                                    before: Optional[Tuple[Any, int]] = None) -> Tuple[str, tuple]:
+        """(consulta, parámetros) de `get_stock_movements`; también la usa src/utils/query_plans.py."""
+        query = STOCK_MOVEMENTS_QUERY
+        filters = []
+        params = []
+        if start_date:
+            filters.append("sm.created_at >= ?")
+            params.append(start_date)
+        if end_date:
+            filters.append("sm.created_at <= ?")
+            params.append(end_date)
+        if item_id:
+            filters.append("sm.inventory_item_id = ?")
+            params.append(item_id)
+        if movement_type:
+            filters.append("sm.movement_type = ?")
+            params.append(movement_type)
+        if user_id:
+            filters.append("sm.user_id = ?")
+            params.append(user_id)
+        if before:
+            filters.append("(sm.created_at < ? OR (sm.created_at = ? AND sm.id < ?))")
+            params.extend([before[0], before[0], before[1]])
+        if filters:
+            query += " WHERE " + " AND ".join(filters)
+        query += " ORDER BY sm.created_at DESC, sm.id DESC"
+        if page_size:
+            query += f" LIMIT {int(page_size)}"
+        return query, tuple(params)
+
+    @staticmethod
+    def next_movements_cursor(page: List[Dict[str, Any]], page_size: int) -> Optional[Tuple[Any, int]]:
+        """Cursor `before` para la página siguiente, o None si `page` fue la última."""
+        if len(page) < page_size:
+            return None
+        return (page[-1]['created_at'], page[-1]['id'])
+
+    def get_movement_filter_options(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Tipos de movimiento presentes en el libro y usuarios, para los filtros de la vista."""
+        try:
+            types = self.db.execute_query("SELECT DISTINCT movement_type FROM stock_movements ORDER BY movement_type")
+            users = self.db.execute_query("SELECT id, username FROM users ORDER BY username")
+            return {'movement_types': [row['movement_type'] for row in types], 'users': users}
+        except DatabaseError:
+            logger.exception("Error de BD al obtener las opciones de filtro de movimientos.")
+            return {'movement_types': [], 'users': []}
+
     # --- Métodos de Importación CSV ---
+    def _validate_import_row(self, i: int, row: Dict[str, Any], known: Dict[bytes, Optional[int]],
+                             name_keys: Dict[str, bytes]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Valida una fila del CSV. Retorna ('create' | 'update' | 'error', datos). `known` mapea
+        la clave de collation del nombre -> id (None para insumos que el mismo archivo ya creó)
+        y se actualiza; `name_keys` trae la clave de cada nombre (ver `_import_name_keys`).
+        """
+        name = (row.get('nombre') or '').strip()
+        if not name:
+            return 'error', {'row': i, 'error': "La columna 'nombre' no puede estar vacía."}
+        try:
+            quantity = float(row.get('cantidad_a_añadir') or 0)
+            cost = float(row.get('costo_unitario') or 0)
+            reorder = float(row.get('punto_reorden') or 0)
+            unit = (row.get('unidad_medida') or '').strip()
+        except (ValueError, TypeError):
+            return 'error', {'row': i, 'name': name, 'error': "Cantidad, costo o punto de reorden contienen valores no numéricos."}
+        key = name_keys[name]
+        if key in known:
+            return 'update', {'id': known[key], 'name': name, 'unit': unit, 'quantity': quantity, 'cost_per_unit': cost,
+                              'notes': f"Reabastecimiento por CSV. Costo actualizado a {cost:.2f}"}
+        if not unit:
+            return 'error', {'row': i, 'name': name, 'error': "La 'unidad_medida' es requerida para insumos nuevos."}
+        known[key] = None
+        return 'create', {'name': name, 'unit': unit, 'current_stock': quantity, 'reorder_point': reorder, 'cost_per_unit': cost}
+
+    def _validate_import_rows(self, rows: Iterable[Dict[str, Any]], known: Dict[bytes, Optional[int]],
+                              block_size: int = 500) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """Valida filas en bloques (una consulta de claves por bloque); genera (fila, tipo, datos)."""
+        rows = iter(rows)
+        collation = None
+        first = 1
+        while True:
+            block = list(itertools.islice(rows, block_size))
+            if not block:
+                return
+            collation = collation or self._name_collation()
+            name_keys = self._import_name_keys([(r.get('nombre') or '').strip() for r in block], collation)
+            for offset, row in enumerate(block):
+                yield (first + offset,) + self._validate_import_row(first + offset, row, known, name_keys)
+            first += len(block)
+
+    def _name_collation(self) -> Tuple[str, str]:
+        """(charset, collation) de inventory_items.name, la que usa uq_inventory_items_name."""
+        row = self.db.execute_query(
+            """SELECT CHARACTER_SET_NAME AS charset, COLLATION_NAME AS collation FROM information_schema.COLUMNS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'inventory_items' AND COLUMN_NAME = 'name'"""
+        )
+        charset, collation = (row[0]['charset'], row[0]['collation']) if row else ('utf8mb4', 'utf8mb4_0900_ai_ci')
+        if not (charset.isidentifier() and collation.isidentifier()):
+            raise DatabaseError(f"Collation inesperada para inventory_items.name: {charset}/{collation}")
+        return charset, collation
+
+    def _import_name_keys(self, names: List[str], name_collation: Tuple[str, str]) -> Dict[str, bytes]:
+        """
+        Clave de comparación de cada nombre según la collation de la columna (WEIGHT_STRING),
+        calculada por MySQL: 'Azucar' y 'Azúcar' tienen la misma clave si el índice único los
+        considera iguales, igual que en el upsert de `_bulk_import_rows`.
+        """
+        names = [name for name in dict.fromkeys(names) if name]
+        if not names:
+            return {}
+        charset, collation = name_collation
+        lookups = " UNION ALL ".join(
+            [f"SELECT %s AS pos, WEIGHT_STRING(CONVERT(%s USING {charset}) COLLATE {collation}) AS name_key"] * len(names)
+        )
+        rows = self.db.execute_query(lookups, tuple(value for pos, name in enumerate(names) for value in (pos, name)))
+        return {names[int(row['pos'])]: bytes(row['name_key']) for row in rows}
+
+    def _known_item_names(self) -> Dict[bytes, Optional[int]]:
+        rows = self.db.execute_query("SELECT id, WEIGHT_STRING(name) AS name_key FROM inventory_items")
+        return {bytes(row['name_key']): row['id'] for row in rows}
+
     def analyze_inventory_csv(self, csv_data: List[Dict]) -> Dict[str, Any]:
         """Analiza datos de un CSV, valida y prepara un resumen sin modificar la BD."""
         analysis = {'to_create': [], 'to_update': [], 'errors': []}
-        existing_items = {item['name']: item for item in self.get_inventory_items()}
-        for i, row in enumerate(csv_data, 1):
-            name = row.get('nombre')
-            if not name:
-                analysis['errors'].append({'row': i, 'error': "La columna 'nombre' no puede estar vacía."})
-                continue
-            try:
-                quantity = float(row.get('cantidad_a_añadir', 0))
-                cost = float(row.get('costo_unitario', 0))
-                reorder = float(row.get('punto_reorden', 0))
-                unit = row.get('unidad_medida')
-            except (ValueError, TypeError):
-                analysis['errors'].append({'row': i, 'name': name, 'error': "Cantidad, costo o punto de reorden contienen valores no numéricos."})
-                continue
-            if name in existing_items:
-                item = existing_items[name]
-                analysis['to_update'].append({'id': item['id'], 'name': name, 'quantity': quantity, 'notes': f"Reabastecimiento por CSV. Costo actualizado a {cost:.2f}"})
-            else:
-                if not unit:
-                    analysis['errors'].append({'row': i, 'name': name, 'error': "La 'unidad_medida' es requerida para insumos nuevos."})
-                    continue
-                analysis['to_create'].append({'name': name, 'unit': unit, 'current_stock': quantity, 'reorder_point': reorder, 'cost_per_unit': cost})
+        try:
+            known = self._known_item_names()
+        except DatabaseError:
+            logger.exception("Error de BD al obtener los insumos para analizar el CSV.")
+            known = {}
+        targets = {'create': analysis['to_create'], 'update': analysis['to_update'], 'error': analysis['errors']}
+        try:
+            for _, kind, data in self._validate_import_rows(csv_data, known):
+                targets[kind].append(data)
+        except DatabaseError:
+            logger.exception("Error de BD al comparar los nombres del CSV con los insumos.")
+            analysis['errors'].append({'row': 0, 'error': "No se pudieron verificar los nombres contra el inventario."})
         return analysis
 
+    def analyze_inventory_csv_file(self, path: str, preview_limit: int = 50, error_limit: int = 100) -> Dict[str, Any]:
+        """
+        Analiza un CSV leyéndolo fila a fila, sin cargarlo en memoria: solo conserva los
+        conteos, las primeras `preview_limit` filas de cada tipo y una muestra de hasta
+        `error_limit` errores. Retorna las mismas claves que `analyze_inventory_csv` más
+        'counts' ({'rows', 'to_create', 'to_update', 'errors'}) y 'path'.
+        """
+        analysis: Dict[str, Any] = {'path': path, 'to_create': [], 'to_update': [], 'errors': [],
+                                    'counts': {'rows': 0, 'to_create': 0, 'to_update': 0, 'errors': 0}}
+        known = self._known_item_names()
+        counts = analysis['counts']
+        targets = {'create': ('to_create', preview_limit), 'update': ('to_update', preview_limit), 'error': ('errors', error_limit)}
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for i, kind, data in self._validate_import_rows(csv.DictReader(f), known):
+                key, limit = targets[kind]
+                counts[key] += 1
+                if len(analysis[key]) < limit:
+                    analysis[key].append(data)
+                counts['rows'] = i
+        return analysis
+
+    def import_inventory_csv_file(self, path: str, user_id: int, chunk_size: int = 1000) -> bool:
+        """
+        Importa un CSV ya analizado leyéndolo de nuevo en streaming y aplicando bloques de
+        `chunk_size` filas con `_bulk_import_rows`, todo en una sola transacción. Si alguna
+        fila resulta inválida (ej. el catálogo cambió desde el análisis) se revierte todo.
+        """
+        try:
+            known = self._known_item_names()
+            cost_changed: Set[int] = set()
+            with self.db.transaction() as cursor, open(path, 'r', encoding='utf-8-sig', newline='') as f:
+                pending: List[Dict[str, Any]] = []
+                for i, kind, data in self._validate_import_rows(csv.DictReader(f), known):
+                    if kind == 'error':
+                        raise ValueError(f"Fila {i}: {data['error']}")
+                    pending.append(self._import_row(kind, data))
+                    if len(pending) >= chunk_size:
+                        self._bulk_import_rows(cursor, pending, user_id, chunk_size, cost_changed)
+                        pending = []
+                self._bulk_import_rows(cursor, pending, user_id, chunk_size, cost_changed)
+                self.recipe_costs.refresh(cursor, item_ids=cost_changed)
+            return True
+        except (DatabaseError, OSError, ValueError, UnicodeDecodeError):
+            logger.exception(f"Falló la importación de inventario desde '{path}'; se revirtió completa.")
+            return False
+
+    @staticmethod
+    def _import_row(kind: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Normaliza una fila validada al formato de `_bulk_import_rows`."""
+        if kind == 'create':
+            return {'name': data['name'], 'unit': data['unit'], 'quantity': data['current_stock'],
+                    'reorder_point': data['reorder_point'], 'cost_per_unit': data['cost_per_unit'], 'notes': "Stock inicial"}
+        return {'name': data['name'], 'unit': data.get('unit'), 'quantity': data['quantity'],
+                'reorder_point': data.get('reorder_point', 0), 'cost_per_unit': data.get('cost_per_unit'), 'notes': data.get('notes')}
+
     def execute_inventory_import(self, validated_data: Dict[str, Any], user_id: int) -> bool:
-        """Ejecuta la importación de inventario validada en una sola transacción."""
+        """
+        Ejecuta la importación de inventario validada en una sola transacción: upsert
+        masivo de insumos por nombre (uq_inventory_items_name) y un insert multi-fila de
+        movimientos. Un error en cualquier bloque revierte la importación completa.
+        """
+        rows = [self._import_row('create', item) for item in validated_data.get('to_create', [])]
+        rows += [self._import_row('update', item) for item in validated_data.get('to_update', [])]
         try:
-            for item_data in validated_data.get('to_create', []):
-                self.create_inventory_item(item_data)
-            for item_data in validated_data.get('to_update', []):
-                self.add_stock_movement(item_id=item_data['id'], quantity=item_data['quantity'], movement_type='RESTOCK', user_id=user_id, notes=item_data.get('notes'))
+            cost_changed: Set[int] = set()
+            with self.db.transaction() as cursor:
+                self._bulk_import_rows(cursor, rows, user_id, cost_changed=cost_changed)
+                self.recipe_costs.refresh(cursor, item_ids=cost_changed)
             return True
         except DatabaseError as e:
-            logger.exception("Falló la ejecución de la importación de inventario.")
-            return False
\ No newline at end of file
+            logger.exception("Falló la ejecución de la importación de inventario; se revirtió completa.")
+            return False
+
+    @staticmethod
+    def _resolve_item_ids(cursor, names: List[str], block_size: int = 500) -> Dict[str, Optional[int]]:
+        """
+        {nombre tal como viene: id del insumo o None}. Cada nombre se compara con `name = %s`,
+        así MySQL aplica la collation de la columna (mayúsculas y tildes) y cada búsqueda usa
+        el índice único; un bloque de nombres es una sola consulta.
+        """
+        ids: Dict[str, Optional[int]] = {}
+        for start in range(0, len(names), block_size):
+            block = names[start:start + block_size]
+            lookups = " UNION ALL ".join(
+                ["SELECT %s AS pos, (SELECT id FROM inventory_items WHERE name = %s) AS id"] * len(block)
+            )
+            cursor.execute(lookups, [value for pos, name in enumerate(block) for value in (pos, name)])
+            for row in cursor.fetchall():
+                ids[block[int(row['pos'])]] = row['id']
+        return ids
+
+    def _bulk_import_rows(self, cursor, rows: List[Dict[str, Any]], user_id: Optional[int], chunk_size: int = 1000,
+                          cost_changed: Optional[Set[int]] = None) -> int:
+        """
+        Aplica filas de importación sobre el cursor transaccional, en bloques de `chunk_size`:
+        insumos nuevos se crean con su stock; existentes suman la cantidad (y actualizan el
+        costo si la fila lo trae). Cada fila genera su movimiento INITIAL o RESTOCK.
+        Los ids de insumos existentes cuyo costo se actualizó se agregan a `cost_changed`.
+        """
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            names = list(dict.fromkeys(row['name'] for row in chunk))
+            # La identidad de un insumo la decide la collation de uq_inventory_items_name
+            # (ej. 'Azucar' = 'Azúcar'), por eso los ids se resuelven en MySQL y no en Python.
+            existing = {item_id for item_id in self._resolve_item_ids(cursor, names).values() if item_id}
+
+            execute_multirow(
+                cursor,
+                "INSERT INTO inventory_items (name, unit, current_stock, reorder_point, cost_per_unit)",
+                [(row['name'], row['unit'] or '', row['quantity'], row['reorder_point'] or 0, row['cost_per_unit'] or 0)
+                 for row in chunk],
+                "AS new ON DUPLICATE KEY UPDATE current_stock = inventory_items.current_stock + new.current_stock, "
+                "cost_per_unit = IF(new.cost_per_unit > 0, new.cost_per_unit, inventory_items.cost_per_unit)",
+                chunk_size=chunk_size,
+            )
+
+            ids = self._resolve_item_ids(cursor, names)
+            unresolved = [name for name, item_id in ids.items() if not item_id]
+            if unresolved:
+                raise DatabaseError(f"No se encontraron los insumos importados: {', '.join(unresolved[:5])}")
+            movements = []
+            for row in chunk:
+                item_id = ids[row['name']]
+                if item_id in existing:
+                    movements.append((item_id, row['quantity'], 'RESTOCK', user_id, row['notes']))
+                    if cost_changed is not None and (row['cost_per_unit'] or 0) > 0:
+                        cost_changed.add(item_id)
+                else:
+                    # Solo la primera fila de un insumo nuevo es su stock inicial; las repetidas reabastecen.
+                    existing.add(item_id)
+                    if row['quantity'] != 0:
+                        movements.append((item_id, row['quantity'], 'INITIAL', user_id, "Stock inicial"))
+            execute_multirow(
+                cursor,
+                "INSERT INTO stock_movements (inventory_item_id, quantity, movement_type, user_id, notes)",
+                movements,
+                chunk_size=chunk_size,
+            )
+        return len(rows)
@@ -0,0 +1,224 @@
+import bisect
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from src.models.models import Movie
+
+# Peso de cada campo en el puntaje de relevancia.
+FIELD_WEIGHTS = {"title": 5.0, "original_title": 3.0, "tags": 3.0, "genre": 2.0, "synopsis": 1.0}
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+def normalize_text(text: Optional[str]) -> str:
+    """Minúsculas y sin tildes, para que 'Acción' y 'accion' coincidan."""
+    if not text:
+        return ""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall(normalize_text(text))
+
+def facet_key(value: Optional[str]) -> str:
+    """Clave de faceta: la BD guarda 'ACTIVE' y el enum 'Active'; se comparan sin mayúsculas."""
+    return (value or "").strip().casefold()
+
+@dataclass
+class CatalogSearchResult:
+    """Películas ordenadas por relevancia y conteos por faceta (clave normalizada -> cantidad)."""
+    movies: List[Movie] = field(default_factory=list)
+    total: int = 0
+    status_counts: Dict[str, int] = field(default_factory=dict)
+    tag_counts: Dict[str, int] = field(default_factory=dict)
+    genre_counts: Dict[str, int] = field(default_factory=dict)
+
+class MovieCatalogIndex:
+    """
+    Índice invertido en memoria del catálogo de películas.
+
+    Cada token (título, título original, género, etiquetas y sinopsis) apunta a
+    las películas que lo contienen con un peso por campo; las facetas (estado,
+    etiqueta, género) se guardan como conjuntos de ids. La búsqueda intersecta
+    las listas de los términos (el último término se trata como prefijo para
+    búsqueda mientras se escribe) y las facetas se cuentan sobre el resultado
+    aplicando los demás filtros. Las altas, cambios y bajas son incrementales.
+    """
+    def __init__(self, movies: Iterable[Movie] = ()):
+        self._lock = threading.RLock()
+        self._movies: Dict[int, Movie] = {}
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._vocabulary: List[str] = [] # Tokens ordenados, para expandir prefijos con bisect.
+        self._tokens_by_movie: Dict[int, Set[str]] = {}
+        self._by_status: Dict[str, Set[int]] = defaultdict(set)
+        self._by_tag: Dict[str, Set[int]] = defaultdict(set)
+        self._by_genre: Dict[str, Set[int]] = defaultdict(set)
+        self._sort_keys: Dict[int, str] = {}
+        self._labels: Dict[str, str] = {} # clave de faceta -> texto original para mostrar
+        for movie in movies:
+            self.upsert(movie)
+
+    def __len__(self) -> int:
+        return len(self._movies)
+
+    def __contains__(self, movie_id: int) -> bool:
+        return movie_id in self._movies
+
+    def get(self, movie_id: int) -> Optional[Movie]:
+        return self._movies.get(movie_id)
+
+    def facet_label(self, key: str) -> str:
+        """Texto para mostrar de una clave de faceta normalizada."""
+        return self._labels.get(key, key)
+
+    # --- Mantenimiento incremental ---
+    def upsert(self, movie: Movie):
+        """Agrega o reemplaza una película en el índice."""
+        if movie.id is None:
+            return
+        with self._lock:
+            self._remove_unlocked(movie.id)
+            weights: Dict[str, float] = {}
+            for field_name, weight in FIELD_WEIGHTS.items():
+                value = getattr(movie, field_name)
+                texts = value if isinstance(value, list) else [value]
+                for text in texts:
+                    for token in tokenize(text):
+                        weights[token] = weights.get(token, 0.0) + weight
+            for token, weight in weights.items():
+                postings = self._postings[token]
+                if not postings:
+                    bisect.insort(self._vocabulary, token)
+                postings[movie.id] = weight
+
+            self._movies[movie.id] = movie
+            self._tokens_by_movie[movie.id] = set(weights)
+            self._sort_keys[movie.id] = normalize_text(movie.title)
+            for value in [movie.status, movie.genre, *(movie.tags or [])]:
+                if value and value.strip():
+                    self._labels.setdefault(facet_key(value), value.strip())
+            self._by_status[facet_key(movie.status)].add(movie.id)
+            self._by_genre[facet_key(movie.genre)].add(movie.id)
+            for tag in {facet_key(t) for t in movie.tags or []}:
+                self._by_tag[tag].add(movie.id)
+
+    def remove(self, movie_id: int):
+        """Quita una película del índice (no falla si no existe)."""
+        with self._lock:
+            self._remove_unlocked(movie_id)
+
+    def _remove_unlocked(self, movie_id: int):
+        movie = self._movies.pop(movie_id, None)
+        if movie is None:
+            return
+        for token in self._tokens_by_movie.pop(movie_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(movie_id, None)
+            if not postings:
+                del self._postings[token]
+                i = bisect.bisect_left(self._vocabulary, token)
+                if i < len(self._vocabulary) and self._vocabulary[i] == token:
+                    del self._vocabulary[i]
+        self._sort_keys.pop(movie_id, None)
+        self._discard(self._by_status, facet_key(movie.status), movie_id)
+        self._discard(self._by_genre, facet_key(movie.genre), movie_id)
+        for tag in {facet_key(t) for t in movie.tags or []}:
+            self._discard(self._by_tag, tag, movie_id)
+
+    @staticmethod
+    def _discard(facet: Dict[str, Set[int]], key: str, movie_id: int):
+        ids = facet.get(key)
+        if ids is not None:
+            ids.discard(movie_id)
+            if not ids:
+                del facet[key]
+
+    # --- Búsqueda ---
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\uffff")
+        return self._vocabulary[start:end]
+
+    def _match(self, query: str) -> Optional[Dict[int, float]]:
+        """Puntajes de las películas que contienen todos los términos; None = sin texto (todas)."""
+        terms = tokenize(query)
+        if not terms:
+            return None
+        scores: Optional[Dict[int, float]] = None
+        for position, term in enumerate(terms):
+            if position == len(terms) - 1:
+                # Último término: prefijo. Las coincidencias exactas puntúan el doble.
+                term_scores: Dict[int, float] = {}
+                for token in self._expand_prefix(term):
+                    factor = 2.0 if token == term else 1.0
+                    for movie_id, weight in self._postings[token].items():
+                        term_scores[movie_id] = max(term_scores.get(movie_id, 0.0), weight * factor)
+            else:
+                term_scores = {mid: w * 2.0 for mid, w in self._postings.get(term, {}).items()}
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {mid: s + term_scores[mid] for mid, s in scores.items() if mid in term_scores}
+            if not scores:
+                return {}
+        return scores
+
+    def search(
+        self,
+        query: str = "",
+        status: Optional[str] = None,
+        tag: Optional[str] = None,
+        genre: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> CatalogSearchResult:
+        """
+        Búsqueda por relevancia con filtros de faceta opcionales.
+        Sin texto, el orden es alfabético por título. Los conteos de cada faceta
+        se calculan con los demás filtros aplicados (facetas disyuntivas).
+        """
+        with self._lock:
+            scores = self._match(query)
+            matched: Set[int] = set(self._movies) if scores is None else set(scores)
+
+            filters = {
+                "status": self._by_status.get(facet_key(status), set()) if status else None,
+                "tag": self._by_tag.get(facet_key(tag), set()) if tag else None,
+                "genre": self._by_genre.get(facet_key(genre), set()) if genre else None,
+            }
+
+            def restricted(skip: Optional[str]) -> Set[int]:
+                ids = matched
+                for name, allowed in filters.items():
+                    if name != skip and allowed is not None:
+                        ids = ids & allowed
+                return ids
+
+            result_ids = restricted(None)
+            result = CatalogSearchResult(total=len(result_ids))
+            result.status_counts = self._count(restricted("status"), lambda m: [m.status])
+            result.tag_counts = self._count(restricted("tag"), lambda m: {facet_key(t) for t in m.tags or []})
+            result.genre_counts = self._count(restricted("genre"), lambda m: [m.genre])
+
+            if scores is None:
+                ordered = sorted(result_ids, key=lambda mid: self._sort_keys[mid])
+            else:
+                ordered = sorted(result_ids, key=lambda mid: (-scores[mid], self._sort_keys[mid]))
+            if limit is not None:
+                ordered = ordered[:limit]
+            result.movies = [self._movies[mid] for mid in ordered]
+            return result
+
+    def _count(self, ids: Set[int], values) -> Dict[str, int]:
+        counts: Counter = Counter()
+        for movie_id in ids:
+            for value in values(self._movies[movie_id]):
+                key = facet_key(value)
+                if key:
+                    counts[key] += 1
+        return dict(counts)
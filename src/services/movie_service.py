@@ -1,10 +1,19 @@
 import logging
-from typing import List, Dict, Optional, Any
-from src.database.connection import DatabaseConnection, DatabaseError
+import threading
+from typing import List, Dict, Optional, Any, Tuple
+from src.database.connection import DatabaseConnection, DatabaseError, execute_multirow
 from src.models.models import Movie, MovieStatus
+from src.services.movie_catalog import MovieCatalogIndex, tokenize
 
 logger = logging.getLogger(__name__)
 
+# Índice de catálogo compartido por todas las instancias del servicio (proceso único de la app).
+_catalog: Optional[MovieCatalogIndex] = None
+_catalog_lock = threading.Lock()
+
+# Términos de búsqueda que se traducen a filtros LIKE cuando se busca en la BD.
+_MAX_SEARCH_TERMS = 5
+
 class MovieService:
     """
     Servicio para gestionar el catálogo de películas (Repositorio).
@@ -13,33 +22,55 @@ class MovieService:
     def __init__(self, db_connection: DatabaseConnection):
         self.db = db_connection
 
-    def get_all_movies(self, status: Optional[str] = None) -> List[Movie]:
+    def get_all_movies(self, status: Optional[str] = None, page_size: Optional[int] = None,
+                       after: Optional[Tuple[str, int]] = None, search: Optional[str] = None) -> List[Movie]:
         """
-        Obtiene todas las películas y sus etiquetas de forma optimizada, 
-        opcionalmente filtradas por estado.
+        Obtiene las películas y sus etiquetas de forma optimizada, opcionalmente
+        filtradas por estado y ordenadas por (título, id).
+
+        Con `page_size` se pagina por keyset: `after` es el (title, id) de la
+        última película de la página anterior (ver `next_page_cursor`), así cada
+        página cuesta lo mismo sin importar cuántas películas haya antes.
+
+        `search` filtra en la BD: cada término debe aparecer en el título, el
+        título original, el género o alguna etiqueta. Es la búsqueda que se usa
+        mientras el índice del catálogo (`get_catalog`) no está cargado.
         """
         try:
-            # GROUP_CONCAT concatena tags en una sola cadena para optimizar la consulta.
-            query = """
+            filters = []
+            params: List[Any] = []
+            if status:
+                # Se usa alias m.status para evitar ambigüedades.
+                filters.append("m.status = %s")
+                params.append(status)
+            for term in tokenize(search)[:_MAX_SEARCH_TERMS]:
+                filters.append(
+                    "(m.title LIKE %s OR m.original_title LIKE %s OR m.genre LIKE %s OR EXISTS ("
+                    "SELECT 1 FROM movies_tags_association mta JOIN movie_tags t ON mta.tag_id = t.id "
+                    "WHERE mta.movie_id = m.id AND t.name LIKE %s))"
+                )
+                params.extend([f"%{term}%"] * 4)
+            if after:
+                filters.append("(m.title > %s OR (m.title = %s AND m.id > %s))")
+                params.extend([after[0], after[0], after[1]])
+            where = (" WHERE " + " AND ".join(filters)) if filters else ""
+            limit = f" LIMIT {int(page_size)}" if page_size else ""
+
+            # Las etiquetas se concatenan con una subconsulta por fila (PK de la asociación) para
+            # que el ORDER BY ... LIMIT se resuelva directo sobre idx_movies_status_title.
+            query = f"""
                 SELECT 
                     m.id, m.title, m.original_title, m.duration_minutes, m.rating, 
                     m.genre, m.synopsis, m.poster_url, m.trailer_url, m.status, m.created_at,
-                    GROUP_CONCAT(t.name ORDER BY t.name ASC SEPARATOR ',') AS tags
-                FROM 
-                    movies m
-                LEFT JOIN 
-                    movies_tags_association mta ON m.id = mta.movie_id
-                LEFT JOIN 
-                    movie_tags t ON mta.tag_id = t.id
+                    (
+                        SELECT GROUP_CONCAT(t.name ORDER BY t.name ASC SEPARATOR ',')
+                        FROM movies_tags_association mta
+                        JOIN movie_tags t ON mta.tag_id = t.id
+                        WHERE mta.movie_id = m.id
+                    ) AS tags
+                FROM movies m{where}
+                ORDER BY m.title ASC, m.id ASC{limit}
             """
-            params = []
-            if status:
-                # Se usa alias m.status para evitar ambigüedades.
-                query += " WHERE m.status = %s"
-                params.append(status)
-            
-            query += " GROUP BY m.id ORDER BY m.title ASC"
-            
             results = self.db.execute_query(query, tuple(params))
             
             movies = []
@@ -68,6 +99,13 @@ class MovieService:
             logger.exception(f"Error al obtener películas de forma optimizada: {e}")
             return []
 
+    @staticmethod
+    def next_page_cursor(page: List[Movie], page_size: int) -> Optional[Tuple[str, int]]:
+        """Cursor `after` para la página siguiente, o None si `page` fue la última."""
+        if len(page) < page_size:
+            return None
+        return (page[-1].title, page[-1].id)
+
     def get_movie_by_id(self, movie_id: int) -> Optional[Movie]:
         """Obtiene una película por su ID, incluyendo sus etiquetas, de forma optimizada."""
         try:
@@ -129,7 +167,8 @@ class MovieService:
             
             if movie.tags:
                 self.update_movie_tags(movie_id, movie.tags)
-                
+
+            self._refresh_catalog_entry(movie_id)
             return movie_id
         except DatabaseError as e:
             logger.exception(f"Error al crear película: {e}")
@@ -153,7 +192,8 @@ class MovieService:
             
             if movie.tags is not None: # Si se pasa una lista (incluso vacía), se actualiza
                 self.update_movie_tags(movie.id, movie.tags)
-                
+
+            self._refresh_catalog_entry(movie.id)
             return rows_affected > 0 or movie.tags is not None
         except DatabaseError as e:
             logger.exception(f"Error al actualizar película {movie.id}: {e}")
@@ -164,11 +204,39 @@ class MovieService:
         try:
             # ON DELETE CASCADE en la FK se encarga de limpiar las asociaciones.
             rows_affected = self.db.execute_command("DELETE FROM movies WHERE id = %s", (movie_id,))
+            if rows_affected > 0 and _catalog is not None:
+                _catalog.remove(movie_id)
             return rows_affected > 0
         except DatabaseError as e:
             logger.exception(f"Error al eliminar película {movie_id}: {e}")
             return False
 
+    def get_catalog(self, reload: bool = False) -> MovieCatalogIndex:
+        """
+        Retorna el índice en memoria del catálogo completo (todos los estados).
+        Se carga una sola vez; create/update/delete lo mantienen al día.
+        """
+        global _catalog
+        with _catalog_lock:
+            if _catalog is None or reload:
+                _catalog = MovieCatalogIndex(self.get_all_movies())
+            return _catalog
+
+    @staticmethod
+    def get_loaded_catalog() -> Optional[MovieCatalogIndex]:
+        """El índice del catálogo si ya fue cargado por alguna vista; no lo carga."""
+        return _catalog
+
+    def _refresh_catalog_entry(self, movie_id: int):
+        """Re-indexa una película tras un cambio (solo si el índice ya fue cargado)."""
+        if _catalog is None:
+            return
+        movie = self.get_movie_by_id(movie_id)
+        if movie:
+            _catalog.upsert(movie)
+        else:
+            _catalog.remove(movie_id)
+
     def get_movie_tags(self, movie_id: int) -> List[str]:
         """Obtiene las etiquetas asociadas a una película."""
         try:
@@ -193,26 +261,58 @@ class MovieService:
             logger.exception("Error al obtener todas las etiquetas")
             return []
 
-    def update_movie_tags(self, movie_id: int, tags: List[str]):
-        """Actualiza las etiquetas de una película (Borra y Recrea)."""
+    def update_movie_tags(self, movie_id: int, tags: List[str]) -> bool:
+        """
+        Sincroniza las etiquetas de una película en una sola transacción:
+        resuelve los nombres con un único IN, crea en bloque los que faltan y
+        aplica solo la diferencia de asociaciones.
+        """
         try:
-            tag_ids = []
-            for tag_name in tags:
-                res = self.db.execute_query("SELECT id FROM movie_tags WHERE name = %s", (tag_name,))
-                if res:
-                    tag_ids.append(res[0]['id'])
-                else:
-                    new_id = self.db.execute_insert("INSERT INTO movie_tags (name) VALUES (%s)", (tag_name,))
-                    tag_ids.append(new_id)
-            
-            self.db.execute_command("DELETE FROM movies_tags_association WHERE movie_id = %s", (movie_id,))
-            
-            if tag_ids:
-                # Se usa un loop de inserts por simplicidad en lugar de executemany.
-                for tid in tag_ids:
-                    self.db.execute_insert(
-                        "INSERT INTO movies_tags_association (movie_id, tag_id) VALUES (%s, %s)",
-                        (movie_id, tid)
-                    )
+            with self.db.transaction() as cursor:
+                self._sync_movie_tags(cursor, movie_id, tags)
+            return True
         except DatabaseError as e:
             logger.exception(f"Error al actualizar tags para película {movie_id}: {e}")
+            return False
+
+    def _sync_movie_tags(self, cursor, movie_id: int, tags: List[str]):
+        """Aplica la sincronización de etiquetas sobre un cursor transaccional ya abierto."""
+        # Normaliza: sin vacíos ni duplicados (la colación de MySQL no distingue mayúsculas).
+        wanted: Dict[str, str] = {}
+        for tag_name in tags:
+            name = (tag_name or "").strip()
+            if name and name.casefold() not in wanted:
+                wanted[name.casefold()] = name
+
+        tag_ids: Dict[str, int] = {}
+        if wanted:
+            names = list(wanted.values())
+            placeholders = ", ".join(["%s"] * len(names))
+            cursor.execute(f"SELECT id, name FROM movie_tags WHERE name IN ({placeholders})", names)
+            tag_ids = {row['name'].casefold(): row['id'] for row in cursor.fetchall()}
+
+            missing = [(name,) for key, name in wanted.items() if key not in tag_ids]
+            if missing:
+                # Si otra sesión crea la misma etiqueta en paralelo (name es UNIQUE), el upsert no-op la
+                # conserva sin error; INSERT IGNORE emitiría el warning 1062 y abortaría la transacción.
+                execute_multirow(
+                    cursor, "INSERT INTO movie_tags (name)", missing,
+                    "AS new ON DUPLICATE KEY UPDATE name = movie_tags.name"
+                )
+                placeholders = ", ".join(["%s"] * len(missing))
+                cursor.execute(f"SELECT id, name FROM movie_tags WHERE name IN ({placeholders})", [m[0] for m in missing])
+                tag_ids.update({row['name'].casefold(): row['id'] for row in cursor.fetchall()})
+
+        new_ids = set(tag_ids.values())
+        cursor.execute("SELECT tag_id FROM movies_tags_association WHERE movie_id = %s FOR UPDATE", (movie_id,))
+        current_ids = {row['tag_id'] for row in cursor.fetchall()}
+
+        to_remove = current_ids - new_ids
+        if to_remove:
+            placeholders = ", ".join(["%s"] * len(to_remove))
+            cursor.execute(
+                f"DELETE FROM movies_tags_association WHERE movie_id = %s AND tag_id IN ({placeholders})",
+                [movie_id, *sorted(to_remove)]
+            )
+        to_add = [(movie_id, tag_id) for tag_id in sorted(new_ids - current_ids)]
+        execute_multirow(cursor, "INSERT INTO movies_tags_association (movie_id, tag_id)", to_add)
@@ -0,0 +1,222 @@
+import logging
+import time as time_module
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.database.connection import DatabaseConnection, DatabaseError
+from src.models.seat_layout import SeatLayout, EMPTY_CELL
+from src.services.report_service import ChunkCallback, ColumnarTable, ReportService, group_by_key
+from src.services.theater_service import TheaterService
+
+logger = logging.getLogger(__name__)
+
+# Franjas horarias por hora de inicio de la función: (nombre, hora desde, hora hasta).
+DAY_PARTS = (
+    ("Matiné", 0, 15),
+    ("Tarde", 15, 18),
+    ("Noche", 18, 22),
+    ("Trasnoche", 22, 24),
+)
+
+@dataclass
+class SeatHeatmap:
+    """Popularidad por asiento de una sala: vendidas / funciones, sobre la parrilla del layout."""
+    theater_id: int
+    width: int
+    height: int
+    showtimes: int
+    counts: np.ndarray # (height, width) entradas vendidas por celda
+    layout: SeatLayout
+
+    @property
+    def popularity(self) -> np.ndarray:
+        if not self.showtimes:
+            return np.zeros_like(self.counts, dtype=np.float64)
+        return self.counts / self.showtimes
+
+@dataclass
+class OccupancyReport:
+    """Ocupación (factor de carga) de las funciones de un rango de fechas."""
+    date_from: date
+    date_to: date
+    showtimes: int = 0
+    tickets: int = 0
+    capacity: int = 0
+    load_factor: float = 0.0 # Entradas / asientos ofrecidos en todo el rango
+    by_movie: List[Dict[str, Any]] = field(default_factory=list)
+    by_theater: List[Dict[str, Any]] = field(default_factory=list)
+    by_day_part: List[Dict[str, Any]] = field(default_factory=list)
+    by_weekday: List[Dict[str, Any]] = field(default_factory=list)
+    worst_showtimes: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+def _load_rows(keys: np.ndarray, sold: np.ndarray, capacity: np.ndarray, key_name: str) -> List[Dict[str, Any]]:
+    """Agrupa funciones por clave: funciones, entradas, asientos y factor de carga ponderado."""
+    unique, counts, (sold_sum, capacity_sum) = group_by_key(keys, sold, capacity)
+    load = np.divide(sold_sum, capacity_sum, out=np.zeros_like(sold_sum), where=capacity_sum > 0)
+    order = np.argsort(-load, kind="stable")
+    return [{key_name: int(unique[i]), "showtimes": int(counts[i]), "tickets": int(sold_sum[i]),
+             "capacity": int(capacity_sum[i]), "load_factor": float(load[i])} for i in order]
+
+class OccupancyService:
+    """
+    Analítica de ocupación por función. Cruza las entradas vendidas con la
+    capacidad de cada función (`theaters.total_capacity` o los asientos activos
+    actuales de `seats`) y agrega el factor de carga por película, sala, franja
+    horaria y día de la semana con bincounts. Los mapas de calor por asiento
+    se calculan con un bincount sobre el ordinal del asiento en el layout.
+    """
+    def __init__(self, db_connection: DatabaseConnection, theater_service: Optional[TheaterService] = None):
+        self.db = db_connection
+        self.reader = ReportService(db_connection)
+        self.theater_service = theater_service or TheaterService(db_connection)
+
+    def _range(self, date_from: date, date_to: date):
+        start = datetime.combine(date_from, time.min)
+        return start, datetime.combine(date_to + timedelta(days=1), time.min)
+
+    def load_showtimes(self, date_from: date, date_to: date, capacity_source: str = "theater",
+                       theater_ids: Optional[Sequence[int]] = None, on_chunk: Optional[ChunkCallback] = None) -> ColumnarTable:
+        """Funciones no canceladas del rango con su capacidad y entradas vendidas (ordenadas por id)."""
+        if capacity_source not in ("theater", "seats"):
+            raise ValueError(f"Fuente de capacidad desconocida: {capacity_source}")
+        start, end = self._range(date_from, date_to)
+        capacity_sql = "t.total_capacity" if capacity_source == "theater" else (
+            "(SELECT COUNT(*) FROM seats se WHERE se.theater_id = sh.theater_id AND UPPER(se.status) = 'ACTIVE')"
+        )
+        params: List[Any] = [start, start, end]
+        theater_filter = ""
+        if theater_ids:
+            theater_filter = f" AND sh.theater_id IN ({', '.join(['%s'] * len(theater_ids))})"
+            params.extend(theater_ids)
+        return self.reader.load_columns(
+            f"""
+            SELECT sh.id, sh.movie_id, sh.theater_id, DATEDIFF(sh.start_time, %s), HOUR(sh.start_time),
+                   WEEKDAY(sh.start_time), {capacity_sql},
+                   (SELECT COUNT(*) FROM tickets tk WHERE tk.showtime_id = sh.id AND tk.status <> 'REFUNDED')
+            FROM showtimes sh
+            JOIN theaters t ON t.id = sh.theater_id
+            WHERE sh.start_time >= %s AND sh.start_time < %s AND sh.status <> 'CANCELLED'{theater_filter}
+            ORDER BY sh.id
+            """,
+            params,
+            [("showtime_id", "int64", False), ("movie_id", "int64", False), ("theater_id", "int64", False),
+             ("day", "int32", False), ("hour", "int32", False), ("weekday", "int32", False),
+             ("capacity", "float64", False), ("sold", "float64", False)],
+            on_chunk,
+        )
+
+    def build_occupancy_report(self, date_from: date, date_to: date, capacity_source: str = "theater",
+                               worst_count: int = 15) -> Optional[OccupancyReport]:
+        """Reporte de factor de carga del rango; retorna None ante errores de BD."""
+        started = time_module.perf_counter()
+        try:
+            showtimes = self.load_showtimes(date_from, date_to, capacity_source)
+        except DatabaseError:
+            logger.exception("Error de BD al cargar las funciones para el reporte de ocupación.")
+            return None
+        report = compute_occupancy_report(showtimes, date_from, date_to, worst_count)
+        try:
+            self.attach_names(report)
+        except DatabaseError:
+            logger.exception("Error de BD al obtener nombres para el reporte de ocupación.")
+        report.elapsed_ms = (time_module.perf_counter() - started) * 1000
+        return report
+
+    def attach_names(self, report: OccupancyReport):
+        for rows, table, column, key in (
+            (report.by_movie, "movies", "title", "movie_id"),
+            (report.by_theater, "theaters", "name", "theater_id"),
+            (report.worst_showtimes, "movies", "title", "movie_id"),
+        ):
+            names = self.reader.lookup_names(table, column, np.array([r[key] for r in rows], dtype=np.int64))
+            for row in rows:
+                row["name"] = names.get(row[key], f"#{row[key]}")
+
+    def build_seat_heatmap(self, theater_id: int, date_from: date, date_to: date) -> Optional[SeatHeatmap]:
+        """Mapa de calor de la sala sobre su layout actual (asientos eliminados se ignoran)."""
+        layout = self.theater_service.get_seat_layout(theater_id)
+        if layout is None:
+            return None
+        start, end = self._range(date_from, date_to)
+        try:
+            tickets = self.reader.load_columns(
+                """
+                SELECT tk.seat_id
+                FROM tickets tk
+                JOIN showtimes sh ON sh.id = tk.showtime_id
+                WHERE sh.theater_id = %s AND sh.start_time >= %s AND sh.start_time < %s
+                  AND sh.status <> 'CANCELLED' AND tk.status <> 'REFUNDED'
+                """,
+                (theater_id, start, end),
+                [("seat_id", "int64", False)],
+            )
+            showtime_count = self.db.execute_scalar(
+                """
+                SELECT COUNT(*) FROM showtimes
+                WHERE theater_id = %s AND start_time >= %s AND start_time < %s AND status <> 'CANCELLED'
+                """,
+                (theater_id, start, end),
+            ) or 0
+        except DatabaseError:
+            logger.exception(f"Error de BD al calcular el mapa de calor de la sala {theater_id}.")
+            return None
+        counts = seat_bincount(layout, tickets["seat_id"])
+        return SeatHeatmap(theater_id=theater_id, width=layout.width, height=layout.height,
+                           showtimes=int(showtime_count), counts=counts, layout=layout)
+
+def seat_bincount(layout: SeatLayout, seat_ids: np.ndarray) -> np.ndarray:
+    """Cuenta entradas por celda del layout: seat_id -> ordinal (y * width + x) -> bincount."""
+    size = layout.width * layout.height
+    if size == 0:
+        return np.zeros((layout.height, layout.width), dtype=np.int64)
+    grid_ids = np.frombuffer(layout.seat_ids.tobytes(), dtype=np.uint32).astype(np.int64)
+    max_id = int(max(grid_ids.max(), seat_ids.max() if len(seat_ids) else 0))
+    ordinal_of = np.full(max_id + 1, -1, dtype=np.int64)
+    occupied_cells = np.flatnonzero(grid_ids != EMPTY_CELL)
+    ordinal_of[grid_ids[occupied_cells]] = occupied_cells
+    ordinals = ordinal_of[seat_ids] if len(seat_ids) else seat_ids
+    ordinals = ordinals[ordinals >= 0]
+    return np.bincount(ordinals, minlength=size).reshape(layout.height, layout.width)
+
+def compute_occupancy_report(showtimes: ColumnarTable, date_from: date, date_to: date,
+                             worst_count: int = 15) -> OccupancyReport:
+    """Agregaciones vectorizadas del factor de carga (sin acceso a BD)."""
+    report = OccupancyReport(date_from=date_from, date_to=date_to)
+    sold = showtimes["sold"]
+    capacity = showtimes["capacity"]
+    report.showtimes = len(showtimes)
+    report.tickets = int(sold.sum())
+    report.capacity = int(capacity.sum())
+    report.load_factor = report.tickets / report.capacity if report.capacity else 0.0
+    if not report.showtimes:
+        return report
+
+    report.by_movie = _load_rows(showtimes["movie_id"], sold, capacity, "movie_id")
+    report.by_theater = _load_rows(showtimes["theater_id"], sold, capacity, "theater_id")
+
+    # Franja: índice del primer límite superior mayor a la hora de inicio.
+    upper_bounds = np.array([end for _, _, end in DAY_PARTS])
+    parts = np.searchsorted(upper_bounds, showtimes["hour"], side="right")
+    for row in _load_rows(parts, sold, capacity, "day_part"):
+        row["name"] = DAY_PARTS[row["day_part"]][0]
+        report.by_day_part.append(row)
+
+    weekday_names = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+    for row in _load_rows(showtimes["weekday"], sold, capacity, "weekday"):
+        row["name"] = weekday_names[row["weekday"]]
+        report.by_weekday.append(row)
+
+    load = np.divide(sold, capacity, out=np.zeros_like(sold), where=capacity > 0)
+    worst = np.argsort(load, kind="stable")[:worst_count]
+    report.worst_showtimes = [
+        {"showtime_id": int(showtimes["showtime_id"][i]), "movie_id": int(showtimes["movie_id"][i]),
+         "theater_id": int(showtimes["theater_id"][i]),
+         "date": date_from + timedelta(days=int(showtimes["day"][i])), "hour": int(showtimes["hour"][i]),
+         "tickets": int(sold[i]), "capacity": int(capacity[i]), "load_factor": float(load[i])}
+        for i in worst
+    ]
+    return report
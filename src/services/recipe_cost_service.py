@@ -0,0 +1,161 @@
+import logging
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Collection, Dict, Iterable, List, Optional
+
+from src.database.connection import DatabaseConnection, DatabaseError, execute_multirow
+from src.services.recipe_graph import RecipeGraph
+
+logger = logging.getLogger(__name__)
+
+# Escala de product_costs.recipe_cost (DECIMAL(12, 4)); un valor con más decimales
+# generaría la nota 1265 (dato truncado), que raise_on_warnings convierte en error.
+_COST_SCALE = Decimal('0.0001')
+
+def _in_clause(values: Collection[Any]) -> str:
+    return ", ".join(["%s"] * len(values))
+
+def _margin(price: Any, recipe_cost: Any) -> Dict[str, Any]:
+    price = Decimal(price or 0)
+    if recipe_cost is None:
+        return {"price": price, "recipe_cost": None, "margin": None, "margin_pct": None}
+    recipe_cost = Decimal(recipe_cost)
+    margin = price - recipe_cost
+    return {"price": price, "recipe_cost": recipe_cost, "margin": margin,
+            "margin_pct": float(margin / price) if price else None}
+
+class RecipeCostService:
+    """
+    Costo de receta por producto, materializado en `product_costs`.
+
+    El costo se mantiene de forma incremental: cuando cambia el `cost_per_unit` de
+    un insumo o la receta de un producto, el índice inverso del grafo de recetas
+    (`RecipeGraph.where_used`) da solo los productos afectados, en orden
+    topológico, y se recalculan en una pasada tomando de `product_costs` el costo
+    de los sub-productos no afectados. Leer el costo o el margen de un producto es
+    una búsqueda por clave primaria.
+    """
+    def __init__(self, db_connection: DatabaseConnection):
+        self.db = db_connection
+
+    # --- Mantenimiento ---
+    def refresh(self, cursor, item_ids: Iterable[int] = (), product_ids: Iterable[int] = (),
+                graph: Optional[RecipeGraph] = None) -> int:
+        """
+        Recalcula, dentro de la transacción del cursor, el costo de los productos afectados por
+        cambios en `item_ids` (costo de insumos) o `product_ids` (recetas). `graph` evita releer
+        las recetas si el llamador ya lo tiene. Retorna la cantidad de productos actualizados.
+        """
+        graph = graph or RecipeGraph.from_cursor(cursor)
+        affected = graph.where_used(item_ids, product_ids)
+        if not affected:
+            return 0
+        affected_set = set(affected)
+        items, children = set(), set()
+        for product_id in affected:
+            for kind, target, _ in graph.components.get(product_id, ()):
+                if kind == 'item':
+                    items.add(target)
+                elif target not in affected_set:
+                    children.add(target)
+
+        # Los sub-productos sin receta cuestan 0 y no tienen fila en product_costs.
+        known: Dict[int, Any] = {child: Decimal(0) for child in children if not graph.components.get(child)}
+        stored = children - set(known)
+        if stored:
+            cursor.execute(
+                f"SELECT product_id, recipe_cost FROM product_costs WHERE product_id IN ({_in_clause(stored)})",
+                list(stored)
+            )
+            known.update({row['product_id']: row['recipe_cost'] for row in cursor.fetchall()})
+        if len(known) < len(children):
+            # Sub-productos sin costo materializado (nunca calculados): se recalcula todo.
+            return self._rebuild(cursor, graph)
+
+        item_costs: Dict[int, Any] = {}
+        if items:
+            cursor.execute(
+                f"SELECT id, cost_per_unit FROM inventory_items WHERE id IN ({_in_clause(items)})", list(items)
+            )
+            item_costs = {row['id']: row['cost_per_unit'] for row in cursor.fetchall()}
+        return self._store(cursor, graph, graph.rollup(item_costs, products=affected, known=known))
+
+    def rebuild(self) -> Optional[int]:
+        """Recalcula el costo de todos los productos con receta; None ante errores de BD."""
+        try:
+            with self.db.transaction() as cursor:
+                return self._rebuild(cursor, RecipeGraph.from_cursor(cursor))
+        except DatabaseError:
+            logger.exception("Error de BD al recalcular los costos de receta.")
+            return None
+
+    def _rebuild(self, cursor, graph: RecipeGraph) -> int:
+        cursor.execute("SELECT id, cost_per_unit FROM inventory_items")
+        item_costs = {row['id']: row['cost_per_unit'] for row in cursor.fetchall()}
+        cursor.execute("DELETE FROM product_costs")
+        return self._store(cursor, graph, graph.rollup(item_costs))
+
+    def _store(self, cursor, graph: RecipeGraph, costs: Dict[int, Decimal]) -> int:
+        """Guarda los costos de los productos con receta y borra la fila de los que quedaron sin receta."""
+        cleared = [product_id for product_id in costs if not graph.components.get(product_id)]
+        if cleared:
+            cursor.execute(f"DELETE FROM product_costs WHERE product_id IN ({_in_clause(cleared)})", cleared)
+        execute_multirow(
+            cursor,
+            "INSERT INTO product_costs (product_id, recipe_cost)",
+            [(product_id, cost.quantize(_COST_SCALE, rounding=ROUND_HALF_UP))
+             for product_id, cost in costs.items() if graph.components.get(product_id)],
+            "AS new ON DUPLICATE KEY UPDATE recipe_cost = new.recipe_cost",
+        )
+        return len(costs)
+
+    # --- Consultas ---
+    def get_product_costs(self) -> Dict[int, Dict[str, Any]]:
+        """
+        {product_id: {'price', 'recipe_cost', 'margin', 'margin_pct'}} de todos los productos.
+        Los productos sin receta tienen recipe_cost/margin en None.
+        """
+        try:
+            query = "SELECT p.id, p.price, pc.recipe_cost FROM products p LEFT JOIN product_costs pc ON pc.product_id = p.id"
+            rows = self.db.execute_query(query)
+            if all(row['recipe_cost'] is None for row in rows) and self.db.execute_scalar("SELECT COUNT(*) FROM product_recipes"):
+                # Primera lectura tras la migración: se materializan los costos una vez.
+                if self.rebuild():
+                    rows = self.db.execute_query(query)
+            return {row['id']: _margin(row['price'], row['recipe_cost']) for row in rows}
+        except DatabaseError:
+            logger.exception("Error de BD al obtener los costos de receta.")
+            return {}
+
+    def get_product_cost(self, product_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            rows = self.db.execute_query(
+                "SELECT p.price, pc.recipe_cost FROM products p LEFT JOIN product_costs pc ON pc.product_id = p.id WHERE p.id = ?",
+                (product_id,)
+            )
+            return _margin(rows[0]['price'], rows[0]['recipe_cost']) if rows else None
+        except DatabaseError:
+            logger.exception(f"Error de BD al obtener el costo de receta del producto ID {product_id}.")
+            return None
+
+    def lookup_recipe_costs(self, product_ids: List[int]) -> Dict[int, Decimal]:
+        """Costo de receta de los productos dados (los que no tienen receta no aparecen)."""
+        if not product_ids:
+            return {}
+        rows = self.db.execute_query(
+            f"SELECT product_id, recipe_cost FROM product_costs WHERE product_id IN ({_in_clause(product_ids)})",
+            tuple(product_ids)
+        )
+        return {row['product_id']: Decimal(row['recipe_cost']) for row in rows}
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    # Uso: python -m src.services.recipe_cost_service rebuild   (carga inicial o reparación de product_costs)
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        print("Uso: python -m src.services.recipe_cost_service rebuild")
+        sys.exit(2)
+    updated = RecipeCostService(DatabaseConnection()).rebuild()
+    if updated is None:
+        print("❌ No se pudieron recalcular los costos; revise el log.")
+        sys.exit(1)
+    print(f"✅ Costo de receta recalculado para {updated} productos.")
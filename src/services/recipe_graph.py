@@ -0,0 +1,241 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Niveles máximos de anidación: producto con solo insumos = 1, combo que lo contiene = 2, ...
+MAX_RECIPE_DEPTH = 6
+
+Component = Tuple[str, int, Decimal] # ('item' | 'product', id, cantidad)
+
+class RecipeGraphError(ValueError):
+    """Receta inválida para el grafo de productos."""
+    pass
+
+class RecipeCycleError(RecipeGraphError):
+    """La receta hace que un producto se contenga a sí mismo. `path` es el ciclo [a, b, ..., a]."""
+    def __init__(self, path: List[int]):
+        super().__init__("Ciclo en recetas: " + " -> ".join(f"#{p}" for p in path))
+        self.path = path
+
+class RecipeDepthError(RecipeGraphError):
+    """La receta supera MAX_RECIPE_DEPTH niveles de anidación."""
+    def __init__(self, product_id: int, depth: int, max_depth: int):
+        super().__init__(f"El producto #{product_id} quedaría con {depth} niveles de anidación (máximo {max_depth}).")
+        self.product_id = product_id
+        self.depth = depth
+        self.max_depth = max_depth
+
+def _quantity(value: Any) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+class RecipeGraph:
+    """
+    Grafo de recetas (BOM): producto -> insumos y sub-productos.
+
+    Se construye con una sola lectura de `product_recipes` y mantiene el orden
+    topológico (hijos antes que padres, algoritmo de Kahn) y la profundidad de
+    cada producto. Con ese orden, explotar una venta a insumos o acumular costos
+    es una sola pasada lineal sobre las aristas, sin recursión. Los productos que
+    quedan fuera del orden forman parte de un ciclo (o dependen de uno) y se
+    rechazan al explotarlos.
+    """
+    def __init__(self, edges: Iterable[Dict[str, Any]] = ()):
+        self.components: Dict[int, List[Component]] = defaultdict(list)
+        for edge in edges:
+            parent = edge['parent_product_id']
+            if edge.get('inventory_item_id'):
+                self.components[parent].append(('item', edge['inventory_item_id'], _quantity(edge['quantity'])))
+            elif edge.get('child_product_id'):
+                self.components[parent].append(('product', edge['child_product_id'], _quantity(edge['quantity'])))
+        self._rebuild()
+
+    @classmethod
+    def from_cursor(cls, cursor) -> "RecipeGraph":
+        """Construye el grafo dentro de una transacción abierta (cursor de diccionarios)."""
+        cursor.execute("SELECT parent_product_id, inventory_item_id, child_product_id, quantity FROM product_recipes")
+        return cls(cursor.fetchall())
+
+    # --- Estructura ---
+    def _rebuild(self):
+        """Recalcula los índices inversos (dónde se usa cada insumo y producto), el orden topológico y las profundidades."""
+        self.parents: Dict[int, List[int]] = defaultdict(list)
+        self.item_parents: Dict[int, List[int]] = defaultdict(list)
+        pending_children: Dict[int, int] = {}
+        nodes = set(self.components)
+        for parent, components in self.components.items():
+            for kind, child, _ in components:
+                if kind == 'item':
+                    self.item_parents[child].append(parent)
+                else:
+                    self.parents[child].append(parent)
+                    nodes.add(child)
+                    pending_children[parent] = pending_children.get(parent, 0) + 1
+
+        ready = [node for node in nodes if not pending_children.get(node)]
+        order: List[int] = []
+        self.depths: Dict[int, int] = {}
+        while ready:
+            node = ready.pop()
+            order.append(node)
+            self.depths[node] = 1 + max(
+                (self.depths[child] for kind, child, _ in self.components.get(node, ()) if kind == 'product'),
+                default=0
+            ) if self.components.get(node) else 0
+            for parent in self.parents.get(node, ()):
+                pending_children[parent] -= 1
+                if pending_children[parent] == 0:
+                    ready.append(parent)
+        self.order = order # Hijos antes que padres
+        self._position = {node: i for i, node in enumerate(order)}
+        self.cyclic = nodes - set(self._position)
+
+    @property
+    def max_depth(self) -> int:
+        return max(self.depths.values(), default=0)
+
+    def depth(self, product_id: int) -> int:
+        return self.depths.get(product_id, 0)
+
+    def find_cycle(self, start: Optional[int] = None) -> Optional[List[int]]:
+        """
+        Un ciclo concreto [a, b, ..., a] alcanzable desde `start` (o cualquiera si no se indica).
+        Todo nodo fuera del orden topológico tiene algún hijo que también está fuera.
+        """
+        if start is None:
+            start = min(self.cyclic, default=None)
+        if start not in self.cyclic:
+            return None
+        node = start
+        seen: Dict[int, int] = {}
+        path: List[int] = []
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = next(child for kind, child, _ in self.components[node]
+                        if kind == 'product' and child in self.cyclic)
+        return path[seen[node]:] + [node]
+
+    def with_recipe(self, product_id: int, recipe_items: Iterable[Dict[str, Any]]) -> "RecipeGraph":
+        """
+        Copia del grafo con la receta de `product_id` reemplazada, validada: lanza
+        RecipeCycleError o RecipeDepthError si la nueva receta la dejaría inválida.
+        """
+        graph = RecipeGraph.__new__(RecipeGraph)
+        graph.components = defaultdict(list, {p: list(c) for p, c in self.components.items() if p != product_id})
+        graph.components.update(RecipeGraph([
+            dict(item, parent_product_id=product_id) for item in recipe_items if item.get('quantity')
+        ]).components)
+        graph._rebuild()
+        if product_id in graph.cyclic:
+            raise RecipeCycleError(graph.find_cycle(product_id))
+        # Solo la profundidad del producto editado y de sus ancestros puede haber cambiado.
+        for node in [product_id] + graph.ancestors(product_id):
+            if graph.depth(node) > MAX_RECIPE_DEPTH:
+                raise RecipeDepthError(node, graph.depth(node), MAX_RECIPE_DEPTH)
+        return graph
+
+    def ancestors(self, product_id: int) -> List[int]:
+        """Productos que contienen a `product_id` directa o indirectamente."""
+        return [p for p in self.where_used(product_ids=[product_id]) if p != product_id]
+
+    def where_used(self, item_ids: Iterable[int] = (), product_ids: Iterable[int] = ()) -> List[int]:
+        """
+        Productos afectados por un cambio en los insumos o productos dados: los productos
+        indicados más todos los que los contienen, directa o indirectamente, en orden
+        topológico (hijos antes que padres). Solo visita los ancestros, no el grafo completo.
+        """
+        found = set(product_ids)
+        for item_id in item_ids:
+            found.update(self.item_parents.get(item_id, ()))
+        stack = list(found)
+        while stack:
+            for parent in self.parents.get(stack.pop(), ()):
+                if parent not in found:
+                    found.add(parent)
+                    stack.append(parent)
+        return sorted(found, key=lambda p: self._position.get(p, len(self._position)))
+
+    # --- Pasadas lineales ---
+    def explode(self, demand: Dict[int, Any]) -> Dict[int, Decimal]:
+        """
+        Insumos necesarios para producir `demand` ({product_id: cantidad}): {inventory_item_id: cantidad}.
+        Recorre los productos de padres a hijos propagando multiplicadores; cada arista se visita una vez.
+        """
+        for product_id in demand:
+            if product_id in self.cyclic:
+                raise RecipeCycleError(self.find_cycle(product_id))
+        multipliers: Dict[int, Decimal] = defaultdict(Decimal)
+        for product_id, quantity in demand.items():
+            multipliers[product_id] += _quantity(quantity)
+        # Los descendientes siempre están antes en el orden: basta recorrer hasta el producto pedido más alto.
+        end = max((self._position[p] for p in multipliers if p in self._position), default=-1)
+        requirements: Dict[int, Decimal] = defaultdict(Decimal)
+        for node in reversed(self.order[:end + 1]):
+            multiplier = multipliers.get(node)
+            if not multiplier:
+                continue
+            for kind, target, quantity in self.components.get(node, ()):
+                if kind == 'item':
+                    requirements[target] += quantity * multiplier
+                else:
+                    multipliers[target] += quantity * multiplier
+        return dict(requirements)
+
+    def flatten_all(self) -> Dict[int, Dict[int, Decimal]]:
+        """
+        Receta de cada producto explotada a insumos por unidad: {product_id: {inventory_item_id: cantidad}}.
+        Una pasada de hijos a padres reutilizando la explosión ya calculada de cada sub-producto.
+        """
+        flat: Dict[int, Dict[int, Decimal]] = {}
+        for node in self.order:
+            totals: Dict[int, Decimal] = defaultdict(Decimal)
+            for kind, target, quantity in self.components.get(node, ()):
+                if kind == 'item':
+                    totals[target] += quantity
+                else:
+                    for item_id, per_unit in flat[target].items():
+                        totals[item_id] += quantity * per_unit
+            flat[node] = dict(totals)
+        return flat
+
+    def rollup(self, item_values: Dict[int, Any], products: Optional[List[int]] = None,
+               known: Optional[Dict[int, Any]] = None) -> Dict[int, Decimal]:
+        """
+        Valor de cada producto a partir del valor unitario de sus insumos (ej. costo por unidad):
+        una pasada de hijos a padres. Con `products` (en orden topológico, ej. de `where_used`)
+        solo se recalculan esos; el valor de los sub-productos no incluidos se toma de `known`.
+        Los productos en ciclos quedan fuera del resultado.
+        """
+        values: Dict[int, Decimal] = {}
+        for node in self.order if products is None else products:
+            if node in self.cyclic:
+                continue
+            total = Decimal(0)
+            for kind, target, quantity in self.components.get(node, ()):
+                if kind == 'item':
+                    unit = _quantity(item_values.get(target) or 0)
+                else:
+                    unit = values[target] if target in values else _quantity(known[target])
+                total += quantity * unit
+            values[node] = total
+        return values
+
+if __name__ == "__main__":
+    import sys
+    from src.database.connection import DatabaseConnection
+    logging.basicConfig(level=logging.INFO)
+    # Uso: python -m src.services.recipe_graph   (verifica ciclos y profundidad de las recetas guardadas)
+    with DatabaseConnection().transaction() as cursor:
+        graph = RecipeGraph.from_cursor(cursor)
+    print(f"{len(graph.components)} productos con receta; anidación máxima: {graph.max_depth} (límite {MAX_RECIPE_DEPTH}).")
+    cycle = graph.find_cycle()
+    if cycle:
+        print("❌ Ciclo: " + " -> ".join(f"#{p}" for p in cycle))
+        sys.exit(1)
+    too_deep = [p for p, d in graph.depths.items() if d > MAX_RECIPE_DEPTH]
+    if too_deep:
+        print(f"⚠️ Productos sobre el límite de anidación: {', '.join(f'#{p}' for p in too_deep)}")
+        sys.exit(1)
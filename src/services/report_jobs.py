@@ -0,0 +1,283 @@
+import itertools
+import logging
+import threading
+import time as time_module
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.database.connection import DatabaseConnection, DatabaseError
+from src.services.occupancy_service import OccupancyService, compute_occupancy_report
+from src.services.report_service import (
+    ColumnarTable, ReportService, compute_rollup_report, compute_sales_report, concat_tables, shift_days,
+)
+
+logger = logging.getLogger(__name__)
+
+REPORT_KINDS = ("sales", "sales_raw", "occupancy")
+
+class JobStatus(Enum):
+    PENDING = "Pendiente"
+    RUNNING = "En curso"
+    DONE = "Terminado"
+    CANCELLED = "Cancelado"
+    FAILED = "Fallido"
+
+@dataclass(frozen=True)
+class ReportSpec:
+    """
+    Qué reporte calcular. `kind`: 'sales' (rollups por hora), 'sales_raw' (tablas
+    crudas) u 'occupancy'. `options` son pares (clave, valor) ordenados para que
+    la especificación sea hashable y sirva de clave de caché.
+    """
+    kind: str
+    date_from: date
+    date_to: date
+    options: Tuple[Tuple[str, Any], ...] = ()
+
+    def option(self, key: str, default: Any = None) -> Any:
+        return dict(self.options).get(key, default)
+
+    @property
+    def dataset_key(self) -> Tuple[str, Tuple[Tuple[str, Any], ...]]:
+        return self.kind, self.options
+
+class ReportCancelled(Exception):
+    """Se lanza dentro del worker cuando el trabajo fue cancelado."""
+    pass
+
+class ReportJob:
+    """Estado observable de un reporte en ejecución (se lee desde el hilo de la UI)."""
+    def __init__(self, job_id: int, spec: ReportSpec):
+        self.id = job_id
+        self.spec = spec
+        self.status = JobStatus.PENDING
+        self.progress = 0.0 # 0..1, por días del rango ya leídos
+        self.message = ""
+        self.result: Any = None
+        self.from_cache = False
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.DONE, JobStatus.CANCELLED, JobStatus.FAILED)
+
+    def check_cancelled(self, *_):
+        if self._cancel_event.is_set():
+            raise ReportCancelled()
+
+@dataclass
+class _Dataset:
+    """Datos columnares ya leídos para un rango, con la versión de los datos con que se leyeron."""
+    date_from: date
+    date_to: date
+    version: Tuple
+    data: Dict[str, ColumnarTable]
+
+# Firma barata de los datos de un rango: si no cambia, lo ya leído sigue siendo válido.
+_SALES_VERSION = """
+    SELECT COUNT(*) AS row_count, COALESCE(MAX(id), 0) AS max_id, COALESCE(SUM(status = 'COMPLETED'), 0) AS completed,
+           COALESCE(SUM(total_amount), 0) AS amount,
+           (SELECT CONCAT(COUNT(*), ':', COALESCE(MAX(sm.id), 0), ':', COALESCE(SUM(sm.quantity), 0))
+            FROM stock_movements sm
+            WHERE sm.created_at >= %s AND sm.created_at < %s AND sm.movement_type = 'SALE') AS movements
+    FROM sales WHERE sale_date >= %s AND sale_date < %s
+"""
+_OCCUPANCY_VERSION = """
+    SELECT COUNT(*) AS row_count, COALESCE(MAX(t.id), 0) AS max_id, COALESCE(SUM(t.status = 'REFUNDED'), 0) AS refunded,
+           (SELECT COUNT(*) FROM showtimes s2
+            WHERE s2.start_time >= %s AND s2.start_time < %s AND s2.status <> 'CANCELLED') AS showtimes,
+           (SELECT CONCAT(COALESCE(SUM(th.total_capacity), 0), ':', COALESCE(SUM(th.layout_version), 0))
+            FROM theaters th
+            WHERE th.id IN (SELECT s3.theater_id FROM showtimes s3
+                            WHERE s3.start_time >= %s AND s3.start_time < %s)) AS theaters
+    FROM tickets t
+    JOIN showtimes sh ON sh.id = t.showtime_id
+    WHERE sh.start_time >= %s AND sh.start_time < %s
+"""
+
+ProgressHandler = Callable[[ReportJob], None]
+
+class ReportJobRunner:
+    """
+    Ejecuta reportes en hilos de fondo para no bloquear los handlers de Flet.
+
+    - Progreso: el rango se lee en tramos de SEGMENT_DAYS días; `job.progress`
+      avanza por tramo y `on_progress(job)` se invoca tras cada uno.
+    - Cancelación: `job.cancel()` se revisa tras cada bloque leído del cursor.
+    - Caché de resultados por (spec, versión de los datos), con LRU acotado.
+    - Rangos extendidos: los datos columnares del último rango de cada tipo se
+      conservan; si el nuevo rango lo contiene y los datos no cambiaron, solo se
+      leen los días nuevos y se concatenan antes de recalcular las agregaciones.
+    """
+    SEGMENT_DAYS = 31
+
+    def __init__(self, db_connection: DatabaseConnection, workers: int = 2, cache_size: int = 16):
+        self.db = db_connection
+        self.report_service = ReportService(db_connection)
+        self.occupancy_service = OccupancyService(db_connection)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report-job")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[Tuple[ReportSpec, Tuple], Any]" = OrderedDict()
+        self._datasets: Dict[Tuple, _Dataset] = {}
+        self.cache_size = cache_size
+
+    def submit(self, spec: ReportSpec, on_progress: Optional[ProgressHandler] = None,
+               on_done: Optional[ProgressHandler] = None) -> ReportJob:
+        """Encola el reporte y retorna el trabajo; `on_done(job)` se llama al terminar en cualquier estado."""
+        if spec.kind not in REPORT_KINDS:
+            raise ValueError(f"Tipo de reporte desconocido: {spec.kind}")
+        job = ReportJob(next(self._ids), spec)
+        self._executor.submit(self._run, job, on_progress, on_done)
+        return job
+
+    def invalidate(self):
+        """Descarta resultados y datos en caché (ej. tras reconstruir los rollups)."""
+        with self._lock:
+            self._results.clear()
+            self._datasets.clear()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Ejecución ---
+    def _run(self, job: ReportJob, on_progress: Optional[ProgressHandler], on_done: Optional[ProgressHandler]):
+        started = time_module.perf_counter()
+        job.status = JobStatus.RUNNING
+        try:
+            job.check_cancelled()
+            spec = job.spec
+            version = self.data_version(spec.kind, spec.date_from, spec.date_to)
+            with self._lock:
+                cached = self._results.get((spec, version))
+                if cached is not None:
+                    self._results.move_to_end((spec, version))
+            if cached is not None:
+                job.result, job.from_cache = cached, True
+            else:
+                data = self._load_incremental(job, version, on_progress)
+                job.message = "Calculando..."
+                job.result = self._compute(spec, data)
+                with self._lock:
+                    self._results[(spec, version)] = job.result
+                    while len(self._results) > self.cache_size:
+                        self._results.popitem(last=False)
+            if spec.kind != "occupancy":
+                # Los costos de receta cambian sin que cambien las ventas (fuera de la versión).
+                try:
+                    self.report_service.attach_recipe_costs(job.result)
+                except DatabaseError:
+                    logger.exception(f"Error de BD al obtener los costos de receta del reporte {job.id}.")
+            job.result.elapsed_ms = (time_module.perf_counter() - started) * 1000
+            job.progress = 1.0
+            job.status = JobStatus.DONE
+        except ReportCancelled:
+            job.status = JobStatus.CANCELLED
+        except DatabaseError:
+            logger.exception(f"Error de BD en el trabajo de reporte {job.id} ({job.spec.kind}).")
+            job.status = JobStatus.FAILED
+        except Exception:
+            logger.exception(f"Error inesperado en el trabajo de reporte {job.id} ({job.spec.kind}).")
+            job.status = JobStatus.FAILED
+        if on_done:
+            on_done(job)
+
+    def _load_incremental(self, job: ReportJob, version: Tuple, on_progress: Optional[ProgressHandler]) -> Dict[str, ColumnarTable]:
+        spec = job.spec
+        with self._lock:
+            previous = self._datasets.get(spec.dataset_key)
+        pieces: List[Tuple[date, Dict[str, ColumnarTable]]] = []
+        missing = [(spec.date_from, spec.date_to)]
+        if (previous and spec.date_from <= previous.date_from and previous.date_to <= spec.date_to
+                and self.data_version(spec.kind, previous.date_from, previous.date_to) == previous.version):
+            pieces.append((previous.date_from, previous.data))
+            missing = [(spec.date_from, previous.date_from - timedelta(days=1)),
+                       (previous.date_to + timedelta(days=1), spec.date_to)]
+            missing = [(first, last) for first, last in missing if first <= last]
+
+        segments = [segment for first, last in missing for segment in self._split(first, last)]
+        total_days = sum((last - first).days + 1 for first, last in segments) or 1
+        done_days = 0
+        for first, last in segments:
+            job.message = f"Leyendo {first.strftime('%d/%m/%Y')} - {last.strftime('%d/%m/%Y')}"
+            if on_progress:
+                on_progress(job)
+            pieces.append((first, self._load(spec, first, last, job.check_cancelled)))
+            done_days += (last - first).days + 1
+            job.progress = done_days / total_days
+        if on_progress:
+            on_progress(job)
+
+        data = self._merge(pieces, spec.date_from)
+        with self._lock:
+            self._datasets[spec.dataset_key] = _Dataset(spec.date_from, spec.date_to, version, data)
+        return data
+
+    def _split(self, first: date, last: date) -> List[Tuple[date, date]]:
+        segments = []
+        while first <= last:
+            end = min(last, first + timedelta(days=self.SEGMENT_DAYS - 1))
+            segments.append((first, end))
+            first = end + timedelta(days=1)
+        return segments
+
+    def _merge(self, pieces: List[Tuple[date, Dict[str, ColumnarTable]]], date_from: date) -> Dict[str, ColumnarTable]:
+        """Concatena los tramos re-expresando la columna `day` respecto del inicio del rango pedido."""
+        pieces.sort(key=lambda piece: piece[0])
+        return {
+            name: concat_tables([shift_days(data[name], (start - date_from).days) for start, data in pieces])
+            for name in pieces[0][1]
+        }
+
+    def _load(self, spec: ReportSpec, first: date, last: date, on_chunk) -> Dict[str, ColumnarTable]:
+        if spec.kind == "sales":
+            return self.report_service.load_rollups(first, last, on_chunk)
+        if spec.kind == "sales_raw":
+            return self.report_service.load_range(first, last, on_chunk)
+        showtimes = self.occupancy_service.load_showtimes(
+            first, last, spec.option("capacity_source", "theater"), on_chunk=on_chunk
+        )
+        return {"showtimes": showtimes}
+
+    def _compute(self, spec: ReportSpec, data: Dict[str, ColumnarTable]) -> Any:
+        if spec.kind == "occupancy":
+            report = compute_occupancy_report(data["showtimes"], spec.date_from, spec.date_to,
+                                              spec.option("worst_count", 15))
+            self.occupancy_service.attach_names(report)
+            return report
+        compute = compute_rollup_report if spec.kind == "sales" else compute_sales_report
+        report = compute(data, spec.date_from, spec.date_to)
+        self.report_service.attach_names(report)
+        return report
+
+    def data_version(self, kind: str, date_from: date, date_to: date) -> Tuple:
+        """Firma de los datos que alimentan el reporte en el rango (conteos, máximos y sumas)."""
+        start = datetime.combine(date_from, time.min)
+        end = datetime.combine(date_to + timedelta(days=1), time.min)
+        if kind == "occupancy":
+            rows = self.db.execute_query(_OCCUPANCY_VERSION, (start, end) * 3)
+        else:
+            rows = self.db.execute_query(_SALES_VERSION, (start, end) * 2)
+        return tuple(str(value) for value in rows[0].values()) if rows else ()
+
+_runner: Optional[ReportJobRunner] = None
+_runner_lock = threading.Lock()
+
+def get_report_runner() -> ReportJobRunner:
+    """Runner compartido: la caché de resultados sobrevive a la navegación entre vistas."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = ReportJobRunner(DatabaseConnection())
+        return _runner
@@ -0,0 +1,436 @@
+import logging
+import time as time_module
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.database.connection import DatabaseConnection, DatabaseError
+from src.services.recipe_cost_service import RecipeCostService
+
+logger = logging.getLogger(__name__)
+
+_DENSE_KEY_LIMIT = 1_000_000
+
+# (nombre, dtype, categórica). Las columnas categóricas se codifican a enteros al leerlas.
+ColumnSpec = Tuple[str, str, bool]
+
+# on_chunk(filas_leídas) se llama tras cada bloque leído; puede lanzar una excepción para abortar la lectura.
+ChunkCallback = Callable[[int], None]
+
+@dataclass
+class ColumnarTable:
+    """Tabla columnar: un array NumPy por columna y las etiquetas de las columnas categóricas."""
+    columns: Dict[str, np.ndarray] = field(default_factory=dict)
+    labels: Dict[str, List[Any]] = field(default_factory=dict)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+@dataclass
+class SalesReport:
+    """Resultado del análisis de ventas de un rango [date_from, date_to] (ambos inclusive)."""
+    date_from: date
+    date_to: date
+    sales_count: int = 0
+    tickets_count: int = 0
+    total_revenue: float = 0.0
+    ticket_revenue: float = 0.0
+    concession_revenue: float = 0.0
+    avg_ticket_price: float = 0.0
+    concession_per_ticket: float = 0.0
+    attach_rate: float = 0.0 # Ventas con entradas que además incluyen confitería.
+    revenue_by_day: List[Tuple[date, float]] = field(default_factory=list)
+    revenue_by_hour: List[float] = field(default_factory=list)
+    revenue_by_payment: List[Dict[str, Any]] = field(default_factory=list)
+    by_movie: List[Dict[str, Any]] = field(default_factory=list)
+    by_theater: List[Dict[str, Any]] = field(default_factory=list)
+    ticket_mix: List[Dict[str, Any]] = field(default_factory=list)
+    top_products: List[Dict[str, Any]] = field(default_factory=list)
+    stock_consumption: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+def concat_tables(tables: Sequence[ColumnarTable]) -> ColumnarTable:
+    """Concatena tablas con las mismas columnas, unificando los códigos de las columnas categóricas."""
+    if len(tables) == 1:
+        return tables[0]
+    labels: Dict[str, List[Any]] = {name: [] for name in tables[0].labels}
+    parts: Dict[str, List[np.ndarray]] = {name: [] for name in tables[0].columns}
+    for table in tables:
+        for name, values in table.columns.items():
+            if name in labels:
+                index = {label: i for i, label in enumerate(labels[name])}
+                remap = np.array([index.setdefault(label, len(index)) for label in table.labels[name]], dtype=values.dtype)
+                labels[name] = list(index)
+                if len(values):
+                    values = remap[values]
+            parts[name].append(values)
+    return ColumnarTable({name: np.concatenate(arrays) for name, arrays in parts.items()}, labels)
+
+def shift_days(table: ColumnarTable, offset: int) -> ColumnarTable:
+    """Re-expresa la columna `day` (relativa al inicio del rango leído) respecto de otro inicio."""
+    if not offset or "day" not in table.columns:
+        return table
+    return ColumnarTable({**table.columns, "day": table.columns["day"] + offset}, table.labels)
+
+def group_sum(codes: np.ndarray, weights: np.ndarray, size: int) -> np.ndarray:
+    """Suma `weights` por código entero (0..size-1) con un bincount vectorizado."""
+    if size == 0:
+        return np.zeros(0)
+    return np.bincount(codes, weights=weights, minlength=size)
+
+def group_by_key(keys: np.ndarray, *weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray]]:
+    """Agrupa por claves arbitrarias: retorna (claves únicas, conteos, sumas de cada array de pesos)."""
+    if len(keys) == 0:
+        return keys, np.zeros(0, dtype=np.int64), [np.zeros(0) for _ in weights]
+    if keys.min() >= 0 and keys.max() < _DENSE_KEY_LIMIT:
+        # Ids de catálogo (películas, salas, productos) son enteros chicos: bincount directo sin ordenar.
+        counts = np.bincount(keys)
+        present = np.flatnonzero(counts)
+        sums = [np.bincount(keys, weights=w, minlength=len(counts))[present] for w in weights]
+        return present, counts[present], sums
+    unique, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(unique))
+    sums = [np.bincount(inverse, weights=w, minlength=len(unique)) for w in weights]
+    return unique, counts, sums
+
+class ReportService:
+    """
+    Motor de reportes columnar. Lee por streaming (cursor sin buffer + fetchmany)
+    las filas del rango a arrays NumPy y resuelve todas las agregaciones con
+    operaciones vectorizadas (bincount / unique), sin bucles por fila en Python.
+    Los montos se leen como céntimos enteros para sumar sin error de redondeo.
+    """
+    FETCH_SIZE = 20000
+
+    def __init__(self, db_connection: DatabaseConnection):
+        self.db = db_connection
+        self.recipe_costs = RecipeCostService(db_connection)
+
+    # --- Lectura columnar ---
+    def load_columns(self, query: str, params: Sequence[Any], specs: List[ColumnSpec],
+                     on_chunk: Optional[ChunkCallback] = None) -> ColumnarTable:
+        """Ejecuta la consulta y arma una ColumnarTable leyendo en bloques de FETCH_SIZE filas."""
+        read = 0
+        chunks: Dict[str, List[np.ndarray]] = {name: [] for name, _, _ in specs}
+        encoders: Dict[str, Dict[Any, int]] = {name: {} for name, _, categorical in specs if categorical}
+        with self.db.stream_query(query, tuple(params)) as cursor:
+            while True:
+                rows = cursor.fetchmany(self.FETCH_SIZE)
+                if not rows:
+                    break
+                for (name, dtype, categorical), values in zip(specs, zip(*rows)):
+                    if categorical:
+                        encoder = encoders[name]
+                        values = [encoder.setdefault(v, len(encoder)) for v in values]
+                    chunks[name].append(np.array(values, dtype=dtype))
+                read += len(rows)
+                if on_chunk:
+                    on_chunk(read)
+
+        table = ColumnarTable()
+        for name, dtype, _ in specs:
+            parts = chunks[name]
+            table.columns[name] = np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+        table.labels = {name: list(encoder) for name, encoder in encoders.items()}
+        return table
+
+    def load_range(self, date_from: date, date_to: date, on_chunk: Optional[ChunkCallback] = None) -> Dict[str, ColumnarTable]:
+        start = datetime.combine(date_from, time.min)
+        end = datetime.combine(date_to + timedelta(days=1), time.min)
+        # Día relativo al inicio del rango y hora local, calculados por MySQL (sin zonas horarias en Python).
+        sales = self.load_columns(
+            """
+            SELECT id, DATEDIFF(sale_date, %s), HOUR(sale_date), CAST(ROUND(total_amount * 100) AS SIGNED),
+                   COALESCE(payment_method, 'N/D'), user_id
+            FROM sales
+            WHERE sale_date >= %s AND sale_date < %s AND status = 'COMPLETED'
+            """,
+            (start, start, end),
+            [("sale_id", "int64", False), ("day", "int32", False), ("hour", "int32", False),
+             ("total_cents", "int64", False), ("payment", "int32", True), ("user_id", "int64", False)],
+            on_chunk,
+        )
+        tickets = self.load_columns(
+            """
+            SELECT t.sale_id, CAST(ROUND(t.price_sold * 100) AS SIGNED), COALESCE(t.ticket_type, 'N/D'), sh.movie_id, sh.theater_id
+            FROM tickets t
+            JOIN sales s ON s.id = t.sale_id
+            JOIN showtimes sh ON sh.id = t.showtime_id
+            WHERE s.sale_date >= %s AND s.sale_date < %s AND s.status = 'COMPLETED' AND t.status <> 'REFUNDED'
+            """,
+            (start, end),
+            [("sale_id", "int64", False), ("price_cents", "int64", False), ("ticket_type", "int32", True),
+             ("movie_id", "int64", False), ("theater_id", "int64", False)],
+            on_chunk,
+        )
+        items = self.load_columns(
+            """
+            SELECT si.sale_id, si.product_id, si.quantity, CAST(ROUND(si.subtotal * 100) AS SIGNED)
+            FROM sale_items si
+            JOIN sales s ON s.id = si.sale_id
+            WHERE s.sale_date >= %s AND s.sale_date < %s AND s.status = 'COMPLETED'
+            """,
+            (start, end),
+            [("sale_id", "int64", False), ("product_id", "int64", False), ("quantity", "int64", False),
+             ("subtotal_cents", "int64", False)],
+            on_chunk,
+        )
+        movements = self.load_columns(
+            """
+            SELECT inventory_item_id, quantity
+            FROM stock_movements
+            WHERE created_at >= %s AND created_at < %s AND movement_type = 'SALE'
+            """,
+            (start, end),
+            [("item_id", "int64", False), ("quantity", "float64", False)],
+            on_chunk,
+        )
+        return {"sales": sales, "tickets": tickets, "items": items, "movements": movements}
+
+    def load_rollups(self, date_from: date, date_to: date, on_chunk: Optional[ChunkCallback] = None) -> Dict[str, ColumnarTable]:
+        """Carga las filas de los rollups por hora del rango (ver RollupService)."""
+        params = (date_from, date_from, date_to)
+        sales = self.load_columns(
+            """
+            SELECT DATEDIFF(day, %s), hour, payment_method, sales_count, revenue_cents, ticket_sales, attached_sales
+            FROM sales_hourly_rollup WHERE day BETWEEN %s AND %s
+            """,
+            params,
+            [("day", "int32", False), ("hour", "int32", False), ("payment", "int32", True), ("sales", "int64", False),
+             ("revenue_cents", "int64", False), ("ticket_sales", "int64", False), ("attached_sales", "int64", False)],
+            on_chunk,
+        )
+        tickets = self.load_columns(
+            """
+            SELECT movie_id, theater_id, ticket_type, tickets, revenue_cents
+            FROM ticket_hourly_rollup WHERE day BETWEEN %s AND %s
+            """,
+            params[1:],
+            [("movie_id", "int64", False), ("theater_id", "int64", False), ("ticket_type", "int32", True),
+             ("tickets", "int64", False), ("revenue_cents", "int64", False)],
+            on_chunk,
+        )
+        products = self.load_columns(
+            """
+            SELECT product_id, quantity, revenue_cents
+            FROM product_hourly_rollup WHERE day BETWEEN %s AND %s
+            """,
+            params[1:],
+            [("product_id", "int64", False), ("quantity", "int64", False), ("revenue_cents", "int64", False)],
+            on_chunk,
+        )
+        start = datetime.combine(date_from, time.min)
+        end = datetime.combine(date_to + timedelta(days=1), time.min)
+        movements = self.load_columns(
+            """
+            SELECT inventory_item_id, SUM(quantity)
+            FROM stock_movements
+            WHERE created_at >= %s AND created_at < %s AND movement_type = 'SALE'
+            GROUP BY inventory_item_id
+            """,
+            (start, end),
+            [("item_id", "int64", False), ("quantity", "float64", False)],
+            on_chunk,
+        )
+        return {"sales": sales, "tickets": tickets, "products": products, "movements": movements}
+
+    def lookup_names(self, table: str, label_column: str, ids: np.ndarray) -> Dict[int, str]:
+        """Nombres para mostrar de los ids presentes (una consulta por dimensión)."""
+        if len(ids) == 0:
+            return {}
+        id_list = [int(i) for i in ids]
+        placeholders = ", ".join(["%s"] * len(id_list))
+        rows = self.db.execute_query(f"SELECT id, {label_column} AS label FROM {table} WHERE id IN ({placeholders})", tuple(id_list))
+        return {row['id']: row['label'] for row in rows}
+
+    # --- Reporte ---
+    def build_sales_report(self, date_from: date, date_to: date) -> Optional[SalesReport]:
+        """Calcula el reporte de ventas del rango; retorna None ante errores de BD."""
+        started = time_module.perf_counter()
+        try:
+            data = self.load_range(date_from, date_to)
+        except DatabaseError:
+            logger.exception("Error de BD al cargar los datos del reporte de ventas.")
+            return None
+        report = compute_sales_report(data, date_from, date_to)
+        try:
+            self.attach_names(report)
+            self.attach_recipe_costs(report)
+        except DatabaseError:
+            logger.exception("Error de BD al obtener nombres para el reporte; se muestran ids.")
+        report.elapsed_ms = (time_module.perf_counter() - started) * 1000
+        return report
+
+    def build_rollup_report(self, date_from: date, date_to: date) -> Optional[SalesReport]:
+        """
+        Mismo reporte que `build_sales_report` pero leído de los rollups por hora:
+        el costo depende de la cantidad de horas/dimensiones, no del historial de ventas.
+        """
+        started = time_module.perf_counter()
+        try:
+            data = self.load_rollups(date_from, date_to)
+        except DatabaseError:
+            logger.exception("Error de BD al cargar los rollups del reporte de ventas.")
+            return None
+        report = compute_rollup_report(data, date_from, date_to)
+        try:
+            self.attach_names(report)
+            self.attach_recipe_costs(report)
+        except DatabaseError:
+            logger.exception("Error de BD al obtener nombres para el reporte; se muestran ids.")
+        report.elapsed_ms = (time_module.perf_counter() - started) * 1000
+        return report
+
+    def attach_names(self, report: SalesReport):
+        for rows, table, column, key in (
+            (report.by_movie, "movies", "title", "movie_id"),
+            (report.by_theater, "theaters", "name", "theater_id"),
+            (report.top_products, "products", "name", "product_id"),
+            (report.stock_consumption, "inventory_items", "name", "item_id"),
+        ):
+            names = self.lookup_names(table, column, np.array([r[key] for r in rows], dtype=np.int64))
+            for row in rows:
+                row["name"] = names.get(row[key], f"#{row[key]}")
+
+    def attach_recipe_costs(self, report: SalesReport):
+        """
+        Costo de receta actual (materializado en product_costs) y margen de los productos más
+        vendidos. No depende de las ventas del rango: se aplica también sobre reportes en caché.
+        """
+        costs = self.recipe_costs.lookup_recipe_costs([row["product_id"] for row in report.top_products])
+        for row in report.top_products:
+            unit_cost = costs.get(row["product_id"])
+            row["food_cost"] = float(unit_cost) * row["quantity"] if unit_cost is not None else None
+            row["gross_margin"] = row["revenue"] - row["food_cost"] if unit_cost is not None else None
+
+def compute_sales_report(data: Dict[str, ColumnarTable], date_from: date, date_to: date) -> SalesReport:
+    """Agregaciones vectorizadas sobre las tablas columnares (sin acceso a BD)."""
+    sales, tickets, items, movements = data["sales"], data["tickets"], data["items"], data["movements"]
+    report = SalesReport(date_from=date_from, date_to=date_to)
+    n_days = (date_to - date_from).days + 1
+
+    total_cents = sales["total_cents"]
+    report.sales_count = len(sales)
+    report.tickets_count = len(tickets)
+    report.total_revenue = float(total_cents.sum()) / 100
+    report.ticket_revenue = float(tickets["price_cents"].sum()) / 100
+    report.concession_revenue = float(items["subtotal_cents"].sum()) / 100
+    if report.tickets_count:
+        report.avg_ticket_price = report.ticket_revenue / report.tickets_count
+        report.concession_per_ticket = report.concession_revenue / report.tickets_count
+
+    by_day = group_sum(np.clip(sales["day"], 0, n_days - 1), total_cents, n_days) / 100
+    report.revenue_by_day = [(date_from + timedelta(days=i), float(v)) for i, v in enumerate(by_day)]
+    report.revenue_by_hour = [float(v) for v in group_sum(sales["hour"], total_cents, 24) / 100]
+
+    payment_labels = sales.labels.get("payment", [])
+    by_payment = group_sum(sales["payment"], total_cents, len(payment_labels)) / 100
+    counts_payment = np.bincount(sales["payment"], minlength=len(payment_labels))
+    report.revenue_by_payment = sorted(
+        ({"payment_method": label, "sales": int(counts_payment[i]), "revenue": float(by_payment[i])}
+         for i, label in enumerate(payment_labels)),
+        key=lambda r: -r["revenue"],
+    )
+
+    price = tickets["price_cents"].astype(np.float64)
+    for target, key in ((report.by_movie, "movie_id"), (report.by_theater, "theater_id")):
+        keys, counts, (revenue,) = group_by_key(tickets[key], price)
+        order = np.argsort(-revenue, kind="stable")
+        target.extend({key: int(keys[i]), "tickets": int(counts[i]), "revenue": float(revenue[i]) / 100} for i in order)
+
+    type_labels = tickets.labels.get("ticket_type", [])
+    type_counts = np.bincount(tickets["ticket_type"], minlength=len(type_labels))
+    type_revenue = group_sum(tickets["ticket_type"], price, len(type_labels)) / 100
+    report.ticket_mix = sorted(
+        ({"ticket_type": label, "tickets": int(type_counts[i]), "revenue": float(type_revenue[i]),
+          "share": float(type_counts[i]) / report.tickets_count if report.tickets_count else 0.0}
+         for i, label in enumerate(type_labels)),
+        key=lambda r: -r["tickets"],
+    )
+
+    # Tasa de adjunción: ventas con entradas que también tienen productos.
+    if len(tickets) and len(sales):
+        # Marcas por posición del id de venta dentro del rango: evita ordenar los arrays.
+        base = int(sales["sale_id"].min())
+        size = int(sales["sale_id"].max()) - base + 1
+        has_tickets = np.zeros(size, dtype=bool)
+        has_items = np.zeros(size, dtype=bool)
+        has_tickets[tickets["sale_id"] - base] = True
+        has_items[items["sale_id"] - base] = True
+        report.attach_rate = float((has_tickets & has_items).sum()) / float(has_tickets.sum())
+
+    keys, _, (quantity, revenue) = group_by_key(items["product_id"], items["quantity"].astype(np.float64),
+                                                items["subtotal_cents"].astype(np.float64))
+    order = np.argsort(-revenue, kind="stable")[:10]
+    report.top_products = [{"product_id": int(keys[i]), "quantity": int(quantity[i]), "revenue": float(revenue[i]) / 100}
+                           for i in order]
+
+    keys, _, (consumed,) = group_by_key(movements["item_id"], -movements["quantity"])
+    order = np.argsort(-consumed, kind="stable")[:10]
+    report.stock_consumption = [{"item_id": int(keys[i]), "quantity": float(consumed[i])} for i in order]
+    return report
+
+def compute_rollup_report(data: Dict[str, ColumnarTable], date_from: date, date_to: date) -> SalesReport:
+    """Agregaciones vectorizadas sobre filas de rollup (cada fila ya trae conteos y montos)."""
+    sales, tickets, products, movements = data["sales"], data["tickets"], data["products"], data["movements"]
+    report = SalesReport(date_from=date_from, date_to=date_to)
+    n_days = (date_to - date_from).days + 1
+
+    revenue = sales["revenue_cents"].astype(np.float64)
+    ticket_revenue = tickets["revenue_cents"].astype(np.float64)
+    ticket_counts = tickets["tickets"].astype(np.float64)
+    report.sales_count = int(sales["sales"].sum())
+    report.tickets_count = int(tickets["tickets"].sum())
+    report.total_revenue = float(revenue.sum()) / 100
+    report.ticket_revenue = float(ticket_revenue.sum()) / 100
+    report.concession_revenue = float(products["revenue_cents"].sum()) / 100
+    if report.tickets_count:
+        report.avg_ticket_price = report.ticket_revenue / report.tickets_count
+        report.concession_per_ticket = report.concession_revenue / report.tickets_count
+    ticket_sales = int(sales["ticket_sales"].sum())
+    if ticket_sales:
+        report.attach_rate = float(sales["attached_sales"].sum()) / ticket_sales
+
+    by_day = group_sum(np.clip(sales["day"], 0, n_days - 1), revenue, n_days) / 100
+    report.revenue_by_day = [(date_from + timedelta(days=i), float(v)) for i, v in enumerate(by_day)]
+    report.revenue_by_hour = [float(v) for v in group_sum(sales["hour"], revenue, 24) / 100]
+
+    payment_labels = sales.labels.get("payment", [])
+    by_payment = group_sum(sales["payment"], revenue, len(payment_labels)) / 100
+    count_payment = group_sum(sales["payment"], sales["sales"].astype(np.float64), len(payment_labels))
+    report.revenue_by_payment = sorted(
+        ({"payment_method": label or "N/D", "sales": int(count_payment[i]), "revenue": float(by_payment[i])}
+         for i, label in enumerate(payment_labels)),
+        key=lambda r: -r["revenue"],
+    )
+
+    for target, key in ((report.by_movie, "movie_id"), (report.by_theater, "theater_id")):
+        keys, _, (count, amount) = group_by_key(tickets[key], ticket_counts, ticket_revenue)
+        order = np.argsort(-amount, kind="stable")
+        target.extend({key: int(keys[i]), "tickets": int(count[i]), "revenue": float(amount[i]) / 100} for i in order)
+
+    type_labels = tickets.labels.get("ticket_type", [])
+    type_counts = group_sum(tickets["ticket_type"], ticket_counts, len(type_labels))
+    type_revenue = group_sum(tickets["ticket_type"], ticket_revenue, len(type_labels)) / 100
+    report.ticket_mix = sorted(
+        ({"ticket_type": label or "N/D", "tickets": int(type_counts[i]), "revenue": float(type_revenue[i]),
+          "share": float(type_counts[i]) / report.tickets_count if report.tickets_count else 0.0}
+         for i, label in enumerate(type_labels)),
+        key=lambda r: -r["tickets"],
+    )
+
+    keys, _, (quantity, amount) = group_by_key(products["product_id"], products["quantity"].astype(np.float64),
+                                               products["revenue_cents"].astype(np.float64))
+    order = np.argsort(-amount, kind="stable")[:10]
+    report.top_products = [{"product_id": int(keys[i]), "quantity": int(quantity[i]), "revenue": float(amount[i]) / 100}
+                           for i in order]
+
+    keys, _, (consumed,) = group_by_key(movements["item_id"], -movements["quantity"])
+    order = np.argsort(-consumed, kind="stable")[:10]
+    report.stock_consumption = [{"item_id": int(keys[i]), "quantity": float(consumed[i])} for i in order]
+    return report
@@ -0,0 +1,136 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Optional
+
+from src.database.connection import DatabaseConnection, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Cada rollup se alimenta con un INSERT ... SELECT agregado sobre las tablas crudas. El mismo
+# SQL sirve para una venta recién guardada (filtro por id) y para reconstruir un rango de fechas.
+# El SELECT va en una tabla derivada (`new`) para referenciar sus columnas en el ON DUPLICATE KEY
+# UPDATE sin VALUES(), obsoleto desde MySQL 8.0.20 (su warning 1287 aborta la transacción).
+_SALES_ROLLUP = """
+    INSERT INTO sales_hourly_rollup
+        (day, hour, user_id, payment_method, sales_count, revenue_cents, ticket_sales, attached_sales)
+    SELECT * FROM (
+        SELECT DATE(s.sale_date) AS day, HOUR(s.sale_date) AS hour, s.user_id,
+               COALESCE(s.payment_method, '') AS payment_method,
+               COUNT(*) AS sales_count, SUM(ROUND(s.total_amount * 100)) AS revenue_cents,
+               SUM(EXISTS (SELECT 1 FROM tickets t WHERE t.sale_id = s.id)) AS ticket_sales,
+               SUM(EXISTS (SELECT 1 FROM tickets t WHERE t.sale_id = s.id)
+                   AND EXISTS (SELECT 1 FROM sale_items si WHERE si.sale_id = s.id)) AS attached_sales
+        FROM sales s
+        WHERE s.status = 'COMPLETED' AND {filter}
+        GROUP BY DATE(s.sale_date), HOUR(s.sale_date), s.user_id, COALESCE(s.payment_method, '')
+    ) AS new
+    ON DUPLICATE KEY UPDATE
+        sales_count = sales_hourly_rollup.sales_count + new.sales_count,
+        revenue_cents = sales_hourly_rollup.revenue_cents + new.revenue_cents,
+        ticket_sales = sales_hourly_rollup.ticket_sales + new.ticket_sales,
+        attached_sales = sales_hourly_rollup.attached_sales + new.attached_sales
+"""
+
+_TICKET_ROLLUP = """
+    INSERT INTO ticket_hourly_rollup (day, hour, movie_id, theater_id, ticket_type, tickets, revenue_cents)
+    SELECT * FROM (
+        SELECT DATE(s.sale_date) AS day, HOUR(s.sale_date) AS hour, sh.movie_id, sh.theater_id,
+               COALESCE(t.ticket_type, '') AS ticket_type,
+               COUNT(*) AS tickets, SUM(ROUND(t.price_sold * 100)) AS revenue_cents
+        FROM tickets t
+        JOIN sales s ON s.id = t.sale_id
+        JOIN showtimes sh ON sh.id = t.showtime_id
+        WHERE s.status = 'COMPLETED' AND t.status <> 'REFUNDED' AND {filter}
+        GROUP BY DATE(s.sale_date), HOUR(s.sale_date), sh.movie_id, sh.theater_id, COALESCE(t.ticket_type, '')
+    ) AS new
+    ON DUPLICATE KEY UPDATE
+        tickets = ticket_hourly_rollup.tickets + new.tickets,
+        revenue_cents = ticket_hourly_rollup.revenue_cents + new.revenue_cents
+"""
+
+_PRODUCT_ROLLUP = """
+    INSERT INTO product_hourly_rollup (day, hour, product_id, quantity, revenue_cents)
+    SELECT * FROM (
+        SELECT DATE(s.sale_date) AS day, HOUR(s.sale_date) AS hour, si.product_id,
+               SUM(si.quantity) AS quantity, SUM(ROUND(si.subtotal * 100)) AS revenue_cents
+        FROM sale_items si
+        JOIN sales s ON s.id = si.sale_id
+        WHERE s.status = 'COMPLETED' AND {filter}
+        GROUP BY DATE(s.sale_date), HOUR(s.sale_date), si.product_id
+    ) AS new
+    ON DUPLICATE KEY UPDATE
+        quantity = product_hourly_rollup.quantity + new.quantity,
+        revenue_cents = product_hourly_rollup.revenue_cents + new.revenue_cents
+"""
+
+ROLLUP_TABLES = ("sales_hourly_rollup", "ticket_hourly_rollup", "product_hourly_rollup")
+_ROLLUP_STATEMENTS = (_SALES_ROLLUP, _TICKET_ROLLUP, _PRODUCT_ROLLUP)
+
+class RollupService:
+    """
+    Mantiene las tablas de resumen por hora (ventas por cajero/método de pago,
+    entradas por película/sala/tipo y productos). `apply_sale` se ejecuta dentro
+    de la misma transacción que guarda la venta; `rebuild` recalcula un rango
+    desde las tablas crudas (backfill o corrección tras cambios manuales).
+    """
+    def __init__(self, db_connection: DatabaseConnection):
+        self.db = db_connection
+
+    def apply_sale(self, cursor, sale_id: int):
+        """Suma una venta recién insertada a los rollups, sobre el cursor transaccional de la venta."""
+        for statement in _ROLLUP_STATEMENTS:
+            cursor.execute(statement.format(filter="s.id = %s"), (sale_id,))
+
+    def rebuild(self, date_from: date, date_to: date) -> Dict[str, int]:
+        """
+        Reconstruye los rollups de [date_from, date_to] día por día, cada día en su
+        propia transacción para no mantener bloqueos largos. Retorna {'days', 'failed'}.
+        """
+        days = failed = 0
+        day = date_from
+        while day <= date_to:
+            start = datetime.combine(day, time.min)
+            try:
+                with self.db.transaction() as cursor:
+                    for table in ROLLUP_TABLES:
+                        cursor.execute(f"DELETE FROM {table} WHERE day = %s", (day,))
+                    for statement in _ROLLUP_STATEMENTS:
+                        cursor.execute(
+                            statement.format(filter="s.sale_date >= %s AND s.sale_date < %s"),
+                            (start, start + timedelta(days=1))
+                        )
+                days += 1
+            except DatabaseError:
+                logger.exception(f"Error al reconstruir los rollups del {day}.")
+                failed += 1
+            day += timedelta(days=1)
+        return {"days": days, "failed": failed}
+
+    def get_sales_range(self) -> Optional[Dict[str, date]]:
+        """Primer y último día con ventas (rango por defecto del backfill)."""
+        try:
+            row = self.db.execute_query("SELECT MIN(sale_date) AS first, MAX(sale_date) AS last FROM sales")
+            if not row or row[0]['first'] is None:
+                return None
+            return {"from": row[0]['first'].date(), "to": row[0]['last'].date()}
+        except DatabaseError:
+            logger.exception("Error de BD al obtener el rango de ventas.")
+            return None
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    # Uso: python -m src.services.rollup_service [YYYY-MM-DD YYYY-MM-DD]
+    service = RollupService(DatabaseConnection())
+    if len(sys.argv) >= 3:
+        first, last = date.fromisoformat(sys.argv[1]), date.fromisoformat(sys.argv[2])
+    else:
+        sales_range = service.get_sales_range()
+        if not sales_range:
+            print("No hay ventas para resumir.")
+            sys.exit(0)
+        first, last = sales_range["from"], sales_range["to"]
+    print(f"Reconstruyendo rollups del {first} al {last}...")
+    result = service.rebuild(first, last)
+    print(f"✅ {result['days']} días reconstruidos, {result['failed']} con error.")
+    sys.exit(1 if result["failed"] else 0)
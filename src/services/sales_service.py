@@ -1,34 +1,53 @@
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from src.database.connection import DatabaseConnection, DatabaseError
 from src.services.inventory_service import InventoryService
+from src.services.theater_service import TheaterService
+from src.services.seat_allocator import SeatAllocator
+from src.services.rollup_service import RollupService
 from src.utils.security import current_session
 
 logger = logging.getLogger(__name__)
 
+# Consultas del camino crítico de la venta; src/utils/query_plans.py verifica sus planes con EXPLAIN.
+TODAY_SHOWTIMES_QUERY = """
+    SELECT m.id AS movie_id, m.title, m.poster_url, m.duration_minutes,
+           s.id AS showtime_id, s.start_time, t.name AS theater_name,
+           s.projection_type, s.audio_type
+    FROM movies m
+    JOIN showtimes s ON m.id = s.movie_id
+    JOIN theaters t ON s.theater_id = t.id
+    WHERE m.status = 'ACTIVE'
+      AND s.start_time >= CURDATE() AND s.start_time < CURDATE() + INTERVAL 1 DAY
+    ORDER BY m.title, s.start_time
+"""
+
+SEAT_MAP_SHOWTIME_QUERY = """
+    SELECT t.id AS theater_id, t.name AS theater_name
+    FROM showtimes st
+    JOIN theaters t ON st.theater_id = t.id
+    WHERE st.id = ?
+"""
+
+OCCUPIED_SEATS_QUERY = "SELECT seat_id FROM tickets WHERE showtime_id = ?"
+
 class SalesService:
     """
     Servicio para manejar la lógica de negocio relacionada con las ventas.
     """
-    def __init__(self, db_connection: DatabaseConnection, inventory_service: InventoryService):
+    def __init__(self, db_connection: DatabaseConnection, inventory_service: InventoryService, theater_service: Optional[TheaterService] = None):
         self.db = db_connection
         self.inventory_service = inventory_service
+        self.theater_service = theater_service or TheaterService(db_connection)
+        self.seat_allocator = SeatAllocator()
+        self.rollup_service = RollupService(db_connection)
 
     def get_active_movies_with_showtimes(self) -> List[Dict[str, Any]]:
         """
         Obtiene una lista de películas activas y sus funciones para el día de hoy.
         """
         try:
-            query = """
-                SELECT m.id AS movie_id, m.title, m.poster_url, m.duration_minutes,
-                       s.id AS showtime_id, s.start_time, t.name AS theater_name,
-                       s.projection_type, s.audio_type
-                FROM movies m
-                JOIN showtimes s ON m.id = s.movie_id
-                JOIN theaters t ON s.theater_id = t.id
-                WHERE m.status = 'ACTIVE' AND DATE(s.start_time) = CURDATE()
-                ORDER BY m.title, s.start_time;
-            """
+            query = TODAY_SHOWTIMES_QUERY
             results = self.db.execute_query(query)
             
             movies = {}
@@ -55,28 +74,63 @@ class SalesService:
     def get_seat_map(self, showtime_id: int) -> Dict[str, Any]:
         """
         Obtiene el mapa de asientos para una función específica.
+        Se arma con el layout compacto (cacheado) de la sala más la ocupación de la función.
         """
         try:
-            query = """
-                SELECT t.id as theater_id, t.name as theater_name, s.id as seat_id,
-                       s.row_label as seat_row, s.number as seat_col,
-                       CASE WHEN tic.id IS NOT NULL THEN 'occupied' ELSE 'available' END as status
-                FROM showtimes st
-                JOIN theaters t ON st.theater_id = t.id
-                JOIN seats s ON t.id = s.theater_id
-                LEFT JOIN tickets tic ON s.id = tic.seat_id AND tic.showtime_id = st.id
-                WHERE st.id = ?
-                ORDER BY s.y_position, s.x_position;
-            """
-            results = self.db.execute_query(query, (showtime_id,))
-            if not results: return {"layout": {}, "seats": []}
-            
-            layout_info = {"room_id": results[0]['theater_id'], "room_name": results[0]['theater_name']}
-            return {"layout": layout_info, "seats": results}
+            showtime = self.db.execute_query(SEAT_MAP_SHOWTIME_QUERY, (showtime_id,))
+            if not showtime: return {"layout": {}, "seats": []}
+            theater_id = showtime[0]['theater_id']
+
+            layout = self.theater_service.get_seat_layout(theater_id)
+            if not layout or not layout.seat_count: return {"layout": {}, "seats": []}
+            occupied = set(self.get_occupied_seat_ids(showtime_id))
+
+            seats = [
+                {
+                    "seat_id": seat_id, "seat_row": row_label, "seat_col": number,
+                    "x_position": x, "y_position": y, "seat_type_id": type_id, "seat_status": seat_status,
+                    "status": 'occupied' if seat_id in occupied else (
+                        'available' if (seat_status or '').upper() == 'ACTIVE' else 'blocked'
+                    ),
+                }
+                for x, y, seat_id, row_label, number, type_id, seat_status in layout.iter_seats()
+            ]
+            layout_info = {
+                "room_id": theater_id, "room_name": showtime[0]['theater_name'],
+                "width": layout.width, "height": layout.height, "version": layout.version,
+            }
+            return {"layout": layout_info, "seats": seats, "seat_layout": layout}
         except (DatabaseError, Exception) as e:
             logger.exception(f"Error al obtener mapa de asientos para showtime_id {showtime_id}: {e}")
             return {}
 
+    def get_occupied_seat_ids(self, showtime_id: int) -> List[int]:
+        """
+        Obtiene solo los IDs de asientos ocupados de una función, para refrescar
+        la ocupación de un mapa ya construido sin recargar el layout completo.
+        """
+        try:
+            results = self.db.execute_query(OCCUPIED_SEATS_QUERY, (showtime_id,))
+            return [row['seat_id'] for row in results]
+        except (DatabaseError, Exception) as e:
+            logger.exception(f"Error al obtener ocupación para showtime_id {showtime_id}: {e}")
+            return []
+
+    def find_best_available_seats(self, seat_data: Dict[str, Any], count: int, exclude_seat_ids=()) -> List[int]:
+        """
+        Sugiere los `count` mejores asientos contiguos para un mapa ya cargado con
+        `get_seat_map`. Excluye asientos vendidos, bloqueados, los indicados en
+        `exclude_seat_ids` (ya elegidos en la orden) y los de tipo 'Discapacitados',
+        que se asignan solo manualmente.
+        """
+        layout = seat_data.get("seat_layout")
+        if not layout or count <= 0:
+            return []
+        taken = {s["seat_id"] for s in seat_data.get("seats", []) if s["status"] == 'occupied'}
+        taken.update(exclude_seat_ids)
+        allowed_types = {st.id for st in self.theater_service.get_all_seat_types() if st.name != 'Discapacitados'}
+        return self.seat_allocator.find_best_seats(layout, taken, count, seat_type_ids=allowed_types or None)
+
     def get_ticket_prices_for_showtime(self, showtime_id: int) -> Dict[str, float]:
         """
         Obtiene los precios de los boletos para una función específica.
@@ -156,9 +210,12 @@ class SalesService:
                         cursor.execute(item_query, item_data)
                         sale_items_for_stock_deduction.append({'product_id': item['id'], 'quantity': item['quantity']})
 
+                # 4. Actualizar los resúmenes por hora en la misma transacción
+                self.rollup_service.apply_sale(cursor, sale_id)
+
             logger.info(f"Transacción {sale_id} guardada exitosamente en la BD.")
 
-            # 4. Deducir stock (después de que la transacción principal fue exitosa)
+            # 5. Deducir stock (después de que la transacción principal fue exitosa)
             if sale_items_for_stock_deduction:
                 logger.info(f"Iniciando deducción de stock para la venta {sale_id}.")
                 self.inventory_service.deduct_stock_for_sale(sale_id, sale_items_for_stock_deduction, user_id)
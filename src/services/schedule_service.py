@@ -1,11 +1,31 @@
 import logging
-from typing import List, Optional
-from datetime import datetime, timedelta
-from src.database.connection import DatabaseConnection, DatabaseError
-from src.models.models import Showtime, PriceProfile
+from typing import List, Optional, Dict, Any, Iterable
+from datetime import datetime, timedelta, date, time
+from src.config.settings import Config
+from src.database.connection import DatabaseConnection, DatabaseError, execute_multirow
+from src.models.models import Showtime, PriceProfile, ShowtimeTemplate
+from src.utils.interval_tree import IntervalTree
 
 logger = logging.getLogger(__name__)
 
+# Consultas del camino crítico; src/utils/query_plans.py verifica sus planes con EXPLAIN.
+SHOWTIMES_QUERY = """
+    SELECT s.*, m.title as movie_title, t.name as theater_name
+    FROM showtimes s
+    JOIN movies m ON s.movie_id = m.id
+    JOIN theaters t ON s.theater_id = t.id
+    WHERE s.status != 'CANCELLED'
+"""
+
+CONFLICT_QUERY = """
+    SELECT COUNT(*) as count 
+    FROM showtimes 
+    WHERE theater_id = %s 
+    AND start_time < %s -- Existente empieza antes de que termine el nuevo
+    AND end_time > %s -- y termina después de que empiece
+    AND status != 'CANCELLED'
+"""
+
 class ScheduleService:
     """
     Servicio para programación de funciones (Showtimes) y gestión de precios.
@@ -13,26 +33,26 @@ class ScheduleService:
     def __init__(self, db_connection: DatabaseConnection):
         self.db = db_connection
 
+    @staticmethod
+    def build_showtimes_query(date_filter: Optional[datetime] = None, theater_id: Optional[int] = None):
+        """(consulta, parámetros) de `get_showtimes`."""
+        query = SHOWTIMES_QUERY
+        params = []
+        if date_filter:
+            # Rango semiabierto sobre start_time para poder usar idx_showtimes_start_time.
+            day_start = datetime.combine(date_filter.date() if isinstance(date_filter, datetime) else date_filter, time.min)
+            query += " AND s.start_time >= %s AND s.start_time < %s"
+            params.extend([day_start, day_start + timedelta(days=1)])
+        if theater_id:
+            query += " AND s.theater_id = %s"
+            params.append(theater_id)
+        query += " ORDER BY s.start_time"
+        return query, tuple(params)
+
     def get_showtimes(self, date_filter: Optional[datetime] = None, theater_id: Optional[int] = None) -> List[Showtime]:
         try:
-            query = """
-                SELECT s.*, m.title as movie_title, t.name as theater_name
-                FROM showtimes s
-                JOIN movies m ON s.movie_id = m.id
-                JOIN theaters t ON s.theater_id = t.id
-                WHERE s.status != 'CANCELLED'
-            """
-            params = []
-            if date_filter:
-                query += " AND DATE(s.start_time) = DATE(%s)"
-                params.append(date_filter)
-            if theater_id:
-                query += " AND s.theater_id = %s"
-                params.append(theater_id)
-            
-            query += " ORDER BY s.start_time"
-            
-            results = self.db.execute_query(query, tuple(params))
+            query, params = self.build_showtimes_query(date_filter, theater_id)
+            results = self.db.execute_query(query, params)
             return [Showtime(**row) for row in results]
         except DatabaseError:
             return []
@@ -67,30 +87,209 @@ class ScheduleService:
         Retorna True si hay conflicto.
         """
         try:
-            query = """
-                SELECT COUNT(*) as count 
-                FROM showtimes 
-                WHERE theater_id = %s 
-                AND status != 'CANCELLED'
-                AND (
-                    (start_time < %s AND end_time > %s) -- Nuevo empieza antes de que termine existente
-                    OR
-                    (start_time >= %s AND start_time < %s) -- Nuevo empieza durante existente
-                )
-            """
-            params = [theater_id, end, start, start, end]
+            query = CONFLICT_QUERY
+            # Un solo predicado de rango sobre (theater_id, start_time) -> idx_showtimes_theater_time.
+            params = [theater_id, end, start]
             
             if exclude_id:
                 query += " AND id != %s"
                 params.append(exclude_id)
                 
             result = self.db.execute_scalar(query, tuple(params))
-            # execute_scalar returns a value directly if I implemented it right in connection.py
-            # Let's check connection.py implementation in my mind... yes, it returns values()[0]
             return result > 0
         except DatabaseError:
             return True # Asumir conflicto ante error por seguridad
 
+    def load_interval_trees(self, theater_ids: Iterable[int], range_start: datetime, range_end: datetime, cursor=None) -> Dict[int, IntervalTree]:
+        """
+        Carga en memoria, con una sola consulta, las funciones no canceladas que
+        tocan [range_start, range_end) en las salas indicadas: un árbol de
+        intervalos por sala. Si se pasa `cursor` se usa el de una transacción abierta.
+        """
+        theater_ids = sorted(set(theater_ids))
+        trees = {theater_id: IntervalTree() for theater_id in theater_ids}
+        if not theater_ids:
+            return trees
+        placeholders = ', '.join(['%s'] * len(theater_ids))
+        query = f"""
+            SELECT id, theater_id, start_time, end_time
+            FROM showtimes
+            WHERE theater_id IN ({placeholders})
+            AND status != 'CANCELLED'
+            AND start_time < %s AND end_time > %s
+        """
+        params = tuple(theater_ids) + (range_end, range_start)
+        if cursor is not None:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        else:
+            rows = self.db.execute_query(query, params)
+        for row in rows:
+            trees[row['theater_id']].insert(row['start_time'], row['end_time'], f"función #{row['id']}")
+        return trees
+
+    def find_conflicts(self, showtimes: List[Showtime], trees: Dict[int, IntervalTree]) -> List[Dict[str, Any]]:
+        """
+        Valida un lote contra los árboles cargados, incluyendo solapamientos dentro
+        del propio lote (cada función aceptada se inserta en el árbol de su sala).
+        Retorna la lista de conflictos; los árboles quedan con el lote incluido.
+        """
+        conflicts = []
+        for index, showtime in enumerate(showtimes):
+            if not showtime.start_time or not showtime.end_time or showtime.end_time <= showtime.start_time:
+                conflicts.append({'index': index, 'theater_id': showtime.theater_id, 'start_time': showtime.start_time,
+                                  'error': "Horario inválido: la función debe terminar después de empezar."})
+                continue
+            tree = trees.setdefault(showtime.theater_id, IntervalTree())
+            overlap = tree.find_overlap(showtime.start_time, showtime.end_time)
+            if overlap:
+                conflicts.append({'index': index, 'theater_id': showtime.theater_id, 'start_time': showtime.start_time,
+                                  'error': f"Se solapa con {overlap[2]} ({overlap[0]:%d/%m %H:%M}-{overlap[1]:%H:%M})."})
+                continue
+            tree.insert(showtime.start_time, showtime.end_time, f"lote #{index + 1}")
+        return conflicts
+
+    def create_showtimes_bulk(self, showtimes: List[Showtime]) -> Dict[str, Any]:
+        """
+        Crea un lote de funciones de forma atómica: carga los horarios existentes
+        del rango en árboles de intervalos por sala, valida todo el lote en memoria
+        y, si no hay conflictos, lo inserta con una sentencia multi-fila.
+        Retorna {'success': bool, 'created': int, 'conflicts': List[dict]}.
+        """
+        if not showtimes:
+            return {'success': True, 'created': 0, 'conflicts': []}
+        try:
+            with self.db.transaction() as cursor:
+                theater_ids = sorted({s.theater_id for s in showtimes})
+                # Bloquea las salas afectadas para serializar la programación concurrente.
+                placeholders = ', '.join(['%s'] * len(theater_ids))
+                cursor.execute(f"SELECT id FROM theaters WHERE id IN ({placeholders}) FOR UPDATE", theater_ids)
+
+                valid_times = [s for s in showtimes if s.start_time and s.end_time]
+                range_start = min((s.start_time for s in valid_times), default=datetime.now())
+                range_end = max((s.end_time for s in valid_times), default=range_start)
+                trees = self.load_interval_trees(theater_ids, range_start, range_end, cursor=cursor)
+
+                conflicts = self.find_conflicts(showtimes, trees)
+                if conflicts:
+                    logger.warning(f"Lote de funciones rechazado: {len(conflicts)} conflictos.")
+                    return {'success': False, 'created': 0, 'conflicts': conflicts}
+
+                created = execute_multirow(
+                    cursor,
+                    """INSERT INTO showtimes (movie_id, theater_id, price_profile_id, start_time, end_time,
+                                              projection_type, audio_type, status)""",
+                    [
+                        (s.movie_id, s.theater_id, s.price_profile_id, s.start_time, s.end_time,
+                         s.projection_type, s.audio_type, s.status)
+                        for s in showtimes
+                    ]
+                )
+            return {'success': True, 'created': created, 'conflicts': []}
+        except DatabaseError as e:
+            logger.exception(f"Error al crear lote de funciones: {e}")
+            return {'success': False, 'created': 0, 'conflicts': [], 'error': str(e)}
+
+    # --- Plantillas recurrentes ---
+    @staticmethod
+    def compute_end_time(start: datetime, duration_minutes: int, cleaning_buffer_minutes: Optional[int] = None) -> datetime:
+        """Fin de una función = inicio + duración de la película + limpieza de sala."""
+        if cleaning_buffer_minutes is None:
+            cleaning_buffer_minutes = Config.CLEANING_BUFFER_MINUTES
+        return start + timedelta(minutes=duration_minutes + cleaning_buffer_minutes)
+
+    @staticmethod
+    def _row_to_template(row: Dict[str, Any]) -> ShowtimeTemplate:
+        start_times = [datetime.strptime(t.strip(), "%H:%M").time() for t in row['start_times'].split(',') if t.strip()]
+        weekdays = [int(d) for d in row['weekdays'].split(',') if d.strip()]
+        return ShowtimeTemplate(**{**row, 'start_times': start_times, 'weekdays': weekdays})
+
+    def create_template(self, template: ShowtimeTemplate) -> Optional[int]:
+        """Guarda una plantilla semanal de funciones."""
+        try:
+            query = """
+                INSERT INTO showtime_templates (movie_id, theater_id, price_profile_id, start_times, weekdays,
+                                                valid_from, valid_until, projection_type, audio_type, is_active)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            params = (
+                template.movie_id, template.theater_id, template.price_profile_id,
+                ','.join(t.strftime("%H:%M") for t in sorted(template.start_times)),
+                ','.join(str(d) for d in sorted(set(template.weekdays))),
+                template.valid_from, template.valid_until, template.projection_type,
+                template.audio_type, template.is_active
+            )
+            return self.db.execute_insert(query, params)
+        except DatabaseError as e:
+            logger.exception(f"Error al crear plantilla de funciones: {e}")
+            return None
+
+    def get_templates(self, active_only: bool = True) -> List[ShowtimeTemplate]:
+        try:
+            query = "SELECT * FROM showtime_templates"
+            if active_only:
+                query += " WHERE is_active = 1"
+            query += " ORDER BY theater_id, id"
+            return [self._row_to_template(row) for row in self.db.execute_query(query)]
+        except DatabaseError:
+            return []
+
+    def expand_templates(self, templates: List[ShowtimeTemplate], date_from: date, date_to: date,
+                         cleaning_buffer_minutes: Optional[int] = None) -> List[Showtime]:
+        """
+        Expande plantillas a funciones concretas entre `date_from` y `date_to` (inclusive).
+        El end_time se deriva de movies.duration_minutes (una sola consulta) más la limpieza.
+        """
+        movie_ids = sorted({t.movie_id for t in templates})
+        if not movie_ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(movie_ids))
+        rows = self.db.execute_query(f"SELECT id, duration_minutes FROM movies WHERE id IN ({placeholders})", tuple(movie_ids))
+        durations = {row['id']: row['duration_minutes'] for row in rows}
+
+        showtimes = []
+        day = date_from
+        while day <= date_to:
+            weekday = day.weekday()
+            for template in templates:
+                if template.movie_id not in durations or weekday not in template.weekdays:
+                    continue
+                if template.valid_from and day < template.valid_from:
+                    continue
+                if template.valid_until and day > template.valid_until:
+                    continue
+                for start_time in template.start_times:
+                    start = datetime.combine(day, start_time)
+                    showtimes.append(Showtime(
+                        movie_id=template.movie_id, theater_id=template.theater_id,
+                        price_profile_id=template.price_profile_id, start_time=start,
+                        end_time=self.compute_end_time(start, durations[template.movie_id], cleaning_buffer_minutes),
+                        projection_type=template.projection_type, audio_type=template.audio_type,
+                    ))
+            day += timedelta(days=1)
+        showtimes.sort(key=lambda s: (s.theater_id, s.start_time))
+        return showtimes
+
+    def generate_from_templates(self, date_from: date, date_to: date, template_ids: Optional[List[int]] = None,
+                                cleaning_buffer_minutes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Genera en una sola llamada toda la programación del rango a partir de las
+        plantillas activas (o de las indicadas), validando conflictos en memoria e
+        insertando en bloque mediante `create_showtimes_bulk`.
+        """
+        templates = self.get_templates()
+        if template_ids is not None:
+            wanted = set(template_ids)
+            templates = [t for t in templates if t.id in wanted]
+        try:
+            showtimes = self.expand_templates(templates, date_from, date_to, cleaning_buffer_minutes)
+        except DatabaseError as e:
+            logger.exception(f"Error al expandir plantillas: {e}")
+            return {'success': False, 'created': 0, 'conflicts': [], 'error': str(e)}
+        result = self.create_showtimes_bulk(showtimes)
+        result['showtimes'] = showtimes
+        return result
+
     def get_price_profiles(self) -> List[PriceProfile]:
         try:
             results = self.db.execute_query("SELECT * FROM price_profiles WHERE is_active = 1")
@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+from typing import Collection, List, Optional
+
+from src.models.seat_layout import SeatLayout, EMPTY_CELL
+
+# Estados de asiento físico que se pueden vender (la BD usa 'ACTIVE' y el editor 'Active').
+_SELLABLE_STATUSES = {"ACTIVE"}
+
+@dataclass
+class SeatBlock:
+    """Bloque contiguo de asientos propuesto por el asignador."""
+    seat_ids: List[int]
+    row_label: str
+    score: float
+
+class SeatAllocator:
+    """
+    Asignador de "mejor disponible" sobre el layout compacto de una sala.
+
+    Cada asiento se puntúa por su distancia al punto ideal de visión: el centro
+    horizontal de la pantalla a una profundidad relativa `preferred_depth` (0 =
+    primera fila, 1 = última). Se buscan bloques de N asientos contiguos en la
+    misma fila (un pasillo corta la contigüidad) y se elige el de menor puntaje.
+    El recorrido es lineal en el número de celdas, con sumas prefijas por tramo.
+    """
+    def __init__(self, preferred_depth: float = 0.6, row_weight: float = 1.5):
+        self.preferred_depth = preferred_depth
+        self.row_weight = row_weight
+
+    def _is_sellable(self, layout: SeatLayout, i: int, occupied: Collection[int],
+                     seat_type_ids: Optional[Collection[int]]) -> bool:
+        seat_id = layout.seat_ids[i]
+        if seat_id == EMPTY_CELL or seat_id in occupied:
+            return False
+        if layout.statuses[layout.status_codes[i]].upper() not in _SELLABLE_STATUSES:
+            return False
+        return seat_type_ids is None or layout.seat_type_ids[i] in seat_type_ids
+
+    def find_best_block(
+        self,
+        layout: SeatLayout,
+        occupied: Collection[int],
+        count: int,
+        seat_type_ids: Optional[Collection[int]] = None,
+    ) -> Optional[SeatBlock]:
+        """
+        Retorna el mejor bloque de `count` asientos contiguos disponibles, o None.
+        `occupied` debe ser un set de seat_ids (vendidos o ya elegidos en la orden);
+        `seat_type_ids` limita los tipos de asiento aceptados (None = todos).
+        """
+        if count <= 0 or not layout.width or not layout.height:
+            return None
+
+        width = layout.width
+        center_x = (width - 1) / 2
+        ideal_y = (layout.height - 1) * self.preferred_depth
+        best: Optional[SeatBlock] = None
+        best_start = best_y = -1
+
+        for y in range(layout.height):
+            row_penalty = self.row_weight * abs(y - ideal_y) * count
+            if best and row_penalty >= best.score:
+                continue # Ni el bloque más centrado de esta fila puede mejorar al actual.
+            base = y * width
+            x = 0
+            while x < width:
+                if not self._is_sellable(layout, base + x, occupied, seat_type_ids):
+                    x += 1
+                    continue
+                # Tramo contiguo [run_start, x) de asientos vendibles.
+                run_start = x
+                prefix = [0.0]
+                while x < width and self._is_sellable(layout, base + x, occupied, seat_type_ids):
+                    prefix.append(prefix[-1] + abs(x - center_x))
+                    x += 1
+                for offset in range(0, (x - run_start) - count + 1):
+                    score = row_penalty + prefix[offset + count] - prefix[offset]
+                    if best is None or score < best.score:
+                        best = SeatBlock(seat_ids=[], row_label="", score=score)
+                        best_start, best_y = run_start + offset, y
+
+        if best is None:
+            return None
+        start = best_y * width + best_start
+        best.seat_ids = [layout.seat_ids[i] for i in range(start, start + count)]
+        best.row_label = layout.row_labels[layout.label_codes[start]]
+        return best
+
+    def find_best_seats(
+        self,
+        layout: SeatLayout,
+        occupied: Collection[int],
+        count: int,
+        seat_type_ids: Optional[Collection[int]] = None,
+        allow_split: bool = False,
+    ) -> List[int]:
+        """
+        Retorna los seat_ids sugeridos. Si no hay bloque contiguo y `allow_split`
+        es True, completa con los mejores asientos sueltos disponibles.
+        """
+        block = self.find_best_block(layout, occupied, count, seat_type_ids)
+        if block:
+            return block.seat_ids
+        if not allow_split:
+            return []
+
+        center_x = (layout.width - 1) / 2
+        ideal_y = (layout.height - 1) * self.preferred_depth
+        candidates = []
+        for i in range(len(layout.seat_ids)):
+            if self._is_sellable(layout, i, occupied, seat_type_ids):
+                y, x = divmod(i, layout.width)
+                candidates.append((abs(x - center_x) + self.row_weight * abs(y - ideal_y), layout.seat_ids[i]))
+        candidates.sort()
+        return [seat_id for _, seat_id in candidates[:count]] if len(candidates) >= count else []
@@ -0,0 +1,66 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List
+from src.models.models import Seat
+
+# Columnas que definen un asiento físico en el layout (además de su id).
+LAYOUT_COLUMNS = ("row_label", "number", "seat_type_id", "status", "x_position", "y_position")
+
+@dataclass
+class SeatLayoutDiff:
+    """Conjunto mínimo de cambios para pasar del layout guardado al del editor."""
+    to_create: List[Seat] = field(default_factory=list)
+    to_update: List[Seat] = field(default_factory=list)
+    to_delete: List[int] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.to_create or self.to_update or self.to_delete)
+
+def _layout_key(values) -> tuple:
+    """Normaliza una fila (dict) o un Seat a una tupla comparable de columnas de layout."""
+    if isinstance(values, Seat):
+        return tuple(getattr(values, col) for col in LAYOUT_COLUMNS)
+    return tuple(values[col] for col in LAYOUT_COLUMNS)
+
+def compute_seat_layout_diff(current_rows: Iterable[Dict[str, Any]], new_layout: List[Seat]) -> SeatLayoutDiff:
+    """
+    Compara las filas actuales de `seats` (dicts con id y LAYOUT_COLUMNS) con el
+    layout del editor y calcula creaciones, actualizaciones y borrados.
+
+    - Un asiento con id solo se actualiza si cambió alguna columna de layout
+      (tipo, estado, etiqueta, número o posición).
+    - Un asiento nuevo que cae en la posición de uno borrado reutiliza ese id,
+      convirtiendo el par borrado+inserción en una sola actualización (el id
+      reutilizado se asigna al Seat del editor).
+    """
+    diff = SeatLayoutDiff()
+    current_by_id = {row["id"]: row for row in current_rows}
+    editor_ids = set()
+
+    new_seats = []
+    for seat in new_layout:
+        if seat.id is None or seat.id not in current_by_id:
+            # Un id desconocido (borrado por otro editor) se trata como asiento nuevo.
+            new_seats.append(seat)
+            continue
+        editor_ids.add(seat.id)
+        if _layout_key(current_by_id[seat.id]) != _layout_key(seat):
+            diff.to_update.append(seat)
+
+    removed_by_position = {
+        (row["x_position"], row["y_position"]): seat_id
+        for seat_id, row in current_by_id.items()
+        if seat_id not in editor_ids
+    }
+
+    for seat in new_seats:
+        reused_id = removed_by_position.pop((seat.x_position, seat.y_position), None)
+        if reused_id is None:
+            diff.to_create.append(seat)
+            continue
+        seat.id = reused_id
+        if _layout_key(current_by_id[reused_id]) != _layout_key(seat):
+            diff.to_update.append(seat)
+
+    diff.to_delete = sorted(removed_by_position.values())
+    return diff
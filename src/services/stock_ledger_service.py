@@ -0,0 +1,236 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from src.database.connection import DatabaseConnection, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+_MOVEMENT_COLUMNS = "id, inventory_item_id, quantity, movement_type, reference_id, user_id, created_at, notes"
+
+# Suma de movimientos de un intervalo sobre el libro activo y el archivo (ambos acotados por created_at).
+_LEDGER_DELTA = """
+    SELECT inventory_item_id, SUM(quantity) AS delta FROM (
+        SELECT inventory_item_id, quantity FROM stock_movements
+        WHERE created_at >= %s AND created_at < %s {item_filter}
+        UNION ALL
+        SELECT inventory_item_id, quantity FROM stock_movements_archive
+        WHERE created_at >= %s AND created_at < %s {item_filter}
+    ) ledger
+    GROUP BY inventory_item_id
+"""
+
+# Inicio del libro cuando no hay cierre previo (mínimo de DATETIME en MySQL).
+_LEDGER_START = datetime(1000, 1, 1)
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+class StockLedgerService:
+    """
+    Cierres diarios de stock y consultas "stock al momento X".
+
+    `stock_snapshots` guarda el stock de cada insumo al final de un día. El stock
+    a un instante se calcula desde el cierre más cercano anterior más el tramo de
+    movimientos entre ese cierre y el instante (a lo sumo un día si los cierres
+    son diarios), en vez de sumar el libro completo. Los movimientos antiguos
+    pueden moverse a `stock_movements_archive`; las consultas leen ambas tablas,
+    por lo que el archivado no altera sus resultados.
+    """
+    ARCHIVE_BATCH = 5000
+
+    def __init__(self, db_connection: DatabaseConnection):
+        self.db = db_connection
+
+    # --- Cierres ---
+    def get_last_snapshot_date(self, before: Optional[date] = None) -> Optional[date]:
+        """Fecha del último cierre (estrictamente anterior a `before` si se indica)."""
+        if before:
+            return self.db.execute_scalar("SELECT MAX(snapshot_date) FROM stock_snapshots WHERE snapshot_date < %s", (before,))
+        return self.db.execute_scalar("SELECT MAX(snapshot_date) FROM stock_snapshots")
+
+    def take_snapshot(self, day: date) -> bool:
+        """
+        Registra el cierre de `day` para todos los insumos: cierre anterior + movimientos
+        desde entonces hasta el final de `day`. Se puede rehacer: si ya hay cierres
+        posteriores (p. ej. al recalcular un día pasado), se recalculan en orden dentro de la
+        misma transacción, porque cada uno parte del anterior.
+        Solo se cierran días ya terminados: hoy todavía recibe movimientos.
+        """
+        if day >= date.today():
+            logger.warning(f"No se puede cerrar el stock del {day}: el día aún no termina.")
+            return False
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("SELECT MAX(snapshot_date) AS previous FROM stock_snapshots WHERE snapshot_date < %s", (day,))
+                previous = cursor.fetchone()['previous']
+                cursor.execute(
+                    "SELECT DISTINCT snapshot_date FROM stock_snapshots WHERE snapshot_date > %s ORDER BY snapshot_date",
+                    (day,)
+                )
+                later = [row['snapshot_date'] for row in cursor.fetchall()]
+                for current in [day] + later:
+                    self._write_snapshot(cursor, current, previous)
+                    previous = current
+            return True
+        except DatabaseError:
+            logger.exception(f"Error de BD al registrar el cierre de stock del {day}.")
+            return False
+
+    @staticmethod
+    def _write_snapshot(cursor, day: date, previous: Optional[date]):
+        """Upsert del cierre de `day` a partir del cierre `previous` (o del inicio del libro)."""
+        window_start = _day_start(previous + timedelta(days=1)) if previous else _LEDGER_START
+        window_end = _day_start(day + timedelta(days=1))
+        cursor.execute(
+            f"""
+            INSERT INTO stock_snapshots (snapshot_date, inventory_item_id, quantity)
+            SELECT * FROM (
+                SELECT %s AS snapshot_date, ii.id AS inventory_item_id,
+                       COALESCE(prev.quantity, 0) + COALESCE(mv.delta, 0) AS quantity
+                FROM inventory_items ii
+                LEFT JOIN stock_snapshots prev ON prev.inventory_item_id = ii.id AND prev.snapshot_date = %s
+                LEFT JOIN ({_LEDGER_DELTA.format(item_filter="")}) mv ON mv.inventory_item_id = ii.id
+            ) AS src
+            ON DUPLICATE KEY UPDATE quantity = src.quantity
+            """,
+            (day, previous, window_start, window_end, window_start, window_end)
+        )
+
+    def take_missing_snapshots(self, until: date) -> Dict[str, int]:
+        """
+        Registra, en orden, los cierres faltantes desde el último existente hasta `until`
+        (como máximo ayer: el día en curso no se cierra).
+        """
+        until = min(until, date.today() - timedelta(days=1))
+        try:
+            last = self.get_last_snapshot_date()
+            if last is None:
+                first_movement = self.db.execute_scalar("SELECT MIN(created_at) FROM stock_movements")
+                if first_movement is None:
+                    return {"days": 0, "failed": 0}
+                day = first_movement.date()
+            else:
+                day = last + timedelta(days=1)
+        except DatabaseError:
+            logger.exception("Error de BD al buscar el último cierre de stock.")
+            return {"days": 0, "failed": 1}
+        days = failed = 0
+        while day <= until:
+            if self.take_snapshot(day):
+                days += 1
+            else:
+                failed += 1
+                break # Los cierres siguientes dependen de este.
+            day += timedelta(days=1)
+        return {"days": days, "failed": failed}
+
+    # --- Consultas a una fecha ---
+    def get_stock_as_of(self, item_id: int, at: datetime) -> Optional[Decimal]:
+        """Stock del insumo justo antes de `at`; None ante errores de BD."""
+        levels = self.get_stock_levels_as_of(at, item_id=item_id)
+        return None if levels is None else levels.get(item_id, Decimal(0))
+
+    def get_stock_levels_as_of(self, at: datetime, item_id: Optional[int] = None) -> Optional[Dict[int, Decimal]]:
+        """Stock de todos los insumos (o de uno) justo antes de `at`: {inventory_item_id: cantidad}."""
+        try:
+            # Un cierre cubre hasta el final de su día: sirve si snapshot_date < at.date().
+            snapshot_date = self.get_last_snapshot_date(before=at.date())
+            item_filter = "AND inventory_item_id = %s" if item_id else ""
+            item_params = (item_id,) if item_id else ()
+            levels: Dict[int, Decimal] = {}
+            if snapshot_date:
+                rows = self.db.execute_query(
+                    f"SELECT inventory_item_id, quantity FROM stock_snapshots WHERE snapshot_date = %s {item_filter}",
+                    (snapshot_date,) + item_params
+                )
+                levels = {row['inventory_item_id']: Decimal(row['quantity']) for row in rows}
+            window_start = _day_start(snapshot_date + timedelta(days=1)) if snapshot_date else _LEDGER_START
+            rows = self.db.execute_query(
+                _LEDGER_DELTA.format(item_filter=item_filter),
+                (window_start, at) + item_params + (window_start, at) + item_params
+            )
+            for row in rows:
+                key = row['inventory_item_id']
+                levels[key] = levels.get(key, Decimal(0)) + Decimal(row['delta'])
+            return levels
+        except DatabaseError:
+            logger.exception(f"Error de BD al calcular el stock al {at}.")
+            return None
+
+    # --- Archivado ---
+    def archive_movements(self, before: date, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Mueve los movimientos con created_at < `before` a `stock_movements_archive`, en lotes
+        transaccionales (INSERT ... SELECT + DELETE por ids). Exige un cierre del día anterior a
+        `before` para que el stock posterior nunca dependa del archivo.
+        Retorna {'archived', 'batches', 'error'}.
+        """
+        batch_size = batch_size or self.ARCHIVE_BATCH
+        result: Dict[str, Any] = {"archived": 0, "batches": 0, "error": None}
+        try:
+            covered = self.get_last_snapshot_date(before=before + timedelta(days=1))
+        except DatabaseError:
+            logger.exception("Error de BD al verificar los cierres antes de archivar.")
+            result["error"] = "No se pudieron verificar los cierres de stock."
+            return result
+        if covered is None or covered < before - timedelta(days=1):
+            result["error"] = f"Falta el cierre de stock del {before - timedelta(days=1)}; ejecute 'snapshot' primero."
+            return result
+
+        cutoff = _day_start(before)
+        while True:
+            try:
+                with self.db.transaction() as cursor:
+                    cursor.execute(
+                        "SELECT id FROM stock_movements WHERE created_at < %s ORDER BY created_at, id LIMIT %s FOR UPDATE",
+                        (cutoff, batch_size)
+                    )
+                    ids = [row['id'] for row in cursor.fetchall()]
+                    if not ids:
+                        break
+                    placeholders = ", ".join(["%s"] * len(ids))
+                    cursor.execute(
+                        f"INSERT INTO stock_movements_archive ({_MOVEMENT_COLUMNS}) "
+                        f"SELECT {_MOVEMENT_COLUMNS} FROM stock_movements WHERE id IN ({placeholders})",
+                        ids
+                    )
+                    cursor.execute(f"DELETE FROM stock_movements WHERE id IN ({placeholders})", ids)
+            except DatabaseError:
+                logger.exception(f"Error de BD al archivar un lote de movimientos anteriores al {before}.")
+                result["error"] = "El archivado se interrumpió; los lotes completados quedaron archivados."
+                break
+            result["archived"] += len(ids)
+            result["batches"] += 1
+        return result
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    # Uso:
+    #   python -m src.services.stock_ledger_service snapshot [YYYY-MM-DD]    (por defecto, ayer)
+    #   python -m src.services.stock_ledger_service archive YYYY-MM-DD       (archiva lo anterior a esa fecha)
+    #   python -m src.services.stock_ledger_service asof ID_INSUMO YYYY-MM-DD[THH:MM]
+    service = StockLedgerService(DatabaseConnection())
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "snapshot":
+        until = date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else date.today() - timedelta(days=1)
+        result = service.take_missing_snapshots(until)
+        print(f"✅ {result['days']} cierres registrados, {result['failed']} con error.")
+        sys.exit(1 if result["failed"] else 0)
+    elif command == "archive" and len(sys.argv) > 2:
+        result = service.archive_movements(date.fromisoformat(sys.argv[2]))
+        print(f"{result['archived']:,} movimientos archivados en {result['batches']} lotes.")
+        if result["error"]:
+            print(f"❌ {result['error']}")
+            sys.exit(1)
+    elif command == "asof" and len(sys.argv) > 3:
+        stock = service.get_stock_as_of(int(sys.argv[2]), datetime.fromisoformat(sys.argv[3]))
+        if stock is None:
+            print("❌ No se pudo calcular el stock; revise el log.")
+            sys.exit(1)
+        print(f"Stock del insumo {sys.argv[2]} al {sys.argv[3]}: {stock}")
+    else:
+        print("Uso: python -m src.services.stock_ledger_service {snapshot [FECHA] | archive FECHA | asof ID FECHA}")
+        sys.exit(2)
@@ -1,10 +1,22 @@
 import logging
+import threading
 from typing import List, Dict, Optional
-from src.database.connection import DatabaseConnection, DatabaseError
+from src.database.connection import DatabaseConnection, DatabaseError, execute_multirow
 from src.models.models import Theater, Seat, SeatType
+from src.models.seat_layout import SeatLayout
+from src.services.seat_layout_diff import compute_seat_layout_diff, LAYOUT_COLUMNS
 
 logger = logging.getLogger(__name__)
 
+# Caché de layouts compartida por todas las instancias del servicio (una por vista).
+# Se valida contra theaters.layout_version en cada lectura.
+_layout_cache: Dict[int, SeatLayout] = {}
+_layout_cache_lock = threading.Lock()
+
+class LayoutVersionConflict(Exception):
+    """El layout fue modificado por otro editor desde que se cargó."""
+    pass
+
 class TheaterService:
     """
     Servicio para gestionar Salas y Asientos.
@@ -61,8 +73,12 @@ class TheaterService:
                        VALUES (%s, %s, %s, %s, %s, %s)""",
                     seats_data
                 )
-                
-                return theater_id
+
+                # 3. Genera el layout compacto de la sala recién creada.
+                layout = self._store_layout(cursor, theater_id, 0)
+
+            self._cache_layout(layout)
+            return theater_id
         except DatabaseError as e:
             logger.exception(f"Error al crear sala: {e}")
             return None
@@ -92,7 +108,20 @@ class TheaterService:
             return False
 
     def get_theater_seats(self, theater_id: int) -> List[Seat]:
-        """Obtiene todos los asientos de una sala específica con su tipo."""
+        """
+        Obtiene todos los asientos de una sala específica con su tipo, desde su layout compacto.
+        Si algún asiento no entra en el layout (sin posición o con posición repetida) se leen
+        directamente de `seats` para no perderlos.
+        """
+        layout = self.get_seat_layout(theater_id)
+        if not layout:
+            return []
+        if not layout.complete:
+            return self._query_theater_seats(theater_id)
+        seat_types = {st.id: st for st in self.get_all_seat_types()}
+        return layout.to_seats(seat_types)
+
+    def _query_theater_seats(self, theater_id: int) -> List[Seat]:
         try:
             query = """
                 SELECT s.*, st.name as seat_type_name, st.price_modifier
@@ -104,66 +133,132 @@ class TheaterService:
             results = self.db.execute_query(query, (theater_id,))
             return [Seat(**row) for row in results]
         except DatabaseError:
+            logger.exception(f"Error al obtener los asientos de la sala {theater_id}.")
             return []
 
-    def update_seat_layout(self, theater_id: int, new_layout: List[Seat]):
+    def get_seat_layout(self, theater_id: int) -> Optional[SeatLayout]:
         """
-        Sincroniza el layout de asientos, manejando creaciones, actualizaciones y borrados.
+        Retorna el layout compacto de una sala. Si la versión en caché coincide con
+        theaters.layout_version no se transfiere el blob; si el blob guardado está
+        desactualizado o no existe, se regenera desde `seats`.
+        """
+        with _layout_cache_lock:
+            cached = _layout_cache.get(theater_id)
+        cached_version = cached.version if cached else -1
+        try:
+            row = self.db.execute_query(
+                """
+                SELECT t.layout_version,
+                       IF(tl.version = t.layout_version AND tl.version <> %s, tl.layout_blob, NULL) AS layout_blob
+                FROM theaters t
+                LEFT JOIN theater_layouts tl ON tl.theater_id = t.id
+                WHERE t.id = %s
+                """,
+                (cached_version, theater_id)
+            )
+            if not row:
+                return None
+            current_version = row[0]['layout_version']
+            if cached and cached.version == current_version:
+                return cached
+            if row[0]['layout_blob'] is not None:
+                layout = SeatLayout.from_blob(theater_id, row[0]['layout_blob'])
+            else:
+                with self.db.transaction() as cursor:
+                    layout = self._store_layout(cursor, theater_id, current_version)
+            self._cache_layout(layout)
+            return layout
+        except (DatabaseError, ValueError) as e:
+            logger.exception(f"Error al obtener layout de la sala {theater_id}: {e}")
+            return None
+
+    def _store_layout(self, cursor, theater_id: int, version: int) -> SeatLayout:
+        """
+        Genera el layout compacto desde `seats` y lo guarda (upsert) dentro de la transacción dada.
+        Un layout incompleto no se guarda: se regenera desde `seats` en cada carga del proceso.
+        """
+        cursor.execute(
+            f"SELECT id, {', '.join(LAYOUT_COLUMNS)} FROM seats WHERE theater_id = %s",
+            (theater_id,)
+        )
+        layout = SeatLayout.from_rows(theater_id, version, cursor.fetchall())
+        if not layout.complete:
+            cursor.execute("DELETE FROM theater_layouts WHERE theater_id = %s", (theater_id,))
+            return layout
+        cursor.execute(
+            """INSERT INTO theater_layouts (theater_id, version, layout_blob) VALUES (%s, %s, %s) AS new
+               ON DUPLICATE KEY UPDATE version = new.version, layout_blob = new.layout_blob""",
+            (theater_id, version, layout.to_blob())
+        )
+        return layout
+
+    def _cache_layout(self, layout: SeatLayout):
+        with _layout_cache_lock:
+            _layout_cache[layout.theater_id] = layout
+
+    def update_seat_layout(self, theater_id: int, new_layout: List[Seat], expected_version: Optional[int] = None) -> int:
+        """
+        Sincroniza el layout de asientos aplicando solo el diff mínimo (creaciones,
+        actualizaciones de tipo/estado/etiqueta/posición y borrados) en sentencias por lotes.
+        Si se indica `expected_version` y no coincide con la versión guardada, lanza
+        LayoutVersionConflict sin modificar nada. Retorna la nueva versión del layout.
         """
         try:
             with self.db.transaction() as cursor:
-                # 1. Obtiene el estado actual de los asientos desde la BD.
-                cursor.execute("SELECT * FROM seats WHERE theater_id = %s", (theater_id,))
-                db_seats_raw = cursor.fetchall()
-                db_seats_map = {s['id']: Seat(**s) for s in db_seats_raw}
-
-                # 2. Separa los asientos del editor en nuevos y existentes.
-                editor_seats_map = {s.id: s for s in new_layout if s.id is not None}
-                new_seats_to_create = [s for s in new_layout if s.id is None]
-
-                # 3. Identifica y elimina los asientos que ya no existen en el nuevo layout.
-                db_ids = set(db_seats_map.keys())
-                editor_ids = set(editor_seats_map.keys())
-                ids_to_delete = db_ids - editor_ids
-                
-                if ids_to_delete:
-                    placeholders = ', '.join(['%s'] * len(ids_to_delete))
-                    delete_query = f"DELETE FROM seats WHERE id IN ({placeholders})"
-                    cursor.execute(delete_query, list(ids_to_delete))
-
-                # 4. Identifica y actualiza los asientos que han cambiado.
-                seats_to_update = []
-                for seat_id, editor_seat in editor_seats_map.items():
-                    db_seat = db_seats_map.get(seat_id)
-                    if db_seat and (
-                        db_seat.seat_type_id != editor_seat.seat_type_id
-                        or db_seat.status != editor_seat.status
-                    ):
-                        seats_to_update.append(editor_seat)
-
-                if seats_to_update:
-                    update_query = "UPDATE seats SET seat_type_id = %s, status = %s WHERE id = %s"
-                    update_data = [(s.seat_type_id, s.status, s.id) for s in seats_to_update]
-                    cursor.executemany(update_query, update_data)
-                
-                # 5. Inserta los nuevos asientos creados en el editor.
-                if new_seats_to_create:
-                    insert_query = """
-                        INSERT INTO seats (theater_id, row_label, number, seat_type_id, status, x_position, y_position)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """
-                    insert_data = [
-                        (theater_id, s.row_label, s.number, s.seat_type_id, s.status, s.x_position, s.y_position)
-                        for s in new_seats_to_create
-                    ]
-                    cursor.executemany(insert_query, insert_data)
-
-                # 6. Actualiza la capacidad total de la sala.
-                total_capacity = len(editor_ids) + len(new_seats_to_create)
+                # 1. Bloquea la sala y valida la versión para evitar sobrescrituras concurrentes.
+                cursor.execute("SELECT layout_version FROM theaters WHERE id = %s FOR UPDATE", (theater_id,))
+                row = cursor.fetchone()
+                if not row:
+                    raise DatabaseError(f"La sala {theater_id} no existe.")
+                current_version = row['layout_version']
+                if expected_version is not None and expected_version != current_version:
+                    raise LayoutVersionConflict(
+                        f"El layout cambió (versión {current_version}, se editó la {expected_version}). Recargue el editor."
+                    )
+
+                # 2. Lee solo las columnas de layout, sin construir dataclasses.
                 cursor.execute(
-                    "UPDATE theaters SET total_capacity = %s WHERE id = %s",
-                    (total_capacity, theater_id)
+                    f"SELECT id, {', '.join(LAYOUT_COLUMNS)} FROM seats WHERE theater_id = %s",
+                    (theater_id,)
                 )
+                diff = compute_seat_layout_diff(cursor.fetchall(), new_layout)
+                if diff.is_empty:
+                    return current_version
+
+                # 3. Borrados en una sola sentencia.
+                if diff.to_delete:
+                    placeholders = ', '.join(['%s'] * len(diff.to_delete))
+                    cursor.execute(f"DELETE FROM seats WHERE id IN ({placeholders})", diff.to_delete)
+
+                # 4. Actualizaciones como upsert multi-fila sobre la PK.
+                if diff.to_update:
+                    execute_multirow(
+                        cursor,
+                        "INSERT INTO seats (id, theater_id, row_label, number, seat_type_id, status, x_position, y_position)",
+                        [(s.id, theater_id, s.row_label, s.number, s.seat_type_id, s.status, s.x_position, s.y_position) for s in diff.to_update],
+                        """AS new ON DUPLICATE KEY UPDATE row_label = new.row_label, number = new.number,
+                           seat_type_id = new.seat_type_id, status = new.status,
+                           x_position = new.x_position, y_position = new.y_position"""
+                    )
+
+                # 5. Inserciones multi-fila.
+                if diff.to_create:
+                    execute_multirow(
+                        cursor,
+                        "INSERT INTO seats (theater_id, row_label, number, seat_type_id, status, x_position, y_position)",
+                        [(theater_id, s.row_label, s.number, s.seat_type_id, s.status, s.x_position, s.y_position) for s in diff.to_create]
+                    )
+
+                # 6. Actualiza capacidad y versión, y regenera el layout compacto.
+                new_version = current_version + 1
+                cursor.execute(
+                    "UPDATE theaters SET total_capacity = %s, layout_version = %s WHERE id = %s",
+                    (len(new_layout), new_version, theater_id)
+                )
+                layout = self._store_layout(cursor, theater_id, new_version)
+
+            self._cache_layout(layout)
+            return new_version
 
         except DatabaseError as e:
             logger.exception(f"Error al sincronizar layout: {e}")
@@ -1,6 +1,10 @@
 import flet as ft
 from typing import Callable
 from src.models.models import Movie
+from src.utils.image_cache import get_image_cache
+
+# Tamaño de la miniatura del póster (cubre el ancho máximo de la grilla y la altura de la imagen).
+POSTER_THUMB_SIZE = (220, 330)
 
 class MovieCard(ft.Container):
     def __init__(
@@ -31,6 +35,12 @@ class MovieCard(ft.Container):
         self.scale = ft.Scale(1.03) if self._is_hovered else ft.Scale(1)
         self.update()
 
+    def _on_poster_cached(self, path: str):
+        """Cambia a la miniatura local cuando la descarga en segundo plano termina."""
+        self.poster_image.src = path
+        if self.poster_image.page:
+            self.poster_image.update()
+
     def _build_content(self):
         actions = ft.Row(
             controls=[
@@ -66,14 +76,19 @@ class MovieCard(ft.Container):
         
         status_color = ft.Colors.GREEN_400 if self.movie.status == "ACTIVE" else ft.Colors.GREY_400
         
+        self.poster_image = ft.Image(
+            src=get_image_cache().thumbnail_src(
+                self.movie.poster_url, *POSTER_THUMB_SIZE,
+                placeholder=f"https://via.placeholder.com/300x450/222/fff?text={self.movie.title.replace(' ', '+')}",
+                on_ready=self._on_poster_cached,
+            ),
+            fit=ft.ImageFit.COVER,
+            height=220,
+        )
         image_stack = ft.Stack(
             controls=[
                 ft.Container(
-                    content=ft.Image(
-                        src=self.movie.poster_url if self.movie.poster_url else f"https://via.placeholder.com/300x450/222/fff?text={self.movie.title.replace(' ', '+')}",
-                        fit=ft.ImageFit.COVER,
-                        height=220,
-                    ),
+                    content=self.poster_image,
                     border_radius=ft.border_radius.only(top_left=15, top_right=15)
                 ),
                 self.overlay_container,
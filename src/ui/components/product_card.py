@@ -1,5 +1,9 @@
 import flet as ft
 from typing import Callable, Dict, Any
+from src.utils.image_cache import get_image_cache
+
+PRODUCT_THUMB_SIZE = (180, 80)
+PRODUCT_PLACEHOLDER = "https://via.placeholder.com/150x150.png?text=No+Image"
 
 class ProductCard(ft.Card):
     """
@@ -24,15 +28,19 @@ class ProductCard(ft.Card):
 
     def _build_content(self) -> ft.Container:
         """Construye el contenido de la tarjeta del producto."""
+        self.image = ft.Image(
+            src=get_image_cache().thumbnail_src(
+                self.product.get("image_url"), *PRODUCT_THUMB_SIZE,
+                placeholder=PRODUCT_PLACEHOLDER, on_ready=self._on_image_cached,
+            ),
+            height=80,
+            fit=ft.ImageFit.COVER,
+            border_radius=ft.border_radius.only(top_left=10, top_right=10)
+        )
         return ft.Container(
             content=ft.Column(
                 [
-                    ft.Image(
-                        src=self.product.get("image_url", "https://via.placeholder.com/150x150.png?text=No+Image"),
-                        height=80,
-                        fit=ft.ImageFit.COVER,
-                        border_radius=ft.border_radius.only(top_left=10, top_right=10)
-                    ),
+                    self.image,
                     ft.Container(
                         content=ft.Text(self.product["name"], weight=ft.FontWeight.BOLD, size=14, text_align=ft.TextAlign.CENTER, max_lines=2, overflow=ft.TextOverflow.ELLIPSIS),
                         padding=ft.padding.symmetric(horizontal=10, vertical=5),
@@ -57,6 +65,11 @@ class ProductCard(ft.Card):
             border_radius=ft.border_radius.all(10),
         )
 
+    def _on_image_cached(self, path: str):
+        self.image.src = path
+        if self.image.page:
+            self.image.update()
+
     def _decrease_quantity(self, e):
         """Disminuye la cantidad del producto."""
         if self.quantity > 0:
@@ -1,9 +1,11 @@
 import flet as ft
-from typing import Callable, Dict, Any, List
+from typing import Callable, Dict, Any, Iterable
 
 class SeatMap(ft.Container):
     """
     Un control de Flet para mostrar un mapa de asientos interactivo.
+    La cuadrícula se construye una sola vez; los cambios posteriores (clics u
+    ocupación externa) solo actualizan los controles de los asientos afectados.
     """
     def __init__(
         self,
@@ -16,19 +18,25 @@ class SeatMap(ft.Container):
         self.on_seat_selection_change = on_seat_selection_change
         self.theme = theme
         self.selected_seats = set()
+        # Índices seat_id -> datos / control para actualizaciones puntuales.
+        self._seats_by_id: Dict[int, Dict[str, Any]] = {}
+        self._seat_controls: Dict[int, ft.Container] = {}
 
         self.padding = 20
         self.alignment = ft.alignment.center
         self.content = self._build_map()
 
     def _build_map(self) -> ft.Control:
-        """Construye la cuadrícula de asientos."""
+        """Construye la cuadrícula de asientos y registra el índice de controles."""
         layout = self.seat_data.get("layout", {})
         seats = self.seat_data.get("seats", [])
-        
+
         if not layout or not seats:
             return ft.Text("No se pudo cargar la información de la sala.")
 
+        self._seats_by_id.clear()
+        self._seat_controls.clear()
+
         rows = []
         seats_by_row = {}
         for seat in seats:
@@ -48,40 +56,53 @@ class SeatMap(ft.Container):
             alignment=ft.alignment.center,
             border=ft.border.only(bottom=ft.BorderSide(4, self.theme.color_scheme.primary))
         )
-        
+
         return ft.Column([screen_display, ft.Container(height=30)] + rows, horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=5)
 
     def _build_seat(self, seat: Dict[str, Any]) -> ft.Control:
-        """Construye un único control de asiento."""
+        """Construye un único control de asiento y lo registra en el índice."""
         seat_id = seat["seat_id"]
-        status = seat["status"]
-        is_selected = seat_id in self.selected_seats
-
-        color = self.theme.color_scheme.surface_variant
-        if status == 'occupied':
-            color = self.theme.color_scheme.outline
-        elif is_selected:
-            color = self.theme.color_scheme.primary
-
-        return ft.Container(
-            content=ft.Text(
-                f"{seat['seat_row']}{seat['seat_col']}",
-                size=10,
-                color=self.theme.color_scheme.on_surface if not is_selected else self.theme.color_scheme.on_primary,
-            ),
+        control = ft.Container(
+            content=ft.Text(f"{seat['seat_row']}{seat['seat_col']}", size=10),
             width=40,
             height=40,
             alignment=ft.alignment.center,
-            bgcolor=color,
             border_radius=5,
-            on_click=lambda e, s=seat: self._on_seat_click(s),
+            on_click=lambda e, sid=seat_id: self._on_seat_click(sid),
             tooltip=f"Asiento {seat['seat_row']}{seat['seat_col']}"
         )
+        self._apply_seat_style(control, seat)
+        self._seats_by_id[seat_id] = seat
+        self._seat_controls[seat_id] = control
+        return control
+
+    def _apply_seat_style(self, control: ft.Container, seat: Dict[str, Any]):
+        """Aplica color de fondo y de etiqueta según el estado actual del asiento."""
+        is_selected = seat["seat_id"] in self.selected_seats
+
+        color = self.theme.color_scheme.surface_variant
+        if seat["status"] != 'available':
+            # Ocupado o bloqueado (roto / en mantenimiento): no seleccionable.
+            color = self.theme.color_scheme.outline
+        elif is_selected:
+            color = self.theme.color_scheme.primary
+
+        control.bgcolor = color
+        control.content.color = self.theme.color_scheme.on_surface if not is_selected else self.theme.color_scheme.on_primary
+
+    def _refresh_seat(self, seat_id: int):
+        """Re-estiliza y envía al cliente solo el control del asiento indicado."""
+        control = self._seat_controls.get(seat_id)
+        if not control:
+            return
+        self._apply_seat_style(control, self._seats_by_id[seat_id])
+        if control.page:
+            control.update()
 
-    def _on_seat_click(self, seat: Dict[str, Any]):
+    def _on_seat_click(self, seat_id: int):
         """Maneja el evento de clic en un asiento."""
-        seat_id = seat["seat_id"]
-        if seat["status"] == 'occupied':
+        seat = self._seats_by_id.get(seat_id)
+        if not seat or seat["status"] != 'available':
             return
 
         is_currently_selected = seat_id in self.selected_seats
@@ -89,8 +110,35 @@ class SeatMap(ft.Container):
             self.selected_seats.remove(seat_id)
         else:
             self.selected_seats.add(seat_id)
-        
+
         self.on_seat_selection_change(seat, not is_currently_selected)
-        
-        self.content = self._build_map()
-        self.update()
+        self._refresh_seat(seat_id)
+
+    def update_occupancy(self, occupied_seat_ids: Iterable[int]):
+        """
+        Aplica un estado de ocupación recibido externamente (ej. ventas en otra caja).
+        Solo se actualizan los asientos cuyo estado cambió; si un asiento seleccionado
+        pasa a estar ocupado, se deselecciona y se notifica al callback.
+        """
+        occupied = set(occupied_seat_ids)
+        for seat_id, seat in self._seats_by_id.items():
+            if seat["status"] == 'blocked':
+                continue
+            new_status = 'occupied' if seat_id in occupied else 'available'
+            if seat["status"] == new_status:
+                continue
+            seat["status"] = new_status
+            if new_status == 'occupied' and seat_id in self.selected_seats:
+                self.selected_seats.remove(seat_id)
+                self.on_seat_selection_change(seat, False)
+            self._refresh_seat(seat_id)
+
+    def select_seats(self, seat_ids: Iterable[int]):
+        """Selecciona programáticamente varios asientos (ej. 'mejor disponible')."""
+        for seat_id in seat_ids:
+            seat = self._seats_by_id.get(seat_id)
+            if not seat or seat["status"] != 'available' or seat_id in self.selected_seats:
+                continue
+            self.selected_seats.add(seat_id)
+            self.on_seat_selection_change(seat, True)
+            self._refresh_seat(seat_id)
@@ -0,0 +1,133 @@
+import flet as ft
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+
+# fetch_page(cursor) -> (elementos, cursor siguiente o None si no hay más)
+PageFetcher = Callable[[Optional[Any]], Tuple[List[Any], Optional[Any]]]
+
+def list_fetcher(items: List[Any], page_size: int) -> PageFetcher:
+    """Adapta una lista en memoria (ej. resultado del índice del catálogo) a un PageFetcher."""
+    def fetch(offset: Optional[int]):
+        start = offset or 0
+        end = start + page_size
+        return items[start:end], (end if end < len(items) else None)
+    return fetch
+
+class _LazyWindow:
+    """
+    Lógica común de las listas perezosas (mezclada con GridView o ListView).
+
+    Los elementos se piden por páginas (`fetch_page`) a medida que el scroll se
+    acerca al final; cada elemento ocupa un espacio que empieza como un marcador
+    liviano y solo se convierte en control real (`item_builder`) cuando entra en
+    la ventana visible. Se mantienen como máximo `pool_size` controles
+    construidos: los menos recientemente visibles vuelven a ser marcadores.
+    """
+    def _init_window(
+        self,
+        item_builder: Callable[[Any], ft.Control],
+        placeholder_builder: Callable[[], ft.Control],
+        pool_size: int,
+        overscan: int,
+    ):
+        self.item_builder = item_builder
+        self.placeholder_builder = placeholder_builder
+        self.pool_size = pool_size
+        self.overscan = overscan
+        self.items: List[Any] = []
+        self._fetch_page: Optional[PageFetcher] = None
+        self._cursor: Optional[Any] = None
+        self._has_more = False
+        self._built: "OrderedDict[int, bool]" = OrderedDict() # índices con tarjeta real, en orden LRU
+        self._visible = (0, 0)
+
+    def set_source(self, fetch_page: PageFetcher, initial_visible: int = 30):
+        """Reinicia la grilla con una nueva fuente y carga la primera página."""
+        self._fetch_page = fetch_page
+        self._cursor = None
+        self._has_more = True
+        self.items = []
+        self.controls = []
+        self._built.clear()
+        self._load_next_page()
+        self._visible = (0, initial_visible)
+        self._show_window(0, initial_visible)
+        if self.page:
+            self.update()
+
+    def _load_next_page(self) -> bool:
+        if not self._has_more or not self._fetch_page:
+            return False
+        items, self._cursor = self._fetch_page(self._cursor)
+        self._has_more = self._cursor is not None
+        self.items.extend(items)
+        self.controls.extend(self.placeholder_builder() for _ in items)
+        return bool(items)
+
+    def _show_window(self, first: int, last: int):
+        """Construye las tarjetas en [first, last) y recicla las que exceden el pool."""
+        first = max(0, first - self.overscan)
+        last = min(len(self.items), last + self.overscan)
+        for index in range(first, last):
+            if index in self._built:
+                self._built.move_to_end(index)
+                continue
+            self.controls[index] = self.item_builder(self.items[index])
+            self._built[index] = True
+
+        # Recicla las tarjetas más antiguas fuera de la ventana visible.
+        while len(self._built) > self.pool_size:
+            index = next(iter(self._built))
+            if first <= index < last:
+                break # Todo el pool está en pantalla; se tolera el exceso.
+            del self._built[index]
+            self.controls[index] = self.placeholder_builder()
+
+    def _on_scroll(self, e: ft.OnScrollEvent):
+        total = len(self.items)
+        if not total:
+            return
+        content_extent = (e.max_scroll_extent or 0) + (e.viewport_dimension or 0)
+        if content_extent <= 0:
+            return
+        # Todos los espacios tienen la misma altura: la fracción del scroll estima los índices visibles.
+        first = int(e.pixels / content_extent * total)
+        last = int((e.pixels + e.viewport_dimension) / content_extent * total) + 1
+
+        changed = False
+        if self._has_more and e.pixels >= (e.max_scroll_extent or 0) - (e.viewport_dimension or 0):
+            changed = self._load_next_page()
+        if changed or (first, last) != self._visible:
+            self._visible = (first, last)
+            self._show_window(first, last)
+            self.update()
+
+class VirtualGrid(_LazyWindow, ft.GridView):
+    """GridView que construye sus tarjetas de forma perezosa (ver `_LazyWindow`)."""
+    def __init__(
+        self,
+        item_builder: Callable[[Any], ft.Control],
+        placeholder_builder: Callable[[], ft.Control],
+        pool_size: int = 60,
+        overscan: int = 10,
+        **kwargs,
+    ):
+        ft.GridView.__init__(self, on_scroll=self._on_scroll, on_scroll_interval=100, **kwargs)
+        self._init_window(item_builder, placeholder_builder, pool_size, overscan)
+
+class VirtualList(_LazyWindow, ft.ListView):
+    """
+    ListView de filas perezosas para tablas largas (ej. el libro de movimientos).
+    Conviene fijar `item_extent` para que la estimación de la ventana visible por
+    fracción del scroll sea exacta.
+    """
+    def __init__(
+        self,
+        item_builder: Callable[[Any], ft.Control],
+        placeholder_builder: Callable[[], ft.Control],
+        pool_size: int = 120,
+        overscan: int = 20,
+        **kwargs,
+    ):
+        ft.ListView.__init__(self, on_scroll=self._on_scroll, on_scroll_interval=100, **kwargs)
+        self._init_window(item_builder, placeholder_builder, pool_size, overscan)
@@ -1,6 +1,4 @@
 import flet as ft
-import csv
-import io
 from typing import Callable, Dict, Any
 from src.services.inventory_service import InventoryService
 from src.ui.theme import AppTheme
@@ -15,7 +13,7 @@ class InventoryImportDialog(ft.AlertDialog):
         self.inventory_service = inventory_service
         self.theme = theme
         self.on_complete = on_complete
-        self.parsed_data = None
+        self.file_path = None
         self.analysis_result = None
 
         self.modal = True
@@ -76,13 +74,9 @@ class InventoryImportDialog(ft.AlertDialog):
         if not e.files:
             return
 
-        file_path = e.files[0].path
+        # Solo se guarda la ruta: el análisis y la importación leen el archivo en streaming.
+        self.file_path = e.files[0].path
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                # Usar DictReader para facilitar el acceso por nombre de columna
-                reader = csv.DictReader(f)
-                self.parsed_data = [row for row in reader]
-            
             self.analyze_data()
 
         except Exception as ex:
@@ -95,20 +89,25 @@ class InventoryImportDialog(ft.AlertDialog):
         self.content = self.loading_view
         self.update()
 
-        self.analysis_result = self.inventory_service.analyze_inventory_csv(self.parsed_data)
+        self.analysis_result = self.inventory_service.analyze_inventory_csv_file(self.file_path)
+        counts = self.analysis_result['counts']
         
-        # Poblar la vista de previsualización
-        summary = f"Resumen: {len(self.analysis_result['to_create'])} a crear, {len(self.analysis_result['to_update'])} a actualizar, {len(self.analysis_result['errors'])} errores."
+        # Poblar la vista de previsualización (solo las primeras filas de cada tipo)
+        summary = f"Resumen: {counts['rows']} filas · {counts['to_create']} a crear, {counts['to_update']} a actualizar, {counts['errors']} errores."
         self.summary_text.value = summary
 
         self.to_create_list.controls = [ft.ListTile(title=ft.Text(item['name']), subtitle=ft.Text(f"Cantidad: {item['current_stock']} {item['unit']}")) for item in self.analysis_result['to_create']]
         self.to_update_list.controls = [ft.ListTile(title=ft.Text(item['name']), subtitle=ft.Text(f"Añadir: {item['quantity']}")) for item in self.analysis_result['to_update']]
         self.errors_list.controls = [ft.ListTile(title=ft.Text(f"Fila {err['row']}: {err.get('name', '')}"), subtitle=ft.Text(err['error'], color=ft.colors.ERROR)) for err in self.analysis_result['errors']]
+        for target, key in ((self.to_create_list, 'to_create'), (self.to_update_list, 'to_update'), (self.errors_list, 'errors')):
+            hidden = counts[key] - len(self.analysis_result[key])
+            if hidden > 0:
+                target.controls.append(ft.Text(f"... y {hidden} más", italic=True))
         
         self.content = self.preview_view
         self.actions = [
             ft.TextButton("Cancelar", on_click=self.close_dialog),
-            ft.ElevatedButton("Confirmar e Importar", on_click=self.execute_import, disabled=bool(self.analysis_result['errors'])),
+            ft.ElevatedButton("Confirmar e Importar", on_click=self.execute_import, disabled=bool(counts['errors']) or not counts['rows']),
         ]
         self.update()
 
@@ -117,7 +116,7 @@ class InventoryImportDialog(ft.AlertDialog):
         self.actions = []
         self.update()
 
-        success = self.inventory_service.execute_inventory_import(self.analysis_result, current_session.user_id)
+        success = self.inventory_service.import_inventory_csv_file(self.file_path, current_session.user_id)
         
         if success:
             self.title.value = "Éxito"
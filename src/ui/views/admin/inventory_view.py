@@ -1,5 +1,8 @@
 import flet as ft
+import threading
+from datetime import date
 from src.services.inventory_service import InventoryService
+from src.services.export_service import ExportService
 from src.ui.theme import AppTheme
 from src.ui.components.dialogs import show_confirm_dialog, show_info_dialog
 from src.ui.views.admin.inventory_item_dialog import InventoryItemDialog
@@ -7,6 +10,12 @@ from src.ui.views.admin.product_dialog import ProductDialog
 from src.ui.views.admin.inventory_import_dialog import InventoryImportDialog
 from src.ui.views.admin.stock_adjustment_dialog import StockAdjustmentDialog
 from src.ui.views.admin.recipes_view import RecipesView
+from src.ui.components.virtual_grid import VirtualList
+
+MOVEMENTS_PAGE_SIZE = 100
+MOVEMENT_ROW_HEIGHT = 40
+# (título, ancho); None = ocupa el espacio restante.
+MOVEMENT_COLUMNS = [("Fecha", 140), ("Insumo", 220), ("Cantidad", 100), ("Tipo", 120), ("Usuario", 120), ("Notas", None)]
 
 class InventoryView:
     """
@@ -24,12 +33,26 @@ class InventoryView:
         # Definir los controles aquí, pero construirlos en el método build
         self.insumos_table = ft.DataTable(columns=[])
         self.products_table = ft.DataTable(columns=[])
-        self.movements_table = ft.DataTable(columns=[])
+        self.movements_list = VirtualList(
+            item_builder=self._build_movement_row,
+            placeholder_builder=lambda: ft.Container(height=MOVEMENT_ROW_HEIGHT),
+            item_extent=MOVEMENT_ROW_HEIGHT,
+            expand=True,
+        )
+        self.movements_empty = ft.Text("No se encontraron movimientos.", visible=False)
         self.recipes_view = None # Se inicializa en build
         
         # Filtros de movimientos
         self.filter_start_date = ft.TextField(label="Inicio (YYYY-MM-DD)", width=150, dense=True)
         self.filter_end_date = ft.TextField(label="Fin (YYYY-MM-DD)", width=150, dense=True)
+        self.filter_type = ft.Dropdown(label="Tipo", width=160, dense=True)
+        self.filter_user = ft.Dropdown(label="Usuario", width=160, dense=True)
+
+        # Exportación en streaming del libro de movimientos (mismos filtros que la tabla)
+        self.export_service = ExportService(inventory_service.db)
+        self.export_picker = ft.FilePicker(on_result=self._on_export_path)
+        self.export_button = ft.ElevatedButton("Exportar", icon=ft.Icons.DOWNLOAD, on_click=self.open_export_picker)
+        self.export_status = ft.Text("", size=12)
 
     def build(self):
         """
@@ -79,10 +102,12 @@ class InventoryView:
             ft.DataColumn(ft.Text("Precio"), numeric=True), ft.DataColumn(ft.Text("Tipo")),
             ft.DataColumn(ft.Text("Acciones")),
         ]
-        self.movements_table.columns = [
-            ft.DataColumn(ft.Text("Fecha")), ft.DataColumn(ft.Text("Insumo")),
-            ft.DataColumn(ft.Text("Cantidad"), numeric=True), ft.DataColumn(ft.Text("Tipo")),
-            ft.DataColumn(ft.Text("Usuario")), ft.DataColumn(ft.Text("Notas")),
+        options = self.inventory_service.get_movement_filter_options()
+        self.filter_type.options = [ft.dropdown.Option(key="", text="Todos")] + [
+            ft.dropdown.Option(key=t, text=t) for t in options['movement_types']
+        ]
+        self.filter_user.options = [ft.dropdown.Option(key="", text="Todos")] + [
+            ft.dropdown.Option(key=str(u['id']), text=u['username']) for u in options['users']
         ]
     
     # --- Métodos para construir cada pestaña ---
@@ -106,17 +131,35 @@ class InventoryView:
             ft.Row([
                 self.filter_start_date,
                 self.filter_end_date,
+                self.filter_type,
+                self.filter_user,
                 ft.ElevatedButton("Filtrar", icon=ft.Icons.FILTER_LIST, on_click=lambda e: self.load_movements_data()),
-                ft.IconButton(icon=ft.Icons.CLEAR, tooltip="Limpiar Filtros", on_click=self.clear_filters)
+                ft.IconButton(icon=ft.Icons.CLEAR, tooltip="Limpiar Filtros", on_click=self.clear_filters),
+                self.export_button,
+                self.export_status,
             ]),
-            ft.Container(content=ft.ListView([self.movements_table], expand=True), expand=True),
+            self._movement_cells([ft.Text(title, weight=ft.FontWeight.BOLD) for title, _ in MOVEMENT_COLUMNS]),
+            ft.Divider(height=1),
+            self.movements_empty,
+            self.movements_list,
         ], expand=True)
 
+    def _movement_cells(self, controls) -> ft.Row:
+        cells = [
+            ft.Container(content=control, width=width, expand=width is None)
+            for control, (_, width) in zip(controls, MOVEMENT_COLUMNS)
+        ]
+        return ft.Row(cells, height=MOVEMENT_ROW_HEIGHT, spacing=10)
+
     def clear_filters(self, e):
         self.filter_start_date.value = ""
         self.filter_end_date.value = ""
+        self.filter_type.value = None
+        self.filter_user.value = None
         self.filter_start_date.update()
         self.filter_end_date.update()
+        self.filter_type.update()
+        self.filter_user.update()
         self.load_movements_data()
 
     # --- Métodos de carga de datos ---
@@ -160,25 +203,73 @@ class InventoryView:
                 ]))
         if self.page: self.page.update()
 
+    def _movement_filters(self) -> dict:
+        return {
+            'start_date': self.filter_start_date.value or None,
+            'end_date': self.filter_end_date.value or None,
+            'movement_type': self.filter_type.value or None,
+            'user_id': int(self.filter_user.value) if self.filter_user.value else None,
+        }
+
     def load_movements_data(self):
-        start = self.filter_start_date.value if self.filter_start_date.value else None
-        end = self.filter_end_date.value if self.filter_end_date.value else None
-        
-        movements = self.inventory_service.get_stock_movements(start_date=start, end_date=end)
-        self.movements_table.rows.clear()
-        if not movements:
-            self.movements_table.rows.append(ft.DataRow(cells=[ft.DataCell(ft.Text("No se encontraron movimientos.", text_align="center")), ft.DataCell(ft.Text("")), ft.DataCell(ft.Text("")), ft.DataCell(ft.Text("")), ft.DataCell(ft.Text("")), ft.DataCell(ft.Text(""))]))
-        else:
-            for movement in movements:
-                quantity_str = f"+{movement['quantity']}" if movement['quantity'] > 0 else str(movement['quantity'])
-                color = ft.Colors.GREEN_500 if movement['quantity'] > 0 else ft.Colors.RED_500
-                self.movements_table.rows.append(ft.DataRow(cells=[
-                    ft.DataCell(ft.Text(movement['created_at'].strftime("%Y-%m-%d %H:%M"))), ft.DataCell(ft.Text(movement['item_name'])),
-                    ft.DataCell(ft.Text(quantity_str, color=color)), ft.DataCell(ft.Text(movement['movement_type'])),
-                    ft.DataCell(ft.Text(movement.get('user_name', 'N/A'))), ft.DataCell(ft.Text(movement.get('notes', ''))),
-                ]))
+        """Reinicia la lista de movimientos: las páginas se piden por keyset a medida que se hace scroll."""
+        filters = self._movement_filters()
+
+        def fetch(before):
+            page = self.inventory_service.get_stock_movements(page_size=MOVEMENTS_PAGE_SIZE, before=before, **filters)
+            return page, InventoryService.next_movements_cursor(page, MOVEMENTS_PAGE_SIZE)
+
+        self.movements_list.set_source(fetch)
+        self.movements_empty.visible = not self.movements_list.items
         if self.page: self.page.update()
 
+    def _build_movement_row(self, movement: dict) -> ft.Control:
+        quantity_str = f"+{movement['quantity']}" if movement['quantity'] > 0 else str(movement['quantity'])
+        color = ft.Colors.GREEN_500 if movement['quantity'] > 0 else ft.Colors.RED_500
+        return self._movement_cells([
+            ft.Text(movement['created_at'].strftime("%Y-%m-%d %H:%M")),
+            ft.Text(movement['item_name'], no_wrap=True, overflow=ft.TextOverflow.ELLIPSIS),
+            ft.Text(quantity_str, color=color),
+            ft.Text(movement['movement_type']),
+            ft.Text(movement.get('user_name') or 'N/A'),
+            ft.Text(movement.get('notes') or '', no_wrap=True, overflow=ft.TextOverflow.ELLIPSIS),
+        ])
+
+    # --- Exportación de movimientos ---
+    def open_export_picker(self, e):
+        # El FilePicker debe estar en la overlay de la página para funcionar
+        if self.export_picker not in self.page.overlay:
+            self.page.overlay.append(self.export_picker)
+            self.page.update()
+        self.export_picker.save_file(
+            dialog_title="Exportar movimientos de stock",
+            file_name=f"movimientos_{date.today().isoformat()}.csv",
+            allowed_extensions=["csv", "jsonl", "gz"],
+        )
+
+    def _on_export_path(self, e: ft.FilePickerResultEvent):
+        if not e.path:
+            return
+        self.export_button.disabled = True
+        self.export_status.value = "Exportando..."
+        self.page.update()
+        threading.Thread(target=self._run_export, args=(e.path, self._movement_filters()), daemon=True).start()
+
+    def _run_export(self, path: str, filters: dict):
+        def on_progress(rows: int):
+            self.export_status.value = f"Exportando... {rows:,} filas"
+            self.export_status.update()
+
+        result = self.export_service.export_stock_movements(path, progress=on_progress, **filters)
+        self.export_button.disabled = False
+        if result is None:
+            self.export_status.value = ""
+            self.page.update()
+            show_info_dialog(self.page, "Error", "No se pudo exportar los movimientos. Revise el log.")
+            return
+        self.export_status.value = f"{result['rows']:,} filas exportadas"
+        self.page.update()
+
     # --- Métodos de apertura de dialogos ---
     def open_create_dialog(self, e):
         dialog = InventoryItemDialog(page=self.page, inventory_service=self.inventory_service, theme=self.theme, on_save=self.load_data)
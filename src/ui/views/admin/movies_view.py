@@ -1,4 +1,5 @@
 import flet as ft
+import threading
 from typing import Optional
 from src.ui.theme import AppTheme
 from src.services.movie_service import MovieService
@@ -6,6 +7,9 @@ from src.database.connection import DatabaseConnection
 from src.models.models import Movie, MovieStatus
 from src.ui.views.admin.movie_dialog import MovieDialog
 from src.ui.components.movie_card import MovieCard
+from src.ui.components.virtual_grid import VirtualGrid, list_fetcher
+
+PAGE_SIZE = 40
 
 class MoviesView(ft.Container):
     def __init__(self, page: ft.Page, theme: AppTheme):
@@ -15,6 +19,9 @@ class MoviesView(ft.Container):
         self.db = DatabaseConnection()
         self.movie_service = MovieService(self.db)
         self.movies = []
+        self.catalog = self.movie_service.get_loaded_catalog()
+        self._catalog_loading = False
+        self.search_term = ""
         self.content = self._build_ui()
         self._load_movies()
 
@@ -65,6 +72,8 @@ class MoviesView(ft.Container):
             bgcolor=self.theme.color_scheme.surface_variant,
             on_change=self._filter_by_status,
         )
+        self.tag_filter = self._build_facet_dropdown("Etiqueta", 180)
+        self.genre_filter = self._build_facet_dropdown("Género", 180)
         return ft.Row(
             controls=[
                 ft.Container(expand=True), # Pushes controls to the right
@@ -76,6 +85,8 @@ class MoviesView(ft.Container):
                     bgcolor=self.theme.color_scheme.surface_variant,
                     on_change=self._filter_movies
                 ),
+                self.genre_filter,
+                self.tag_filter,
                 self.status_filter,
                 ft.ElevatedButton(
                     "Nueva Película",
@@ -90,8 +101,23 @@ class MoviesView(ft.Container):
             spacing=10
         )
 
+    def _build_facet_dropdown(self, label: str, width: int) -> ft.Dropdown:
+        return ft.Dropdown(
+            hint_text=label,
+            value="",
+            options=[ft.dropdown.Option(key="", text=f"{label}: todas")],
+            width=width,
+            border_radius=10,
+            bgcolor=self.theme.color_scheme.surface_variant,
+            on_change=self._apply_filters,
+            on_focus=self._ensure_catalog,
+        )
+
     def _build_movie_grid(self):
-        self.grid = ft.GridView(
+        self.grid = VirtualGrid(
+            item_builder=self._build_movie_card,
+            placeholder_builder=self._build_card_placeholder,
+            pool_size=PAGE_SIZE * 2,
             expand=True,
             runs_count=5,
             max_extent=220,
@@ -101,14 +127,22 @@ class MoviesView(ft.Container):
         )
         return self.grid
 
-    def _load_movies(self, status: Optional[str] = MovieStatus.ACTIVE.value):
+    def _build_card_placeholder(self) -> ft.Control:
+        return ft.Container(bgcolor=self.theme.color_scheme.surface_variant, border_radius=15, opacity=0.4)
+
+    def _load_movies(self):
+        """
+        Muestra la primera página del estado seleccionado (paginación keyset); las
+        siguientes se piden a la BD a medida que el scroll de la grilla las necesita.
+        El índice del catálogo completo solo se construye cuando el usuario busca o
+        abre un filtro de faceta.
+        """
         if self.loader:
             self.loader.visible = True
             self.main_content.visible = False
             if self.page: self.page.update()
 
-        self.movies = self.movie_service.get_all_movies(status=status)
-        self._render_grid(self.movies)
+        self._apply_filters()
 
         if self.loader:
             self.loader.visible = False
@@ -116,18 +150,71 @@ class MoviesView(ft.Container):
             if self.page: self.page.update()
 
     def _filter_by_status(self, e):
-        status_to_filter = e.control.value
-        self._load_movies(status=status_to_filter)
+        self._apply_filters()
+
+    def _ensure_catalog(self, e=None):
+        """Empieza a construir el índice del catálogo en segundo plano (una sola vez)."""
+        if self.catalog is not None or self._catalog_loading:
+            return
+        self._catalog_loading = True
+        threading.Thread(target=self._load_catalog, daemon=True).start()
+
+    def _load_catalog(self):
+        self.catalog = self.movie_service.get_catalog()
+        self._catalog_loading = False
+        self._apply_filters()
+
+    def _db_page_fetcher(self, status: Optional[str], search: str):
+        def fetch(after):
+            page = self.movie_service.get_all_movies(status=status, page_size=PAGE_SIZE, after=after, search=search)
+            return page, MovieService.next_page_cursor(page, PAGE_SIZE)
+        return fetch
+
+    def _apply_filters(self, e=None):
+        """
+        Con el índice listo, resuelve texto y facetas en memoria; mientras no lo
+        está, el estado y el texto se filtran en la BD pidiendo páginas bajo demanda.
+        """
+        status = self.status_filter.value or None
+        if self.catalog is None:
+            self.grid.set_source(self._db_page_fetcher(status, self.search_term))
+            return
+        result = self.catalog.search(
+            self.search_term,
+            status=status,
+            tag=self.tag_filter.value or None,
+            genre=self.genre_filter.value or None,
+        )
+        self.movies = result.movies
+        self._update_facets(result)
+        self.grid.set_source(list_fetcher(self.movies, PAGE_SIZE))
 
-    def _render_grid(self, movies):
-        self.grid.controls = [self._build_movie_card(m) for m in movies]
-        if self.grid.page:
-            self.grid.update()
+    def _update_facets(self, result):
+        """Muestra los conteos por faceta en las opciones de los filtros."""
+        self.status_filter.options = [
+            ft.dropdown.Option(key=s.value, text=f"{s.value} ({result.status_counts.get(s.value.casefold(), 0)})")
+            for s in MovieStatus
+        ]
+        for dropdown, counts, label in (
+            (self.tag_filter, result.tag_counts, "Etiqueta"),
+            (self.genre_filter, result.genre_counts, "Género"),
+        ):
+            options = [ft.dropdown.Option(key="", text=f"{label}: todas")]
+            for key, count in sorted(counts.items(), key=lambda item: (-item[1], item[0])):
+                options.append(ft.dropdown.Option(key=key, text=f"{self.catalog.facet_label(key)} ({count})"))
+            # Conserva la selección aunque su conteo haya quedado en cero.
+            if dropdown.value and dropdown.value not in counts:
+                options.append(ft.dropdown.Option(key=dropdown.value, text=f"{self.catalog.facet_label(dropdown.value)} (0)"))
+            dropdown.options = options
+        for dropdown in (self.status_filter, self.tag_filter, self.genre_filter):
+            if dropdown.page:
+                dropdown.update()
 
     def _filter_movies(self, e):
-        search_term = e.control.value.lower()
-        filtered = [m for m in self.movies if search_term in m.title.lower()]
-        self._render_grid(filtered)
+        self.search_term = e.control.value or ""
+        self._apply_filters()
+        if self.search_term.strip():
+            self._ensure_catalog()
 
     def _open_movie_dialog(self, e=None, movie: Movie = None): # 'e' can be None for direct calls
         def on_save(movie_data: Movie):
@@ -146,7 +233,7 @@ class MoviesView(ft.Container):
             self.page.snack_bar.open = True
             
             if success:
-                self._load_movies()
+                self._apply_filters() # El servicio ya actualizó el índice del catálogo.
             
             self.page.update()
 
@@ -193,6 +280,6 @@ class MoviesView(ft.Container):
         self.page.snack_bar.open = True
         
         if success:
-            self._load_movies()
+            self._apply_filters()
         
         self.page.update()
@@ -1,5 +1,6 @@
 import flet as ft
 from src.services.inventory_service import InventoryService
+from src.services.recipe_graph import MAX_RECIPE_DEPTH
 from src.ui.theme import AppTheme
 from src.ui.components.dialogs import show_info_dialog, show_confirm_dialog
 from src.ui.views.admin.ingredient_picker_dialog import IngredientPickerDialog
@@ -19,6 +20,7 @@ class RecipesView(ft.Container):
         # Estado
         self.selected_product = None
         self.current_recipe = []
+        self.product_costs = {}
 
         # --- Controles UI ---
         
@@ -94,6 +96,8 @@ class RecipesView(ft.Container):
 
     def load_products(self):
         self.all_products = self.inventory_service.get_products_with_category()
+        # Costo y margen materializados: una consulta para todo el catálogo.
+        self.product_costs = self.inventory_service.recipe_costs.get_product_costs()
         self.render_product_list(self.all_products)
 
     def filter_products(self, e):
@@ -111,7 +115,7 @@ class RecipesView(ft.Container):
             tile = ft.ListTile(
                 leading=ft.Icon(has_recipe_icon, color=color, size=16),
                 title=ft.Text(p['name'], size=14, weight=ft.FontWeight.BOLD),
-                subtitle=ft.Text(f"{p['product_type']} - ${p['price']}", size=12),
+                subtitle=ft.Text(f"{p['product_type']} - ${p['price']}{self._margin_label(p['id'])}", size=12),
                 on_click=lambda e, prod=p: self.select_product(prod),
                 selected=self.selected_product and self.selected_product['id'] == p['id']
             )
@@ -122,16 +126,28 @@ class RecipesView(ft.Container):
             self.product_list.update()
 
     def _product_has_recipe(self, product_id):
-        # Esta lógica idealmente vendría del servicio para no hacer N+1 queries, 
-        # pero por ahora lo simulamos o asumimos que 'products' trae un flag.
-        # TODO: Optimizar en InventoryService
-        return False 
+        # Los productos con receta tienen costo materializado en product_costs.
+        cost = self.product_costs.get(product_id)
+        return bool(cost and cost['recipe_cost'] is not None)
+
+    def _margin_label(self, product_id):
+        cost = self.product_costs.get(product_id)
+        if not cost or cost['recipe_cost'] is None:
+            return ""
+        label = f" · Costo ${cost['recipe_cost']:.2f}"
+        if cost['margin_pct'] is not None:
+            label += f" · Margen {cost['margin_pct']:.0%}"
+        return label
 
     def select_product(self, product):
         self.selected_product = product
         
         # Actualizar Header
         self.recipe_header.value = f"Editando Estructura de: {product['name']} ({product['product_type']})"
+        graph = self.inventory_service.get_recipe_graph()
+        if graph:
+            self.recipe_header.value += f" · Anidación: {graph.depth(product['id'])} (máx. catálogo: {graph.max_depth}/{MAX_RECIPE_DEPTH})"
+        self.recipe_header.value += self._margin_label(product['id'])
         self.recipe_header.style = ft.TextThemeStyle.TITLE_LARGE
         self.recipe_header.update()
 
@@ -184,10 +200,12 @@ class RecipesView(ft.Container):
 
     def open_ingredient_picker(self, e):
         def on_selected(component):
-            # Validar que no se agregue a sí mismo ni cree ciclos simples (TODO: Validación profunda en backend)
-            if component.get('child_product_id') == self.selected_product['id']:
-                show_info_dialog(self.page, "Error Circular", "Un producto no puede contenerse a sí mismo.")
-                return
+            # Validar contra el grafo completo: ciclos indirectos y anidación máxima
+            if component.get('child_product_id'):
+                error = self.inventory_service.validate_recipe(self.selected_product['id'], self.current_recipe + [component])
+                if error:
+                    show_info_dialog(self.page, "Estructura Inválida", error)
+                    return
 
             self.current_recipe.append(component)
             self.render_recipe_table()
@@ -209,6 +227,11 @@ class RecipesView(ft.Container):
     def save_current_recipe(self, e):
         if not self.selected_product: return
         
+        error = self.inventory_service.validate_recipe(self.selected_product['id'], self.current_recipe)
+        if error:
+            show_info_dialog(self.page, "Estructura Inválida", error)
+            return
+
         success = self.inventory_service.update_recipe_for_product(
             self.selected_product['id'], 
             self.current_recipe
@@ -15,9 +15,15 @@ class SeatEditorDialog(ft.AlertDialog):
         self.theater_service = theater_service
         self.on_save = on_save
         
-        self.seats_to_render: list[Seat] = []
+        # Índice espacial (x, y) -> asiento y (x, y) -> control de celda, para ediciones O(1).
+        self.seat_index: dict[tuple[int, int], Seat] = {}
+        self.cell_controls: dict[tuple[int, int], ft.Container] = {}
         self.seat_types: list[SeatType] = []
+        self.seat_type_map: dict[int, SeatType] = {}
         self.current_tool = "select"
+        # Modo de aplicación de la herramienta: celda, rectángulo (dos clics) o fila completa.
+        self.apply_mode = "cell"
+        self.rect_anchor: tuple[int, int] | None = None
         self.max_x = 0
         self.max_y = 0
 
@@ -40,12 +46,14 @@ class SeatEditorDialog(ft.AlertDialog):
 
     def _load_initial_data(self):
         """Carga los asientos y tipos de asiento existentes para inicializar el editor."""
-        self.seats_to_render = self.theater_service.get_theater_seats(self.theater.id)
+        seats = self.theater_service.get_theater_seats(self.theater.id)
         self.seat_types = self.theater_service.get_all_seat_types()
+        self.seat_type_map = {st.id: st for st in self.seat_types}
+        self.seat_index = {(s.x_position, s.y_position): s for s in seats}
         
-        if self.seats_to_render:
-            self.max_x = max((s.x_position for s in self.seats_to_render), default=0)
-            self.max_y = max((s.y_position for s in self.seats_to_render), default=0)
+        if self.seat_index:
+            self.max_x = max(x for x, _ in self.seat_index)
+            self.max_y = max(y for _, y in self.seat_index)
         else: 
             self.max_x = 15
             self.max_y = 10
@@ -117,6 +125,15 @@ class SeatEditorDialog(ft.AlertDialog):
             if "VIP" in seat_type.name: icon = ft.Icons.DIAMOND
             if "Discapacitados" in seat_type.name: icon = ft.Icons.ACCESSIBLE
             tool_controls.append(self._build_tool_button(f"type_{seat_type.id}", icon, seat_type.name))
+
+        tool_controls.append(ft.Divider(height=10))
+        tool_controls.append(ft.Text("Aplicar en", weight=ft.FontWeight.BOLD))
+        apply_modes = [
+            ("cell", ft.Icons.CROP_SQUARE, "Celda"),
+            ("rect", ft.Icons.HIGHLIGHT_ALT, "Rectángulo"),
+            ("row", ft.Icons.TABLE_ROWS, "Fila completa"),
+        ]
+        tool_controls.extend([self._build_mode_button(m[0], m[1], m[2]) for m in apply_modes])
             
         return ft.Container(
             content=ft.Column(tool_controls, spacing=10, alignment=ft.MainAxisAlignment.START),
@@ -138,13 +155,41 @@ class SeatEditorDialog(ft.AlertDialog):
             on_click=lambda e, tid=tool_id: self._select_tool(tid)
         )
 
+    def _build_mode_button(self, mode_id, icon, label):
+        """Crea un botón para elegir el modo de aplicación de la herramienta."""
+        is_selected = self.apply_mode == mode_id
+        return ft.Container(
+            content=ft.Row([ft.Icon(icon, size=20), ft.Text(label, size=12)], spacing=8),
+            padding=10,
+            bgcolor=self.theme.color_scheme.primary_container if is_selected else ft.Colors.TRANSPARENT,
+            border_radius=8,
+            ink=True,
+            on_click=lambda e, mid=mode_id: self._select_mode(mid)
+        )
+
+    def _select_mode(self, mode_id):
+        """Cambia el modo de aplicación y descarta un rectángulo a medio definir."""
+        self.apply_mode = mode_id
+        previous_anchor, self.rect_anchor = self.rect_anchor, None
+        if previous_anchor and previous_anchor in self.cell_controls:
+            self._style_cell(self.cell_controls[previous_anchor], *previous_anchor)
+        messages = {
+            "cell": "Modo celda: la herramienta se aplica a un asiento por clic.",
+            "rect": "Modo rectángulo: haz clic en una esquina y luego en la opuesta.",
+            "row": "Modo fila: la herramienta se aplica a toda la fila pulsada.",
+        }
+        self.status_bar.value = messages.get(mode_id, "")
+        self.toolbar.content.controls = self._build_toolbar().content.controls
+        self.page.update()
+
     def _select_tool(self, tool_id):
         """Maneja la selección de una nueva herramienta y actualiza el feedback."""
         self.current_tool = tool_id
         tool_name = tool_id
         if tool_id.startswith("type_"):
             type_id = int(tool_id.split('_')[1])
-            tool_name = next((st.name for st in self.seat_types if st.id == type_id), "desconocido")
+            seat_type = self.seat_type_map.get(type_id)
+            tool_name = seat_type.name if seat_type else "desconocido"
         
         self.status_bar.value = f"Herramienta seleccionada: {tool_name.capitalize()}"
         # Re-render para mostrar visualmente la herramienta seleccionada.
@@ -152,28 +197,36 @@ class SeatEditorDialog(ft.AlertDialog):
         self.page.update()
 
     def _build_seat_grid(self):
-        """Construye la parrilla de asientos basada en los datos actuales."""
-        seat_map = {(s.x_position, s.y_position): s for s in self.seats_to_render}
+        """Construye la parrilla de asientos una sola vez y registra cada celda en el índice."""
+        self.cell_controls.clear()
         rows = []
         for y in range(self.max_y + 1):
             row_controls = []
             for x in range(self.max_x + 1):
-                seat = seat_map.get((x, y))
-                row_controls.append(self._build_seat_control(x, y, seat))
+                row_controls.append(self._build_seat_control(x, y))
             rows.append(ft.Row(row_controls, alignment=ft.MainAxisAlignment.CENTER, spacing=5))
         return ft.Column(rows, alignment=ft.MainAxisAlignment.CENTER, spacing=5, scroll=ft.ScrollMode.AUTO)
 
-    def _build_seat_control(self, x, y, seat: Seat | None):
-        """Crea un control individual y visual para un asiento en la parrilla."""
+    def _build_seat_control(self, x, y):
+        """Crea el control de una celda de la parrilla; su aspecto se delega a _style_cell."""
+        control = ft.Container(
+            width=30, height=30, border_radius=4,
+            on_click=lambda e: self._on_seat_click(x, y),
+        )
+        self._style_cell(control, x, y)
+        self.cell_controls[(x, y)] = control
+        return control
+
+    def _style_cell(self, control: ft.Container, x, y):
+        """Asigna color, icono y tooltip de una celda según el asiento que ocupa."""
+        seat = self.seat_index.get((x, y))
         color = ft.Colors.GREY_300 # Color por defecto para pasillos.
         icon = None
         tooltip_text = f"Pasillo ({x},{y})"
-        seat_type_map = {st.id: st for st in self.seat_types}
 
         if seat:
-            seat_type = seat_type_map.get(seat.seat_type_id)
+            seat_type = self.seat_type_map.get(seat.seat_type_id)
             seat_type_name = seat_type.name if seat_type else "Desconocido"
-            # Tooltip mejorado con más información.
             tooltip_text = f"Asiento {seat.row_label}{seat.number} ({seat_type_name}) - {seat.status}"
             
             # Asigna color basado en el estado y tipo de asiento.
@@ -186,72 +239,142 @@ class SeatEditorDialog(ft.AlertDialog):
                 else: color = self.theme.color_scheme.primary
             else:
                  color = self.theme.color_scheme.primary
-        
-        return ft.Container(
-            content=ft.Icon(icon, size=16, color=ft.Colors.WHITE) if icon else None,
-            width=30, height=30, bgcolor=color, border_radius=4,
-            on_click=lambda e: self._on_seat_click(x, y),
-            tooltip=tooltip_text
-        )
 
-    def _on_seat_click(self, x, y):
-        """Maneja la lógica de edición al hacer clic en un asiento y da feedback."""
-        seat = next((s for s in self.seats_to_render if s.x_position == x and s.y_position == y), None)
-        self.status_bar.value = "" # Limpia la barra de estado.
+        if (x, y) == self.rect_anchor:
+            control.border = ft.border.all(2, self.theme.color_scheme.error)
+        else:
+            control.border = None
+        control.bgcolor = color
+        control.content = ft.Icon(icon, size=16, color=ft.Colors.WHITE) if icon else None
+        control.tooltip = tooltip_text
 
-        if self.current_tool == "select":
-            self.status_bar.value = f"Información: {seat.row_label}{seat.number} ({seat.status})" if seat else f"Posición vacía ({x},{y})."
-        
-        elif self.current_tool == "delete":
-            if seat:
-                self.seats_to_render.remove(seat)
-                self.status_bar.value = f"Asiento en ({x},{y}) eliminado. Se convertirá en pasillo."
-            else:
-                self.status_bar.value = "Acción no aplicable: ya es un pasillo."
-        
-        elif self.current_tool == "broken":
-            if seat:
-                is_currently_broken = seat.status == SeatStatus.BROKEN.value
-                seat.status = SeatStatus.ACTIVE.value if is_currently_broken else SeatStatus.BROKEN.value
-                self.status_bar.value = f"Asiento {seat.row_label}{seat.number} ahora está {'ACTIVO' if is_currently_broken else 'BLOQUEADO'}."
-            else:
-                self.status_bar.value = "Acción no aplicable: no se puede bloquear un pasillo."
+    def _refresh_cells(self, positions):
+        """Re-estiliza solo las celdas indicadas y envía una única actualización al cliente."""
+        for pos in positions:
+            control = self.cell_controls.get(pos)
+            if control:
+                self._style_cell(control, *pos)
+        self.page.update()
 
-        elif self.current_tool.startswith("type_"):
-            type_id = int(self.current_tool.split('_')[1])
-            seat_type = next((st for st in self.seat_types if st.id == type_id), None)
-            
-            if not seat_type:
-                self.status_bar.value = "Error: Tipo de asiento no encontrado."
-                self.page.update()
-                return
+    def _row_label_for(self, y):
+        row_labels = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+        return row_labels[y] if y < len(row_labels) else f"F{y+1}"
+
+    def _apply_tool_to_cell(self, x, y, force_broken: bool | None = None) -> bool:
+        """
+        Aplica la herramienta actual a una celda. Retorna True si la celda cambió.
+        `force_broken` fija el estado en ediciones masivas en lugar de alternarlo.
+        """
+        seat = self.seat_index.get((x, y))
+
+        if self.current_tool == "delete":
+            if seat:
+                del self.seat_index[(x, y)]
+                return True
+            return False
 
-            row_labels = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-            row_label = row_labels[y] if y < len(row_labels) else f"F{y+1}"
+        if self.current_tool == "broken":
+            if not seat:
+                return False
+            make_broken = force_broken if force_broken is not None else seat.status != SeatStatus.BROKEN.value
+            new_status = SeatStatus.BROKEN.value if make_broken else SeatStatus.ACTIVE.value
+            if seat.status == new_status:
+                return False
+            seat.status = new_status
+            return True
 
+        if self.current_tool.startswith("type_"):
+            type_id = int(self.current_tool.split('_')[1])
             if seat:
+                if seat.seat_type_id == type_id and seat.status == SeatStatus.ACTIVE.value:
+                    return False
                 seat.seat_type_id = type_id
                 seat.status = SeatStatus.ACTIVE.value # Activa el asiento al cambiarle el tipo.
-                self.status_bar.value = f"Asiento {seat.row_label}{seat.number} cambiado a tipo '{seat_type.name}'."
             else:
                 # Crea un nuevo objeto de asiento si el espacio estaba vacío.
-                new_seat = Seat(
+                self.seat_index[(x, y)] = Seat(
                     id=None, theater_id=self.theater.id,
-                    row_label=row_label, number=x + 1,
+                    row_label=self._row_label_for(y), number=x + 1,
                     seat_type_id=type_id, status=SeatStatus.ACTIVE.value,
                     x_position=x, y_position=y,
                     seat_type_name="", price_modifier=0
                 )
-                self.seats_to_render.append(new_seat)
-                self.status_bar.value = f"Nuevo asiento '{seat_type.name}' creado en ({x},{y})."
-        
-        self.seat_grid.controls = self._build_seat_grid().controls
-        self.page.update()
+            return True
+
+        return False
+
+    def _apply_tool_to_area(self, positions):
+        """Aplica la herramienta actual a un conjunto de celdas con una sola actualización de UI."""
+        positions = list(positions)
+        force_broken = None
+        if self.current_tool == "broken":
+            # En masa: bloquea todo salvo que todos los asientos del área ya estén bloqueados.
+            area_seats = [self.seat_index[p] for p in positions if p in self.seat_index]
+            force_broken = not all(s.status == SeatStatus.BROKEN.value for s in area_seats)
+        changed = [p for p in positions if self._apply_tool_to_cell(*p, force_broken=force_broken)]
+        return changed
+
+    def _on_seat_click(self, x, y):
+        """Maneja la lógica de edición al hacer clic en una celda y da feedback."""
+        seat = self.seat_index.get((x, y))
+        self.status_bar.value = "" # Limpia la barra de estado.
+
+        if self.current_tool == "select":
+            self.status_bar.value = f"Información: {seat.row_label}{seat.number} ({seat.status})" if seat else f"Posición vacía ({x},{y})."
+            self.page.update()
+            return
+
+        if self.current_tool.startswith("type_"):
+            type_id = int(self.current_tool.split('_')[1])
+            if type_id not in self.seat_type_map:
+                self.status_bar.value = "Error: Tipo de asiento no encontrado."
+                self.page.update()
+                return
+
+        if self.apply_mode == "rect":
+            if self.rect_anchor is None:
+                self.rect_anchor = (x, y)
+                self.status_bar.value = f"Esquina inicial en ({x},{y}). Haz clic en la esquina opuesta."
+                self._refresh_cells([(x, y)])
+                return
+            (ax, ay), previous_anchor = self.rect_anchor, self.rect_anchor
+            self.rect_anchor = None
+            positions = [
+                (cx, cy)
+                for cy in range(min(ay, y), max(ay, y) + 1)
+                for cx in range(min(ax, x), max(ax, x) + 1)
+            ]
+            changed = self._apply_tool_to_area(positions)
+            self.status_bar.value = f"{len(changed)} celdas modificadas en el rectángulo ({ax},{ay})-({x},{y})."
+            self._refresh_cells(set(changed) | {previous_anchor})
+            return
+
+        if self.apply_mode == "row":
+            positions = [(cx, y) for cx in range(self.max_x + 1)]
+            changed = self._apply_tool_to_area(positions)
+            self.status_bar.value = f"{len(changed)} celdas modificadas en la fila {self._row_label_for(y)}."
+            self._refresh_cells(changed)
+            return
+
+        if self._apply_tool_to_cell(x, y):
+            seat = self.seat_index.get((x, y))
+            if self.current_tool == "delete":
+                self.status_bar.value = f"Asiento en ({x},{y}) eliminado. Se convertirá en pasillo."
+            elif self.current_tool == "broken":
+                is_broken = seat.status == SeatStatus.BROKEN.value
+                self.status_bar.value = f"Asiento {seat.row_label}{seat.number} ahora está {'BLOQUEADO' if is_broken else 'ACTIVO'}."
+            else:
+                self.status_bar.value = f"Asiento {seat.row_label}{seat.number} ({x},{y}) ahora es '{self.seat_type_map[seat.seat_type_id].name}'."
+        else:
+            self.status_bar.value = "Acción no aplicable en esta posición."
+        self._refresh_cells([(x, y)])
 
     def _save_layout(self, e):
         """Guarda todo el layout (creaciones, actualizaciones, borrados) en la BD."""
         try:
-            self.theater_service.update_seat_layout(self.theater.id, self.seats_to_render)
+            self.theater.layout_version = self.theater_service.update_seat_layout(
+                self.theater.id, list(self.seat_index.values()), expected_version=self.theater.layout_version
+            )
             self.on_save()
             self.close(e)
         except Exception as ex:
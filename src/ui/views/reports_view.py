@@ -1,14 +1,351 @@
 import flet as ft
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 from src.ui.theme import AppTheme
+from src.database.connection import DatabaseConnection
+from src.services.report_service import SalesReport
+from src.services.report_jobs import JobStatus, ReportJob, ReportSpec, get_report_runner
+from src.models.seat_layout import EMPTY_CELL
+from src.services.occupancy_service import OccupancyService, OccupancyReport, SeatHeatmap
+
+RANGE_PRESETS = {
+    "today": "Hoy",
+    "last_7": "Últimos 7 días",
+    "month": "Este mes",
+    "last_30": "Últimos 30 días",
+}
+
+def resolve_range(preset: str, today: Optional[date] = None) -> Tuple[date, date]:
+    """Convierte un preset del selector en un rango [desde, hasta] inclusive."""
+    today = today or date.today()
+    if preset == "last_7":
+        return today - timedelta(days=6), today
+    if preset == "month":
+        return today.replace(day=1), today
+    if preset == "last_30":
+        return today - timedelta(days=29), today
+    return today, today
 
 class ReportsView:
+    """
+    Vista de reportes de ventas y ocupación. Los reportes se calculan como
+    trabajos de fondo (ReportJobRunner) para no bloquear el handler de Flet.
+    """
     def __init__(self, page: ft.Page, theme: AppTheme):
         self.page = page
         self.theme = theme
+        self.runner = get_report_runner()
+        self.occupancy_service = OccupancyService(DatabaseConnection())
+        self.job: Optional[ReportJob] = None
+        self.report: Optional[SalesReport] = None
+        self.occupancy_report: Optional[OccupancyReport] = None
 
     def build(self):
+        self.range_selector = ft.Dropdown(
+            value="month",
+            options=[ft.dropdown.Option(key=k, text=v) for k, v in RANGE_PRESETS.items()],
+            width=200,
+            border_radius=10,
+            bgcolor=self.theme.color_scheme.surface_variant,
+        )
+        # Por defecto se leen los rollups por hora; los datos crudos quedan para verificación.
+        self.raw_data_check = ft.Checkbox(label="Datos crudos", value=False)
+        self.capacity_selector = ft.Dropdown(
+            value="theater",
+            options=[
+                ft.dropdown.Option(key="theater", text="Capacidad de sala"),
+                ft.dropdown.Option(key="seats", text="Asientos activos"),
+            ],
+            width=190,
+            border_radius=10,
+            bgcolor=self.theme.color_scheme.surface_variant,
+            visible=False,
+        )
+        self.theater_selector = ft.Dropdown(
+            label="Mapa de calor",
+            options=[ft.dropdown.Option(key=str(t.id), text=t.name) for t in self.occupancy_service.theater_service.get_all_theaters()],
+            width=200,
+            border_radius=10,
+            bgcolor=self.theme.color_scheme.surface_variant,
+            visible=False,
+            on_change=lambda e: self._generate(),
+        )
+        self.tabs = ft.Tabs(
+            selected_index=0,
+            tabs=[ft.Tab(text="Ventas"), ft.Tab(text="Ocupación")],
+            on_change=self._on_tab_change,
+        )
+        self.loader = ft.ProgressBar(width=160, value=0, visible=False)
+        self.cancel_button = ft.IconButton(icon=ft.Icons.CANCEL, tooltip="Cancelar reporte", visible=False,
+                                           on_click=lambda e: self._cancel_job())
+        self.status_text = ft.Text("", size=12, color=self.theme.color_scheme.outline)
+        self.body = ft.Column(spacing=20, scroll=ft.ScrollMode.AUTO, expand=True)
+
+        header = ft.Row(
+            controls=[
+                ft.Icon(ft.Icons.BAR_CHART, size=32, color=self.theme.color_scheme.primary),
+                ft.Text("Reportes", style=self.theme.text_theme.headline_medium, color=self.theme.color_scheme.on_surface),
+                ft.Container(expand=True),
+                self.loader,
+                self.cancel_button,
+                self.raw_data_check,
+                self.capacity_selector,
+                self.theater_selector,
+                self.range_selector,
+                ft.ElevatedButton("Generar", icon=ft.Icons.REFRESH, on_click=lambda e: self._generate()),
+            ],
+            spacing=10,
+        )
+        self._generate(update=False)
+        return ft.Container(
+            content=ft.Column([header, self.tabs, self.status_text, self.body], spacing=10, expand=True),
+            padding=20,
+            expand=True,
+        )
+
+    def _on_tab_change(self, e):
+        occupancy = self.tabs.selected_index == 1
+        self.raw_data_check.visible = not occupancy
+        self.capacity_selector.visible = occupancy
+        self.theater_selector.visible = occupancy
+        self._generate()
+
+    def _generate(self, update: bool = True):
+        """Lanza el reporte seleccionado como trabajo de fondo, cancelando el anterior si sigue en curso."""
+        self._cancel_job()
+        date_from, date_to = resolve_range(self.range_selector.value)
+        if self.tabs.selected_index == 1:
+            spec = ReportSpec("occupancy", date_from, date_to, (("capacity_source", self.capacity_selector.value),))
+        else:
+            spec = ReportSpec("sales_raw" if self.raw_data_check.value else "sales", date_from, date_to)
+        self.loader.value = 0
+        self.loader.visible = True
+        self.cancel_button.visible = True
+        self.status_text.value = "Generando reporte..."
+        self.job = self.runner.submit(spec, on_progress=self._on_job_progress, on_done=self._on_job_done)
+        if update and self.page:
+            self.page.update()
+
+    def _cancel_job(self):
+        if self.job and not self.job.finished:
+            self.job.cancel()
+
+    def _on_job_progress(self, job: ReportJob):
+        if job is not self.job:
+            return
+        self.loader.value = job.progress
+        self.status_text.value = job.message
+        if self.page:
+            self.page.update()
+
+    def _on_job_done(self, job: ReportJob):
+        if job is not self.job:
+            return # Un trabajo reemplazado por otro más reciente.
+        self.loader.visible = False
+        self.cancel_button.visible = False
+        if job.status == JobStatus.CANCELLED:
+            self.status_text.value = "Reporte cancelado."
+        elif job.status != JobStatus.DONE:
+            self.status_text.value = "No se pudo generar el reporte. Revise la conexión a la base de datos."
+            self.body.controls = []
+        elif job.spec.kind == "occupancy":
+            self._show_occupancy(job)
+        else:
+            self._show_sales(job)
+        if self.page:
+            self.page.update()
+
+    def _range_label(self, job: ReportJob) -> str:
+        spec = job.spec
+        source = "caché" if job.from_cache else f"calculado en {job.result.elapsed_ms:.0f} ms"
+        return f"{spec.date_from.strftime('%d/%m/%Y')} - {spec.date_to.strftime('%d/%m/%Y')} · {source}"
+
+    def _show_sales(self, job: ReportJob):
+        self.report = job.result
+        origin = "datos crudos" if job.spec.kind == "sales_raw" else "resumen por hora"
+        self.status_text.value = f"{self._range_label(job)} · {origin}"
+        self.body.controls = self._build_report(self.report)
+
+    def _show_occupancy(self, job: ReportJob):
+        self.occupancy_report = job.result
+        heatmap = None
+        if self.theater_selector.value:
+            # Se ejecuta en el hilo del trabajo: el mapa de calor tampoco bloquea la UI.
+            heatmap = self.occupancy_service.build_seat_heatmap(
+                int(self.theater_selector.value), job.spec.date_from, job.spec.date_to
+            )
+        self.status_text.value = f"{self._range_label(job)} · {self.occupancy_report.showtimes:,} funciones"
+        self.body.controls = self._build_occupancy(self.occupancy_report, heatmap)
+
+    # --- Construcción del reporte ---
+    def _build_report(self, report: SalesReport) -> List[ft.Control]:
+        summary = ft.Row(
+            controls=[
+                self._metric("Ingresos", f"S/ {report.total_revenue:,.2f}"),
+                self._metric("Ventas", f"{report.sales_count:,}"),
+                self._metric("Entradas", f"{report.tickets_count:,}"),
+                self._metric("Precio medio", f"S/ {report.avg_ticket_price:,.2f}"),
+                self._metric("Confitería / entrada", f"S/ {report.concession_per_ticket:,.2f}"),
+                self._metric("Tasa de adjunción", f"{report.attach_rate:.0%}"),
+            ],
+            wrap=True,
+            spacing=15,
+        )
+        days = [(d.strftime("%d/%m"), v) for d, v in report.revenue_by_day]
+        hours = [(f"{h:02d}h", v) for h, v in enumerate(report.revenue_by_hour) if v]
+        return [
+            summary,
+            ft.Row(
+                controls=[
+                    self._section("Ingresos por día", self._bars(days)),
+                    self._section("Ingresos por hora", self._bars(hours)),
+                ],
+                vertical_alignment=ft.CrossAxisAlignment.START,
+                wrap=True,
+            ),
+            ft.Row(
+                controls=[
+                    self._section("Por película", self._table(report.by_movie, [("name", "Película"), ("tickets", "Entradas"), ("revenue", "Ingresos")])),
+                    self._section("Por sala", self._table(report.by_theater, [("name", "Sala"), ("tickets", "Entradas"), ("revenue", "Ingresos")])),
+                ],
+                vertical_alignment=ft.CrossAxisAlignment.START,
+                wrap=True,
+            ),
+            ft.Row(
+                controls=[
+                    self._section("Método de pago", self._table(report.revenue_by_payment, [("payment_method", "Método"), ("sales", "Ventas"), ("revenue", "Ingresos")])),
+                    self._section("Mix de entradas", self._table(report.ticket_mix, [("ticket_type", "Tipo"), ("tickets", "Entradas"), ("share", "%"), ("revenue", "Ingresos")])),
+                ],
+                vertical_alignment=ft.CrossAxisAlignment.START,
+                wrap=True,
+            ),
+            ft.Row(
+                controls=[
+                    self._section("Productos más vendidos", self._table(report.top_products, [("name", "Producto"), ("quantity", "Cantidad"), ("revenue", "Ingresos"), ("food_cost", "Costo"), ("gross_margin", "Margen")])),
+                    self._section("Insumos consumidos", self._table(report.stock_consumption, [("name", "Insumo"), ("quantity", "Cantidad")])),
+                ],
+                vertical_alignment=ft.CrossAxisAlignment.START,
+                wrap=True,
+            ),
+        ]
+
+    def _build_occupancy(self, report: OccupancyReport, heatmap: Optional[SeatHeatmap]) -> List[ft.Control]:
+        load_columns = [("tickets", "Entradas"), ("capacity", "Asientos"), ("load_factor", "Ocupación")]
+        summary = ft.Row(
+            controls=[
+                self._metric("Ocupación", f"{report.load_factor:.0%}"),
+                self._metric("Funciones", f"{report.showtimes:,}"),
+                self._metric("Entradas", f"{report.tickets:,}"),
+                self._metric("Asientos ofrecidos", f"{report.capacity:,}"),
+            ],
+            wrap=True,
+            spacing=15,
+        )
+        controls = [
+            summary,
+            ft.Row(
+                controls=[
+                    self._section("Por película", self._table(report.by_movie, [("name", "Película")] + load_columns)),
+                    self._section("Por sala", self._table(report.by_theater, [("name", "Sala")] + load_columns)),
+                ],
+                vertical_alignment=ft.CrossAxisAlignment.START,
+                wrap=True,
+            ),
+            ft.Row(
+                controls=[
+                    self._section("Por franja horaria", self._table(report.by_day_part, [("name", "Franja")] + load_columns)),
+                    self._section("Por día de la semana", self._table(report.by_weekday, [("name", "Día")] + load_columns)),
+                ],
+                vertical_alignment=ft.CrossAxisAlignment.START,
+                wrap=True,
+            ),
+            self._section("Funciones con menor ocupación", self._table(
+                [dict(row, when=f"{row['date'].strftime('%d/%m')} {row['hour']:02d}h") for row in report.worst_showtimes],
+                [("name", "Película"), ("when", "Función"), ("tickets", "Entradas"), ("load_factor", "Ocupación")],
+            )),
+        ]
+        if heatmap is not None:
+            controls.append(self._section(f"Mapa de calor ({heatmap.showtimes} funciones)", self._heatmap(heatmap)))
+        return controls
+
+    def _heatmap(self, heatmap: SeatHeatmap) -> ft.Control:
+        """Dibuja la parrilla del layout; la opacidad de cada asiento es su popularidad relativa."""
+        if not heatmap.width or not heatmap.height:
+            return ft.Text("La sala no tiene asientos.")
+        popularity = heatmap.popularity
+        peak = float(popularity.max()) or 1.0
+        occupied = heatmap.layout.seat_ids
+        cell = 14
+        rows = []
+        for y in range(heatmap.height):
+            cells = []
+            for x in range(heatmap.width):
+                if occupied[y * heatmap.width + x] == EMPTY_CELL:
+                    cells.append(ft.Container(width=cell, height=cell))
+                    continue
+                value = float(popularity[y, x])
+                cells.append(ft.Container(
+                    width=cell,
+                    height=cell,
+                    border_radius=3,
+                    bgcolor=ft.Colors.with_opacity(0.1 + 0.9 * value / peak, self.theme.color_scheme.primary),
+                    tooltip=f"{value:.0%} de las funciones",
+                ))
+            rows.append(ft.Row(cells, spacing=2))
+        return ft.Column(rows, spacing=2)
+
+    def _metric(self, label: str, value: str) -> ft.Control:
+        return ft.Container(
+            content=ft.Column([
+                ft.Text(label, size=12, color=self.theme.color_scheme.outline),
+                ft.Text(value, size=20, weight=ft.FontWeight.BOLD),
+            ], spacing=4),
+            padding=15,
+            width=180,
+            border_radius=10,
+            bgcolor=self.theme.color_scheme.surface_variant,
+        )
+
+    def _section(self, title: str, content: ft.Control) -> ft.Control:
+        return ft.Container(
+            content=ft.Column([ft.Text(title, weight=ft.FontWeight.BOLD, size=16), content], spacing=10),
+            padding=15,
+            width=520,
+            border_radius=10,
+            border=ft.border.all(1, self.theme.color_scheme.outline_variant),
+        )
+
+    def _bars(self, values: List[Tuple[str, float]]) -> ft.Control:
+        if not values:
+            return ft.Text("Sin datos en el rango.")
+        peak = max(v for _, v in values) or 1
         return ft.Column(
             controls=[
-                ft.Text("Vista de Reportes", style=self.theme.text_theme.headline_medium)
-            ]
+                ft.Row([
+                    ft.Text(label, width=50, size=12),
+                    ft.ProgressBar(value=v / peak, expand=True, color=self.theme.color_scheme.primary),
+                    ft.Text(f"S/ {v:,.2f}", width=110, size=12, text_align=ft.TextAlign.RIGHT),
+                ])
+                for label, v in values
+            ],
+            spacing=4,
+        )
+
+    def _table(self, rows: List[Dict[str, Any]], columns: List[Tuple[str, str]]) -> ft.Control:
+        if not rows:
+            return ft.Text("Sin datos en el rango.")
+
+        def fmt(key: str, value: Any) -> str:
+            if key in ("revenue", "food_cost", "gross_margin"):
+                return f"S/ {value:,.2f}" if value is not None else "—"
+            if key in ("share", "load_factor"):
+                return f"{value:.0%}"
+            if isinstance(value, float):
+                return f"{value:,.2f}"
+            return str(value)
+
+        return ft.DataTable(
+            columns=[ft.DataColumn(ft.Text(label), numeric=key != columns[0][0]) for key, label in columns],
+            rows=[ft.DataRow(cells=[ft.DataCell(ft.Text(fmt(key, row.get(key, "")))) for key, _ in columns]) for row in rows],
+            column_spacing=20,
         )
@@ -4,6 +4,7 @@ from src.models.transaction import Transaction, Ticket, Seat, ConcessionItem
 from src.services.sales_service import SalesService
 from src.ui.components.seat_map import SeatMap
 from src.ui.components.product_card import ProductCard
+from src.utils.image_cache import get_image_cache
 from src.utils.security import current_session
 
 class SalesView(ft.Container):
@@ -23,6 +24,8 @@ class SalesView(ft.Container):
         self.selected_movie: Dict[str, Any] | None = None
         self.selected_showtime: Dict[str, Any] | None = None
         self.selected_ticket_type: str = "Adulto"
+        self.seat_map_component: SeatMap | None = None
+        self.current_seat_data: Dict[str, Any] = {}
         
         self._build_ui_components()
         self.content_area = self._build_content_area()
@@ -51,6 +54,11 @@ class SalesView(ft.Container):
         self.movie_grid = ft.GridView(expand=True, max_extent=200, child_aspect_ratio=0.7, spacing=20, run_spacing=20)
         self.concessions_grid = ft.GridView(expand=True, max_extent=180, child_aspect_ratio=1.0, spacing=20, run_spacing=20)
         self.loading_indicator = ft.ProgressRing(width=50, height=50)
+        self.best_seats_count = ft.Dropdown(
+            width=90, dense=True, value="2",
+            options=[ft.dropdown.Option(str(n)) for n in range(1, 11)],
+        )
+        self.best_seats_button = ft.OutlinedButton("Mejor disponible", icon=ft.Icons.AUTO_AWESOME, on_click=lambda e: self._select_best_available())
         self.continue_button = ft.ElevatedButton("Continuar a Confitería", icon=ft.Icons.FASTFOOD, height=50, on_click=lambda e: self._show_confectionery_step())
 
     def _build_content_area(self) -> ft.Container:
@@ -106,9 +114,21 @@ class SalesView(ft.Container):
         self.update()
         
     def _build_movie_card(self, movie: Dict[str, Any]) -> ft.Control:
+        poster = ft.Image(fit=ft.ImageFit.COVER, expand=True)
+
+        def on_poster_cached(path: str):
+            poster.src = path
+            if poster.page:
+                poster.update()
+
+        # Miniatura local del tamaño de la tarjeta (max_extent=200, aspecto 0.7).
+        poster.src = get_image_cache().thumbnail_src(
+            movie.get("poster_url"), 200, 300,
+            placeholder="https://via.placeholder.com/200x300.png?text=No+Image", on_ready=on_poster_cached,
+        )
         return ft.Card(content=ft.Container(
             content=ft.Column([
-                ft.Image(src=movie.get("poster_url", "https://via.placeholder.com/200x300.png?text=No+Image"), fit=ft.ImageFit.COVER, expand=True),
+                poster,
                 ft.Container(content=ft.Text(movie["title"], weight=ft.FontWeight.BOLD, size=14, no_wrap=True), padding=10)
             ], spacing=0, alignment=ft.MainAxisAlignment.START),
             border_radius=ft.border_radius.all(10), clip_behavior=ft.ClipBehavior.HARD_EDGE, on_click=lambda e: self._on_movie_selected(movie),
@@ -166,20 +186,44 @@ class SalesView(ft.Container):
                 on_change=self._on_ticket_type_changed, selected={self.selected_ticket_type},
                 segments=price_segments
             )
-            seat_map_component = SeatMap(seat_data, self._on_seat_selected, self.theme)
+            self.current_seat_data = seat_data
+            self.seat_map_component = SeatMap(seat_data, self._on_seat_selected, self.theme)
             self.content_area.content = ft.Column([
                 ft.Row([
                     ft.IconButton(icon=ft.Icons.ARROW_BACK, on_click=lambda e: self._on_movie_selected(self.selected_movie)),
-                    ft.Text(f"Paso 2: Selección de Asientos", style=self.theme.text_theme.headline_medium)
+                    ft.Text(f"Paso 2: Selección de Asientos", style=self.theme.text_theme.headline_medium),
+                    ft.Container(expand=True),
+                    ft.IconButton(icon=ft.Icons.REFRESH, tooltip="Actualizar ocupación", on_click=lambda e: self._refresh_seat_occupancy()),
                 ]),
                 ft.Divider(),
                 ft.Row([ft.Text("Seleccione el tipo de entrada:"), ticket_type_selector], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                ft.Row([ft.Text("Cantidad:"), self.best_seats_count, self.best_seats_button], alignment=ft.MainAxisAlignment.END),
                 ft.Container(height=10),
-                seat_map_component,
+                self.seat_map_component,
                 ft.Row([self.continue_button], alignment=ft.MainAxisAlignment.END)
             ], expand=True)
         self.update()
 
+    def _refresh_seat_occupancy(self):
+        """Trae la ocupación actual de la función y actualiza solo los asientos que cambiaron."""
+        if not self.seat_map_component or not self.selected_showtime:
+            return
+        occupied = self.sales_service.get_occupied_seat_ids(self.selected_showtime["showtime_id"])
+        self.seat_map_component.update_occupancy(occupied)
+
+    def _select_best_available(self):
+        """Asigna automáticamente el mejor bloque de asientos contiguos disponibles."""
+        if not self.seat_map_component:
+            return
+        count = int(self.best_seats_count.value or 1)
+        seat_ids = self.sales_service.find_best_available_seats(
+            self.current_seat_data, count, exclude_seat_ids=self.seat_map_component.selected_seats
+        )
+        if not seat_ids:
+            self.page.open(ft.SnackBar(ft.Text(f"No hay {count} asientos contiguos disponibles.")))
+            return
+        self.seat_map_component.select_seats(seat_ids)
+
     def _on_ticket_type_changed(self, e: ft.ControlEvent):
         self.selected_ticket_type = e.data
         self.update()
@@ -0,0 +1,286 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from src.config.settings import Config
+
+try: # Pillow es opcional: sin él se cachea el original sin redimensionar.
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+_MANIFEST = "manifest.json"
+_DOWNLOAD_TIMEOUT = 10
+
+def _is_remote(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+class ImageCache:
+    """
+    Caché en disco de imágenes direccionada por contenido.
+
+    Los originales se guardan como `<sha256>.orig` y las miniaturas como
+    `<sha256>_<ancho>x<alto>.<ext>` (extensión según el formato real), así una
+    misma imagen referida desde varias URLs o rutas se almacena una sola vez. Un manifiesto JSON guarda la
+    resolución fuente -> hash y el último acceso de cada archivo; cuando el
+    total supera `max_bytes` se eliminan los menos usados recientemente (LRU).
+    Las URLs remotas se descargan en segundo plano: mientras tanto se sigue
+    mostrando la URL original.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int, workers: int = 2):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._pending: Dict[Tuple[str, int, int], bool] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-cache")
+        os.makedirs(cache_dir, exist_ok=True)
+        self._sources: Dict[str, Dict] = {}
+        self._entries: Dict[str, Dict] = {} # nombre de archivo -> {"size", "atime"}
+        self._load_manifest()
+        self._thumbnails: Dict[str, str] = { # "<sha256>_<ancho>x<alto>" -> nombre de archivo
+            name.rsplit(".", 1)[0]: name for name in self._entries if not name.endswith(".orig")
+        }
+
+    # --- Manifiesto ---
+    def _load_manifest(self):
+        path = os.path.join(self.cache_dir, _MANIFEST)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._sources = data.get("sources", {})
+            self._entries = {
+                name: info for name, info in data.get("entries", {}).items()
+                if os.path.exists(os.path.join(self.cache_dir, name))
+            }
+        except (OSError, ValueError):
+            self._sources, self._entries = {}, {}
+
+    def _save_manifest(self):
+        path = os.path.join(self.cache_dir, _MANIFEST)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"sources": self._sources, "entries": self._entries}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.exception("No se pudo guardar el manifiesto de la caché de imágenes.")
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(info["size"] for info in self._entries.values())
+
+    # --- API pública ---
+    def cached_thumbnail(self, source: Optional[str], width: int, height: int) -> Optional[str]:
+        """Ruta local de la miniatura si ya existe (no descarga ni procesa nada)."""
+        if not source:
+            return None
+        with self._lock:
+            digest = self._known_digest(source)
+            if not digest:
+                return None
+            name = self._find_thumbnail(digest, width, height)
+            if name:
+                self._touch(name)
+                return os.path.join(self.cache_dir, name)
+        return None
+
+    def get_thumbnail(self, source: Optional[str], width: int, height: int) -> Optional[str]:
+        """
+        Retorna la ruta local de una miniatura que cubre `width x height`,
+        generándola (y descargando el original si es remoto) de forma síncrona.
+        Retorna None si la imagen no se pudo obtener.
+        """
+        if not source:
+            return None
+        cached = self.cached_thumbnail(source, width, height)
+        if cached:
+            return cached
+        data, digest = self._read_source(source)
+        if data is None:
+            return None
+        with self._lock:
+            name = self._find_thumbnail(digest, width, height)
+            if not name:
+                thumbnail, extension = self._resize(data, width, height)
+                name = f"{self._thumbnail_stem(digest, width, height)}.{extension}"
+                self._write_entry(name, thumbnail)
+            self._touch(name)
+            self._evict()
+            self._save_manifest()
+            return os.path.join(self.cache_dir, name)
+
+    def thumbnail_src(self, source: Optional[str], width: int, height: int, placeholder: str = "",
+                      on_ready: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Valor para `ft.Image.src`: la miniatura local si está lista; si no, los
+        archivos locales se procesan al momento y las URLs remotas se encolan en
+        segundo plano (se retorna la URL original y `on_ready` recibe la ruta local).
+        """
+        if not source:
+            return placeholder
+        cached = self.cached_thumbnail(source, width, height)
+        if cached:
+            return cached
+        if not _is_remote(source):
+            return self.get_thumbnail(source, width, height) or placeholder
+        key = (source, width, height)
+        with self._lock:
+            if key not in self._pending:
+                self._pending[key] = True
+                self._executor.submit(self._fetch_in_background, key, on_ready)
+        return source
+
+    def clear(self):
+        """Vacía la caché por completo."""
+        with self._lock:
+            for name in list(self._entries):
+                self._remove_entry(name)
+            self._sources = {}
+            self._save_manifest()
+
+    # --- Internos ---
+    def _fetch_in_background(self, key: Tuple[str, int, int], on_ready: Optional[Callable[[str], None]]):
+        try:
+            path = self.get_thumbnail(*key)
+            if path and on_ready:
+                on_ready(path)
+        except Exception:
+            logger.exception(f"Error al cachear la imagen {key[0]}")
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _known_digest(self, source: str) -> Optional[str]:
+        info = self._sources.get(source)
+        if not info:
+            return None
+        if not _is_remote(source):
+            # Un archivo local que cambió (mtime/tamaño) invalida el hash registrado.
+            try:
+                stat = os.stat(source)
+            except OSError:
+                return None
+            if info.get("stamp") != [stat.st_mtime, stat.st_size]:
+                return None
+        return info["digest"]
+
+    def _read_source(self, source: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """Obtiene los bytes originales (desde la caché, el disco o la red) y su sha256."""
+        with self._lock:
+            digest = self._known_digest(source)
+            if digest and f"{digest}.orig" in self._entries:
+                self._touch(f"{digest}.orig")
+                with open(os.path.join(self.cache_dir, f"{digest}.orig"), "rb") as f:
+                    return f.read(), digest
+        try:
+            if _is_remote(source):
+                with urllib.request.urlopen(source, timeout=_DOWNLOAD_TIMEOUT) as response:
+                    data = response.read()
+                stamp = None
+            else:
+                with open(source, "rb") as f:
+                    data = f.read()
+                stat = os.stat(source)
+                stamp = [stat.st_mtime, stat.st_size]
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer la imagen {source}: {e}")
+            return None, None
+
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._sources[source] = {"digest": digest, "stamp": stamp}
+            if _is_remote(source) and f"{digest}.orig" not in self._entries:
+                # Solo se guarda el original remoto (el local ya está en disco).
+                self._write_entry(f"{digest}.orig", data)
+        return data, digest
+
+    @staticmethod
+    def _thumbnail_stem(digest: str, width: int, height: int) -> str:
+        return f"{digest}_{width}x{height}"
+
+    def _find_thumbnail(self, digest: str, width: int, height: int) -> Optional[str]:
+        return self._thumbnails.get(self._thumbnail_stem(digest, width, height))
+
+    @staticmethod
+    def _sniff_extension(data: bytes) -> str:
+        if data.startswith(b"\x89PNG"):
+            return "png"
+        if data.startswith(b"\xff\xd8"):
+            return "jpg"
+        if data.startswith((b"GIF87a", b"GIF89a")):
+            return "gif"
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return "webp"
+        return "img"
+
+    @classmethod
+    def _resize(cls, data: bytes, width: int, height: int) -> Tuple[bytes, str]:
+        """Reduce la imagen hasta cubrir `width x height` (para ImageFit.COVER); nunca amplía."""
+        if Image is None:
+            return data, cls._sniff_extension(data)
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                scale = max(width / img.width, height / img.height)
+                if scale < 1:
+                    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+                    img = img.resize(size, Image.LANCZOS)
+                output = io.BytesIO()
+                if img.mode in ("RGBA", "LA", "P"):
+                    img.save(output, format="PNG", optimize=True)
+                    return output.getvalue(), "png"
+                img.convert("RGB").save(output, format="JPEG", quality=85, optimize=True)
+                return output.getvalue(), "jpg"
+        except Exception:
+            logger.warning("Formato de imagen no soportado, se cachea el original.")
+            return data, cls._sniff_extension(data)
+
+    def _write_entry(self, name: str, data: bytes):
+        path = os.path.join(self.cache_dir, name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._entries[name] = {"size": len(data), "atime": time.time()}
+        if not name.endswith(".orig"):
+            self._thumbnails[name.rsplit(".", 1)[0]] = name
+
+    def _touch(self, name: str):
+        self._entries[name]["atime"] = time.time()
+
+    def _remove_entry(self, name: str):
+        self._entries.pop(name, None)
+        self._thumbnails.pop(name.rsplit(".", 1)[0], None)
+        try:
+            os.remove(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+
+    def _evict(self):
+        total = self.total_bytes
+        if total <= self.max_bytes:
+            return
+        for name, info in sorted(self._entries.items(), key=lambda item: item[1]["atime"]):
+            if total <= self.max_bytes:
+                break
+            total -= info["size"]
+            self._remove_entry(name)
+
+_image_cache: Optional[ImageCache] = None
+_image_cache_lock = threading.Lock()
+
+def get_image_cache() -> ImageCache:
+    """Instancia compartida de la caché configurada en `Config`."""
+    global _image_cache
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = ImageCache(Config.IMAGE_CACHE_DIR, Config.IMAGE_CACHE_MAX_MB * 1024 * 1024)
+        return _image_cache
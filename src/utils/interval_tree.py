@@ -0,0 +1,119 @@
+import random
+from typing import Any, Iterator, List, Optional, Tuple
+
+class _Node:
+    __slots__ = ("start", "end", "payload", "max_end", "priority", "left", "right")
+
+    def __init__(self, start, end, payload):
+        self.start = start
+        self.end = end
+        self.payload = payload
+        self.max_end = end
+        self.priority = random.random()
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+    def recompute(self):
+        self.max_end = self.end
+        if self.left and self.left.max_end > self.max_end:
+            self.max_end = self.left.max_end
+        if self.right and self.right.max_end > self.max_end:
+            self.max_end = self.right.max_end
+
+class IntervalTree:
+    """
+    Árbol de intervalos semiabiertos [start, end) implementado como treap
+    ordenado por `start` y aumentado con el `end` máximo de cada subárbol.
+    Inserción y búsqueda de solapamientos en O(log n) esperado.
+    Sirve con cualquier tipo comparable (datetime, int...).
+    """
+    def __init__(self):
+        self._root: Optional[_Node] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, start, end, payload: Any = None):
+        """Agrega el intervalo [start, end) con un dato asociado."""
+        self._root = self._insert(self._root, _Node(start, end, payload))
+        self._size += 1
+
+    def _insert(self, node: Optional[_Node], new: _Node) -> _Node:
+        if node is None:
+            return new
+        if new.start < node.start:
+            node.left = self._insert(node.left, new)
+            if node.left.priority > node.priority:
+                node = self._rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new)
+            if node.right.priority > node.priority:
+                node = self._rotate_left(node)
+        node.recompute()
+        return node
+
+    @staticmethod
+    def _rotate_right(node: _Node) -> _Node:
+        pivot = node.left
+        node.left = pivot.right
+        pivot.right = node
+        node.recompute()
+        pivot.recompute()
+        return pivot
+
+    @staticmethod
+    def _rotate_left(node: _Node) -> _Node:
+        pivot = node.right
+        node.right = pivot.left
+        pivot.left = node
+        node.recompute()
+        pivot.recompute()
+        return pivot
+
+    def find_overlap(self, start, end) -> Optional[Tuple[Any, Any, Any]]:
+        """Retorna un (start, end, payload) que se solape con [start, end), o None."""
+        node = self._root
+        while node is not None:
+            if node.start < end and node.end > start:
+                return (node.start, node.end, node.payload)
+            # Si el subárbol izquierdo puede contener un solapamiento, se baja por él;
+            # de lo contrario ningún intervalo de la izquierda termina después de `start`.
+            if node.left is not None and node.left.max_end > start:
+                node = node.left
+            elif node.start < end:
+                node = node.right
+            else:
+                return None
+        return None
+
+    def overlaps(self, start, end) -> bool:
+        return self.find_overlap(start, end) is not None
+
+    def find_all_overlaps(self, start, end) -> List[Tuple[Any, Any, Any]]:
+        """Retorna todos los intervalos que se solapan con [start, end), ordenados por inicio."""
+        result = []
+        stack = [self._root] if self._root else []
+        while stack:
+            node = stack.pop()
+            if node.max_end <= start:
+                continue
+            if node.right is not None and node.start < end:
+                stack.append(node.right)
+            if node.start < end and node.end > start:
+                result.append((node.start, node.end, node.payload))
+            if node.left is not None:
+                stack.append(node.left)
+        result.sort(key=lambda item: item[0])
+        return result
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any, Any]]:
+        """Itera los intervalos en orden de inicio."""
+        stack, node = [], self._root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield (node.start, node.end, node.payload)
+            node = node.right
@@ -0,0 +1,134 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.database.connection import DatabaseConnection, DatabaseError
+from src.services.inventory_service import InventoryService
+from src.services.sales_service import OCCUPIED_SEATS_QUERY, SEAT_MAP_SHOWTIME_QUERY, TODAY_SHOWTIMES_QUERY
+from src.services.schedule_service import CONFLICT_QUERY, ScheduleService
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de página del libro de movimientos en la vista de inventario.
+MOVEMENTS_PAGE_SIZE = 100
+
+@dataclass
+class HotQuery:
+    """Consulta crítica y el índice que se espera que use sobre `table`."""
+    name: str
+    sql: str
+    params: Tuple[Any, ...]
+    table: str
+    expected_indexes: Tuple[str, ...]
+
+def _hot_queries() -> List[HotQuery]:
+    """
+    Las consultas son las mismas cadenas que ejecutan los servicios (constantes o sus
+    constructores de consulta), así el plan verificado es el de producción.
+    """
+    day_start = datetime.combine(datetime.now().date(), datetime.min.time())
+    day_end = day_start + timedelta(days=1)
+    showtimes_sql, showtimes_params = ScheduleService.build_showtimes_query(day_start)
+    movements_sql, movements_params = InventoryService.build_stock_movements_query(page_size=MOVEMENTS_PAGE_SIZE)
+    by_type_sql, by_type_params = InventoryService.build_stock_movements_query(
+        movement_type="SALE", page_size=MOVEMENTS_PAGE_SIZE, before=(day_end, 2**31 - 1)
+    )
+    by_item_sql, by_item_params = InventoryService.build_stock_movements_query(
+        item_id=1, page_size=MOVEMENTS_PAGE_SIZE, before=(day_end, 2**31 - 1)
+    )
+    return [
+        HotQuery(
+            name="funciones del día (get_showtimes)",
+            sql=showtimes_sql,
+            params=showtimes_params,
+            table="s",
+            expected_indexes=("idx_showtimes_start_time", "idx_showtimes_theater_time"),
+        ),
+        HotQuery(
+            name="cartelera de hoy en la venta (get_active_movies_with_showtimes)",
+            sql=TODAY_SHOWTIMES_QUERY,
+            params=(),
+            table="s",
+            expected_indexes=("idx_showtimes_start_time",),
+        ),
+        HotQuery(
+            name="conflictos por sala (check_conflict)",
+            sql=CONFLICT_QUERY,
+            params=(1, day_end, day_start),
+            table="showtimes",
+            expected_indexes=("idx_showtimes_theater_time",),
+        ),
+        HotQuery(
+            name="sala de la función (get_seat_map)",
+            sql=SEAT_MAP_SHOWTIME_QUERY,
+            params=(1,),
+            table="st",
+            expected_indexes=("PRIMARY",),
+        ),
+        HotQuery(
+            name="ocupación de una función (get_seat_map / get_occupied_seat_ids)",
+            sql=OCCUPIED_SEATS_QUERY,
+            params=(1,),
+            table="tickets",
+            expected_indexes=("idx_tickets_showtime_seat",),
+        ),
+        HotQuery(
+            name="log de movimientos (get_stock_movements)",
+            sql=movements_sql,
+            params=movements_params,
+            table="sm",
+            expected_indexes=("idx_stock_movements_created",),
+        ),
+        HotQuery(
+            name="página keyset de movimientos por tipo (get_stock_movements)",
+            sql=by_type_sql,
+            params=by_type_params,
+            table="sm",
+            expected_indexes=("idx_stock_movements_type_created",),
+        ),
+        HotQuery(
+            name="página keyset de movimientos por insumo (get_stock_movements)",
+            sql=by_item_sql,
+            params=by_item_params,
+            table="sm",
+            expected_indexes=("idx_stock_movements_item_created",),
+        ),
+    ]
+
+def explain(db: DatabaseConnection, sql: str, params: Tuple[Any, ...] = ()) -> List[Dict[str, Any]]:
+    """Ejecuta EXPLAIN sobre la consulta y retorna las filas del plan."""
+    return db.execute_query(f"EXPLAIN {sql}", params)
+
+def check_hot_queries(db: DatabaseConnection, queries: Optional[List[HotQuery]] = None) -> List[Dict[str, Any]]:
+    """
+    Verifica con EXPLAIN que cada consulta crítica use uno de sus índices esperados.
+    Retorna un resumen por consulta: índice usado, tipo de acceso, filas estimadas y 'ok'.
+    """
+    results = []
+    for query in queries or _hot_queries():
+        summary = {"name": query.name, "key": None, "access": None, "rows": None, "ok": False}
+        try:
+            plan = explain(db, query.sql, query.params)
+        except DatabaseError as e:
+            logger.exception(f"No se pudo obtener el plan de '{query.name}'.")
+            summary["error"] = str(e)
+            results.append(summary)
+            continue
+        step = next((row for row in plan if row.get("table") == query.table), None)
+        if step:
+            summary.update(key=step.get("key"), access=step.get("type"), rows=step.get("rows"))
+            summary["ok"] = step.get("key") in query.expected_indexes
+        results.append(summary)
+    return results
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    report = check_hot_queries(DatabaseConnection())
+    for item in report:
+        mark = "✅" if item["ok"] else "❌"
+        print(f"{mark} {item['name']}: key={item['key']} type={item['access']} rows={item['rows']}")
+        if "error" in item:
+            print(f"   Error: {item['error']}")
+    sys.exit(0 if all(item["ok"] for item in report) else 1)
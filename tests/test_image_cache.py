@@ -0,0 +1,88 @@
+import itertools
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.utils import image_cache
+from src.utils.image_cache import ImageCache
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+class ImageCacheTest(unittest.TestCase):
+    """Caché de miniaturas sobre archivos locales temporales (sin red)."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.cache_dir = os.path.join(self._tmp.name, "cache")
+        # Reloj determinista para que el orden LRU no dependa de la resolución de time.time().
+        clock = itertools.count(1000)
+        patcher = mock.patch.object(image_cache.time, "time", side_effect=lambda: float(next(clock)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _source(self, name: str, data: bytes) -> str:
+        path = os.path.join(self._tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def _cache(self, max_bytes: int = 10 * 1024 * 1024) -> ImageCache:
+        cache = ImageCache(self.cache_dir, max_bytes)
+        self.addCleanup(cache._executor.shutdown)
+        return cache
+
+    def test_same_content_from_different_sources_is_stored_once(self):
+        data = PNG_HEADER + os.urandom(256)
+        first = self._source("poster.png", data)
+        copy = self._source("poster_copy.png", data)
+        other = self._source("other.png", PNG_HEADER + os.urandom(256))
+        cache = self._cache()
+
+        with mock.patch.object(image_cache, "Image", None):
+            path_first = cache.get_thumbnail(first, 120, 180)
+            path_copy = cache.get_thumbnail(copy, 120, 180)
+            path_other = cache.get_thumbnail(other, 120, 180)
+
+        self.assertEqual(path_first, path_copy)
+        self.assertNotEqual(path_first, path_other)
+        self.assertEqual(len(cache._entries), 2)
+        # La caché persiste en el manifiesto: otra instancia la encuentra sin reprocesar.
+        self.assertEqual(self._cache().cached_thumbnail(copy, 120, 180), path_first)
+
+    def test_least_recently_used_files_are_evicted_over_the_byte_budget(self):
+        sources = [self._source(f"img{i}.png", PNG_HEADER + os.urandom(400)) for i in range(3)]
+        cache = self._cache(max_bytes=1000)
+
+        with mock.patch.object(image_cache, "Image", None):
+            first = cache.get_thumbnail(sources[0], 64, 64)
+            second = cache.get_thumbnail(sources[1], 64, 64)
+            self.assertEqual(cache.cached_thumbnail(sources[0], 64, 64), first) # el primero pasa a ser el más reciente
+            third = cache.get_thumbnail(sources[2], 64, 64)
+
+        self.assertLessEqual(cache.total_bytes, 1000)
+        self.assertTrue(os.path.exists(first))
+        self.assertTrue(os.path.exists(third))
+        self.assertFalse(os.path.exists(second))
+        self.assertIsNone(cache.cached_thumbnail(sources[1], 64, 64))
+
+    def test_without_pillow_the_original_bytes_are_cached(self):
+        data = PNG_HEADER + os.urandom(128)
+        source = self._source("product.png", data)
+        cache = self._cache()
+
+        with mock.patch.object(image_cache, "Image", None):
+            path = cache.get_thumbnail(source, 80, 80)
+
+        self.assertTrue(path.endswith(".png"))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_missing_source_returns_none(self):
+        cache = self._cache()
+        self.assertIsNone(cache.get_thumbnail(os.path.join(self._tmp.name, "missing.png"), 80, 80))
+        self.assertIsNone(cache.get_thumbnail(None, 80, 80))
+
+if __name__ == "__main__":
+    unittest.main()